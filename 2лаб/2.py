@@ -1,33 +1,49 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import json
+import math
+import os
 import sys
-import requests
 from bitcoinutils.setup import setup
-from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
-from bitcoinutils.keys import PrivateKey, P2wpkhAddress
-from bitcoinutils.script import Script
+from bitcoinutils.keys import PrivateKey
+
+# Общий асинхронный клиент mempool.space лежит в корне репозитория
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mempool_client import MempoolClient, MempoolError, TESTNET4_URL  # noqa: E402
+from mempool_cache import ResponseCache, DEFAULT_CACHE_PATH, DEFAULT_TTL  # noqa: E402
+from coin_selection import STRATEGIES, select_coins  # noqa: E402
+from fees import FEE_TARGETS, DEFAULT_FEE_TARGET, MAX_STANDARD_TX_WEIGHT, resolve_fee_rate  # noqa: E402
+from tx_builder import build_signed_tx, check_address  # noqa: E402
+from signing import InputSigner, measure_signing_time  # noqa: E402
+from payouts import load_payouts, plan_payouts, separate_vsize  # noqa: E402
+from consolidation import (  # noqa: E402
+    LONG_TERM_FEE_RATE, MAX_CONSOLIDATION_FEE_RATE, SMALL_UTXO_THRESHOLD, plan_consolidation, print_plan,
+)
 
 # Конфигурация
 WIF = "cPBNEHScJZE8oxu3SFfuJjwkSSWeaMxLPKiSiuadjviSrAcgKPAb"
 FROM_ADDRESS = "tb1qkesll0fxu6h2x3070pvd604mx4yt234nytlw8w"
-MEMPOOL_URL = "https://mempool.space/testnet4/api"
-
+MEMPOOL_URL = TESTNET4_URL
 
-def main():
-    parser = argparse.ArgumentParser(description="Отправить биткоины")
-    parser.add_argument("--to", required=True, help="Адрес получателя")
-    args = parser.parse_args()
 
+async def run(args, client):
     # Фиксированная сумма для отправки: 0.00336655 BTC = 336655 сатоши
     send_amount = 750
 
     # Инициализация сети
     setup("testnet")
 
+    # Адрес проверяется до запросов к API, чтобы не выдавать его ошибку за ошибку комиссии
+    try:
+        check_address(args.to)
+    except ValueError as e:
+        print(f"Ошибка адреса получателя: {e}")
+        return
+
     # Получаем все UTXO отправителя
-    url = f"{MEMPOOL_URL}/address/{FROM_ADDRESS}/utxo"
-    utxos = requests.get(url).json()
+    utxos = await client.get_address_utxos(FROM_ADDRESS)
 
     if not utxos:
         print("Нет средств на кошельке")
@@ -38,78 +54,70 @@ def main():
     print(f"Общий баланс: {total_balance} сатоши ({total_balance / 100000000:.8f} BTC)")
     print(f"Пытаюсь отправить: {send_amount} сатоши ({send_amount / 100000000:.8f} BTC)")
 
-    # Рассчитываем комиссию (примерно 250 сатоши для надежности)
-    fee = 250
-    total_needed = send_amount + fee
-
-    if total_needed > total_balance:
-        print(f"Недостаточно средств. Нужно: {total_needed} сатоши, есть: {total_balance} сатоши")
-        return
-
-    # Подбираем UTXO для отправки
-    selected_utxos = []
-    selected_total = 0
+    # Ставка: из --fee-rate или рекомендованная mempool.space (ответ кэшируется)
+    fee_rate, fee_source = await resolve_fee_rate(client, args.fee_rate, args.fee_target)
+    print(f"Ставка комиссии: {fee_rate} sat/vB ({fee_source})")
 
-    # Сортируем UTXO по величине (от больших к меньшим)
-    sorted_utxos = sorted(utxos, key=lambda x: int(x["value"]), reverse=True)
+    # Подбираем UTXO; комиссия считается по оценке размера транзакции и ставке sat/vB
+    selection = select_coins(utxos, send_amount, fee_rate, args.strategy, max_weight=args.max_weight)
 
-    for utxo in sorted_utxos:
-        if selected_total >= total_needed:
-            break
-        selected_utxos.append(utxo)
-        selected_total += int(utxo["value"])
+    if selection is None:
+        print(f"Недостаточно средств для отправки {send_amount} сатоши "
+              f"при ставке {fee_rate} sat/vB в пределах {args.max_weight} WU, есть: {total_balance} сатоши")
+        return
 
-    print(f"Выбрано {len(selected_utxos)} UTXO на сумму {selected_total} сатоши")
+    selected_utxos = selection["utxos"]
+    selected_total = selection["total"]
+    fee = selection["fee"]
+    change = selection["change"]
 
-    # Рассчитываем сдачу
-    change = selected_total - send_amount - fee
+    print(f"Выбрано {len(selected_utxos)} UTXO на сумму {selected_total} сатоши "
+          f"(стратегия: {selection['strategy']})")
+    print(f"Оценка: {selection['vsize']} vB, комиссия {fee} сатоши")
 
-    # Создаем приватный ключ
+    # Собираем и подписываем; комиссия сверяется с фактическим размером подписанной транзакции
     priv = PrivateKey(WIF)
-    pub = priv.get_public_key()
-
-    # Создаем адрес получателя
-    to_address = P2wpkhAddress(args.to)
-
-    # Создаем входы транзакции
-    tx_inputs = []
-    for utxo in selected_utxos:
-        txin = TxInput(utxo["txid"], int(utxo["vout"]))
-        tx_inputs.append(txin)
+    try:
+        with InputSigner(priv, args.workers) as signer:
+            signed = build_signed_tx(priv, selected_utxos, [(args.to, send_amount)], fee, fee_rate,
+                                     FROM_ADDRESS, change, signer)
+    except ValueError as e:
+        print(f"Ошибка комиссии: {e}")
+        return
 
-    # Создаем выходы транзакции
-    outputs = [TxOutput(send_amount, to_address.to_script_pub_key())]
+    tx = signed["tx"]
+    fee = signed["fee"]
+    change = signed["change"]
+    for idx, utxo in enumerate(selected_utxos):
+        print(f"Подписан вход {idx + 1}: {utxo['txid'][:20]}...:{utxo['vout']}")
 
-    # Добавляем сдачу, если она больше 0
+    print(f"Фактический размер: {signed['vsize']} vB, комиссия {fee} сатоши "
+          f"({fee / signed['vsize']:.2f} sat/vB)")
+    if fee != signed["estimated_fee"]:
+        print(f"Комиссия скорректирована на {signed['estimated_fee'] - fee} сатоши по фактическому размеру")
     if change > 0:
-        from_address_obj = P2wpkhAddress(FROM_ADDRESS)
-        outputs.append(TxOutput(change, from_address_obj.to_script_pub_key()))
         print(f"Сдача: {change} сатоши ({change / 100000000:.8f} BTC)")
 
-    # Создаем транзакцию
-    tx = Transaction(tx_inputs, outputs, has_segwit=True)
-
-    # Подготавливаем scriptCode для подписи
-    h160 = pub.to_hash160()
-    script_code = Script(["OP_DUP", "OP_HASH160", h160, "OP_EQUALVERIFY", "OP_CHECKSIG"])
-
-    # Подписываем каждый вход
-    tx.witnesses = []
-    for idx, utxo in enumerate(selected_utxos):
-        sig = priv.sign_segwit_input(tx, idx, script_code, int(utxo["value"]))
-        tx.witnesses.append(TxWitnessInput([sig, pub.to_hex()]))
-        print(f"Подписан вход {idx + 1}: {utxo['txid'][:20]}...:{utxo['vout']}")
-
     # Получаем raw транзакцию
     raw_tx = tx.serialize()
     txid = tx.get_txid()
 
+    if args.dry_run:
+        print("\nПробный запуск: транзакция не отправлена")
+        print(f"TXID: {txid}")
+        print(f"Raw транзакция:")
+        print(raw_tx)
+        return
+
     # Отправляем транзакцию
     print("\nОтправляю транзакцию в сеть...")
-    broadcast_url = f"{MEMPOOL_URL}/tx"
-    response = requests.post(broadcast_url, data=raw_tx.encode('utf-8'))
+    try:
+        await client.broadcast_tx(raw_tx)
+        error = None
+    except MempoolError as e:
+        error = e
 
-    if response.status_code == 200:
+    if error is None:
         print("\n" + "=" * 50)
         print("ТРАНЗАКЦИЯ УСПЕШНО ОТПРАВЛЕНА!")
         print("=" * 50)
@@ -121,16 +129,216 @@ def main():
         if change > 0:
             print(f"Сдача возвращена: {change} сатоши ({change / 100000000:.8f} BTC)")
 
+        status = await client.get_tx_status(txid)
+        print(f"Статус: {'подтверждена' if status.get('confirmed') else 'в мемпуле'}")
+
         print(f"\nСсылка для просмотра:")
         print(f"https://mempool.space/testnet4/tx/{txid}")
         print("=" * 50)
     else:
         print(f"\nОШИБКА при отправке транзакции:")
-        print(f"Код ошибки: {response.status_code}")
-        print(f"Ответ: {response.text}")
+        print(f"Код ошибки: {error.status}")
+        print(f"Ответ: {error}")
         print(f"\nRaw транзакция (для ручной отправки):")
         print(raw_tx)
 
 
+async def run_batch(args, client):
+    """Пакетные выплаты из файла: одна транзакция на партию получателей"""
+    setup("testnet")
+
+    try:
+        payouts = load_payouts(args.batch)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ошибка чтения файла выплат: {e}")
+        return
+    if not payouts:
+        print("Файл выплат пуст")
+        return
+
+    total_amount = sum(amount for _, amount in payouts)
+    print(f"Выплат: {len(payouts)} на сумму {total_amount} сатоши ({total_amount / 100000000:.8f} BTC)")
+
+    utxos = await client.get_address_utxos(FROM_ADDRESS)
+    if not utxos:
+        print("Нет средств на кошельке")
+        return
+
+    fee_rate, fee_source = await resolve_fee_rate(client, args.fee_rate, args.fee_target)
+    print(f"Ставка комиссии: {fee_rate} sat/vB ({fee_source})")
+
+    try:
+        batches = plan_payouts(utxos, payouts, fee_rate, args.strategy, args.max_weight)
+    except ValueError as e:
+        print(e)
+        return
+
+    priv = PrivateKey(WIF)
+    signer = InputSigner(priv, args.workers)
+    try:
+        await sign_and_send_batches(args, client, priv, signer, batches, payouts, fee_rate)
+    finally:
+        signer.close()
+
+
+async def sign_and_send_batches(args, client, priv, signer, batches, payouts, fee_rate):
+    report = []
+    total_fee = 0
+    total_vsize = 0
+    total_inputs = 0
+
+    for number, batch in enumerate(batches, 1):
+        selection = batch["selection"]
+        try:
+            signed = build_signed_tx(priv, selection["utxos"], batch["payouts"], selection["fee"],
+                                     fee_rate, FROM_ADDRESS, selection["change"], signer)
+        except ValueError as e:
+            print(f"Партия {number}: ошибка комиссии: {e}")
+            return
+
+        tx = signed["tx"]
+        txid = tx.get_txid()
+        total_fee += signed["fee"]
+        total_vsize += signed["vsize"]
+        total_inputs += len(selection["utxos"])
+        print(f"\nПартия {number}: {len(batch['payouts'])} получателей, "
+              f"{len(selection['utxos'])} входов, {signed['vsize']} vB, комиссия {signed['fee']} сатоши, "
+              f"сдача {signed['change']} сатоши")
+
+        status = "dry-run"
+        if not args.dry_run:
+            try:
+                await client.broadcast_tx(tx.serialize())
+                status = "sent"
+            except MempoolError as e:
+                status = f"error: {e}"
+                print(f"ОШИБКА при отправке партии {number}: {e}")
+                print(tx.serialize())
+        print(f"TXID: {txid} ({status})")
+
+        # Выходы получателей идут в порядке файла, сдача - последним выходом
+        for vout, (address, amount) in enumerate(batch["payouts"]):
+            report.append({"address": address, "amount": amount, "txid": txid,
+                           "vout": vout, "status": status})
+
+    print(f"\n{'Адрес':<64} {'Сумма':>12}  Выход")
+    for row in report:
+        print(f"{row['address']:<64} {row['amount']:>12}  {row['txid'][:16]}...:{row['vout']}")
+
+    baseline = separate_vsize(len(payouts), total_inputs)
+    print(f"\nТранзакций: {len(batches)}, всего {total_vsize} vB, комиссия {total_fee} сатоши")
+    print(f"Отдельными транзакциями: не меньше {baseline} vB "
+          f"(экономия {baseline - total_vsize} vB, ~{math.ceil((baseline - total_vsize) * fee_rate)} сатоши)")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            for row in report:
+                f.write(json.dumps(row) + "\n")
+        print(f"Отчет по получателям сохранен в {args.report}")
+
+
+async def run_consolidation(args, client):
+    """Объединить мелкие UTXO отправителя в пределах потолка ставки"""
+    setup("testnet")
+
+    utxos = await client.get_address_utxos(FROM_ADDRESS)
+    if not utxos:
+        print("Нет средств на кошельке")
+        return
+
+    fee_rate, fee_source = await resolve_fee_rate(client, args.fee_rate, args.fee_target)
+    print(f"Ставка комиссии: {fee_rate} sat/vB ({fee_source}), потолок {args.max_fee_rate} sat/vB")
+
+    priv = PrivateKey(WIF)
+    plan = plan_consolidation(utxos, fee_rate, args.max_fee_rate, args.max_weight, args.small_threshold,
+                              args.long_term_fee_rate,
+                              signing_seconds_per_input=measure_signing_time(priv))
+    print_plan(plan, fee_rate)
+    if not plan["transactions"]:
+        return
+    if args.dry_run:
+        print("\nПробный запуск: транзакции не подписаны и не отправлены")
+        return
+
+    with InputSigner(priv, args.workers) as signer:
+        for number, planned in enumerate(plan["transactions"], 1):
+            # Единственный выход - на свой адрес, как сдача: его сумма уточняется по фактическому размеру
+            try:
+                signed = build_signed_tx(priv, planned["utxos"], [], planned["fee"], fee_rate,
+                                         FROM_ADDRESS, planned["output"], signer)
+            except ValueError as e:
+                print(f"Транзакция {number}: ошибка комиссии: {e}")
+                return
+
+            tx = signed["tx"]
+            try:
+                await client.broadcast_tx(tx.serialize())
+            except MempoolError as e:
+                print(f"ОШИБКА при отправке транзакции {number}: {e}")
+                return
+            print(f"Транзакция {number}: {tx.get_txid()} ({len(planned['utxos'])} входов, "
+                  f"{signed['vsize']} vB, комиссия {signed['fee']} сатоши)")
+
+
+async def run_with_client(args, cache=None):
+    async with MempoolClient(args.api_url, cache=cache) as client:
+        if args.batch:
+            await run_batch(args, client)
+        elif args.consolidate:
+            await run_consolidation(args, client)
+        else:
+            await run(args, client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отправить биткоины")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--to", help="Адрес получателя")
+    target.add_argument("--batch", metavar="FILE",
+                        help="Пакетные выплаты из CSV (address,amount) или JSONL, суммы в сатоши")
+    target.add_argument("--consolidate", action="store_true", help="Объединить мелкие UTXO")
+    parser.add_argument("--api-url", default=MEMPOOL_URL, help="Базовый URL mempool.space API")
+    parser.add_argument("--fee-rate", type=float,
+                        help="Ставка комиссии, sat/vB (по умолчанию - рекомендованная mempool.space)")
+    parser.add_argument("--fee-target", choices=list(FEE_TARGETS), default=DEFAULT_FEE_TARGET,
+                        help="Цель подтверждения для рекомендованной ставки")
+    parser.add_argument("--strategy", choices=["auto"] + list(STRATEGIES), default="auto",
+                        help="Стратегия выбора UTXO")
+    parser.add_argument("--max-weight", type=int, default=MAX_STANDARD_TX_WEIGHT,
+                        help="Лимит веса одной транзакции (выбор UTXO, пакетные выплаты, консолидация), WU")
+    parser.add_argument("--max-fee-rate", type=float, default=MAX_CONSOLIDATION_FEE_RATE,
+                        help="Потолок ставки для консолидации, sat/vB")
+    parser.add_argument("--small-threshold", type=int, default=SMALL_UTXO_THRESHOLD,
+                        help="UTXO меньше этой суммы (сатоши) считаются мелкими")
+    parser.add_argument("--long-term-fee-rate", type=float, default=LONG_TERM_FEE_RATE,
+                        help="Ожидаемая ставка будущих трат для оценки экономии, sat/vB")
+    parser.add_argument("--report", help="Сохранить выходы получателей в JSONL (для --batch)")
+    parser.add_argument("--workers", type=int,
+                        help="Процессов для подписи входов (по умолчанию - по числу CPU)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Собрать и подписать транзакцию без отправки")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="Файл кэша ответов API")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                        help="Время свежести кэша UTXO, секунды")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResponseCache(args.cache_path, args.cache_ttl)
+
+    try:
+        asyncio.run(run_with_client(args, cache))
+    except MempoolError as e:
+        print(f"Ошибка запроса к API: {e}")
+    finally:
+        if cache:
+            stats = cache.stats()
+            print(f"Кэш: {stats['hits']} попаданий, {stats['misses']} промахов, "
+                  f"{stats['revalidated']} перепроверено")
+            if not args.dry_run:
+                # После отправки набор UTXO изменился
+                cache.invalidate(f"{args.api_url.rstrip('/')}/address/{FROM_ADDRESS}/utxo")
+            cache.close()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Бенчмарк стратегий выбора UTXO на синтетических кошельках
+
+Пример:
+    python bench_coin_selection.py --sizes 10000 100000 1000000 --fee-rate 5
+    python bench_coin_selection.py --json > coin_selection.json
+"""
+import argparse
+import json
+import random
+import time
+
+from coin_selection import STRATEGIES, UtxoPool, select_coins
+
+
+def make_wallet(size, seed=0):
+    """
+    Синтетический кошелек из size UTXO
+
+    Значения распределены логнормально (много мелких выходов и немного крупных),
+    как у реальных фрагментированных кошельков.
+    """
+    rng = random.Random(seed)
+    txid = "00" * 32
+    return [
+        {"txid": txid, "vout": i, "value": max(300, int(rng.lognormvariate(9.5, 1.6)))}
+        for i in range(size)
+    ]
+
+
+def run(sizes, targets, fee_rate, repeat, seed):
+    results = []
+    for size in sizes:
+        wallet = make_wallet(size, seed)
+
+        # Подготовка (извлечение и сортировка значений) делается один раз на кошелек
+        start = time.perf_counter()
+        pool = UtxoPool(wallet)
+        prepare_seconds = time.perf_counter() - start
+
+        for target in targets:
+            for strategy in list(STRATEGIES) + ["auto"]:
+                timings = []
+                selection = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    selection = select_coins(pool, target, fee_rate, strategy)
+                    timings.append(time.perf_counter() - start)
+
+                record = {
+                    "utxos": size,
+                    "target": target,
+                    "strategy": strategy,
+                    "prepare_seconds": prepare_seconds,
+                    "seconds": min(timings),
+                }
+                if selection:
+                    record.update({
+                        "chosen": selection["strategy"],
+                        "inputs": len(selection["utxos"]),
+                        "fee": selection["fee"],
+                        "change": selection["change"],
+                        "vsize": selection["vsize"],
+                        "waste": round(selection["waste"], 1),
+                    })
+                results.append(record)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк coin selection")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Размеры кошельков (количество UTXO)")
+    parser.add_argument("--targets", type=int, nargs="+", default=[50000, 1000000, 20000000],
+                        help="Суммы платежей в сатоши")
+    parser.add_argument("--fee-rate", type=float, default=5.0, help="Ставка комиссии, sat/vB")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов на замер (берется лучший)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.targets, args.fee_rate, args.repeat, args.seed)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'UTXO':>9} {'Сумма':>10} {'Стратегия':>15} {'Подгот., с':>10} {'Выбор, с':>9} "
+          f"{'Входов':>7} {'Комиссия':>9} {'Сдача':>10} {'Waste':>9}")
+    for r in results:
+        prefix = (f"{r['utxos']:>9} {r['target']:>10} {r['strategy']:>15} "
+                  f"{r['prepare_seconds']:>10.3f} {r['seconds']:>9.3f}")
+        if "inputs" in r:
+            print(f"{prefix} {r['inputs']:>7} {r['fee']:>9} {r['change']:>10} {r['waste']:>9}")
+        else:
+            print(f"{prefix} {'нет решения':>7}")
+
+
+if __name__ == "__main__":
+    main()
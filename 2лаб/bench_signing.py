@@ -0,0 +1,98 @@
+"""
+Бенчмарк подписи входов: bitcoinutils по одному входу против
+общих хэшей BIP143 (последовательно и с пулом процессов)
+
+Для каждого размера проверяется, что все три способа дают побайтно
+одинаковую транзакцию.
+
+Пример:
+    python bench_signing.py --inputs 10 100 500 1000 --workers 4
+    python bench_signing.py --json > signing.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from bitcoinutils.keys import PrivateKey
+from bitcoinutils.setup import setup
+
+from signing import InputSigner
+from tx_builder import build_tx, sign_tx
+
+WIF = "cPBNEHScJZE8oxu3SFfuJjwkSSWeaMxLPKiSiuadjviSrAcgKPAb"
+FROM_ADDRESS = "tb1qkesll0fxu6h2x3070pvd604mx4yt234nytlw8w"
+
+
+def make_utxos(count):
+    """Синтетические UTXO с разными txid (значения подписей не зависят от их существования)"""
+    return [
+        {"txid": hashlib.sha256(i.to_bytes(4, "little")).hexdigest(), "vout": i % 4, "value": 10000 + i}
+        for i in range(count)
+    ]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run(sizes, workers):
+    priv = PrivateKey(WIF)
+    results = []
+
+    with InputSigner(priv, workers=1) as midstate_signer, \
+            InputSigner(priv, workers=workers, min_parallel=1) as pool_signer:
+        # Пул запускается заранее, чтобы замеры не включали старт процессов
+        pool_signer.sign(build_tx(make_utxos(workers), [(FROM_ADDRESS, 1000)]), make_utxos(workers))
+
+        for count in sizes:
+            utxos = make_utxos(count)
+            payments = [(FROM_ADDRESS, sum(u["value"] for u in utxos) - count * 100)]
+
+            serial, serial_seconds = timed(lambda: sign_tx(build_tx(utxos, payments), priv, utxos))
+            midstate, midstate_seconds = timed(
+                lambda: sign_tx(build_tx(utxos, payments), priv, utxos, midstate_signer))
+            parallel, parallel_seconds = timed(
+                lambda: sign_tx(build_tx(utxos, payments), priv, utxos, pool_signer))
+
+            raw = serial.serialize()
+            results.append({
+                "inputs": count,
+                "workers": workers,
+                "serial_seconds": serial_seconds,
+                "midstate_seconds": midstate_seconds,
+                "parallel_seconds": parallel_seconds,
+                "speedup": serial_seconds / parallel_seconds,
+                "identical": midstate.serialize() == raw and parallel.serialize() == raw,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк параллельной подписи входов")
+    parser.add_argument("--inputs", type=int, nargs="+", default=[10, 50, 100, 250, 500, 1000],
+                        help="Количество входов в транзакции")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Количество процессов пула")
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    setup("testnet")
+    results = run(args.inputs, args.workers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'Входов':>7} {'bitcoinutils, с':>16} {'BIP143 midstate, с':>19} "
+          f"{'Пул x' + str(args.workers) + ', с':>12} {'Ускорение':>10} {'Совпадает':>10}")
+    for r in results:
+        print(f"{r['inputs']:>7} {r['serial_seconds']:>16.3f} {r['midstate_seconds']:>19.3f} "
+              f"{r['parallel_seconds']:>12.3f} {r['speedup']:>9.1f}x {'да' if r['identical'] else 'НЕТ':>10}")
+
+
+if __name__ == "__main__":
+    main()
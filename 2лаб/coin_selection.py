@@ -0,0 +1,430 @@
+"""
+Выбор UTXO для транзакции (coin selection)
+
+Все стратегии имеют общий интерфейс CoinSelector.select() и считают
+комиссию по виртуальному размеру P2WPKH транзакции, а не константой.
+Работают с UTXO в формате mempool.space: {"txid", "vout", "value"}.
+Количество входов ограничено лимитом веса max_weight (по умолчанию
+стандартный для ретрансляции): стратегия, которой для суммы нужно больше
+входов, не находит решения.
+
+Стратегии:
+    bnb - branch-and-bound: точное попадание в сумму без сдачи
+    knapsack - приближенный подбор подмножества (как в Bitcoin Core)
+    largest-first - от больших к меньшим (минимум входов)
+    smallest-first - от меньших к большим (консолидация мелких выходов)
+    auto - запустить bnb, knapsack и largest-first и выбрать с минимальными потерями
+"""
+import bisect
+import math
+import random
+from collections import Counter
+from itertools import compress
+from operator import itemgetter
+
+from fees import (
+    DUST_LIMIT, MAX_STANDARD_TX_WEIGHT, P2WPKH_INPUT_VSIZE, P2WPKH_INPUT_WEIGHT, P2WPKH_OUTPUT_VSIZE,
+    estimate_vsize, estimate_weight, fee_for,
+)
+
+LONG_TERM_FEE_RATE = 10.0      # sat/vB, по ней оценивается стоимость будущей траты сдачи
+BNB_MAX_TRIES = 100000
+KNAPSACK_MAX_CANDIDATES = 1000
+KNAPSACK_ITERATIONS = 100
+
+
+class UtxoPool:
+    """
+    Подготовленный набор UTXO: значения и их отсортированная копия
+
+    Строится один раз на кошелек, поэтому несколько стратегий (auto)
+    не повторяют извлечение и сортировку значений.
+    """
+
+    def __init__(self, utxos):
+        self.utxos = utxos
+        self.values = list(map(int, map(itemgetter("value"), utxos)))
+        self.sorted_values = sorted(self.values)
+
+    @classmethod
+    def from_values(cls, values, utxos):
+        """
+        Пул из готовых значений в сатоши
+
+        utxos - любая последовательность с доступом по индексу (например,
+        строки компактного набора UTXO), элементы берутся только для
+        выбранных входов.
+        """
+        pool = cls.__new__(cls)
+        pool.utxos = utxos
+        pool.values = list(values)
+        pool.sorted_values = sorted(pool.values)
+        return pool
+
+    def __len__(self):
+        return len(self.values)
+
+    def indices_of(self, chosen_values):
+        """Индексы UTXO с заданными значениями (с учетом повторов)"""
+        need = Counter(chosen_values)
+        indices = []
+        # Кандидаты отбираются без цикла на Python: map/compress работают в C
+        wanted = set(need)
+        for i in compress(range(len(self.values)), map(wanted.__contains__, self.values)):
+            value = self.values[i]
+            if need[value]:
+                need[value] -= 1
+                indices.append(i)
+                if len(indices) == len(chosen_values):
+                    break
+        return indices
+
+
+class CoinSelector:
+    """
+    Базовый класс стратегии выбора UTXO
+
+    Подклассы реализуют _choose(), возвращающий значения выбранных UTXO;
+    расчет комиссии, сдачи и потерь (waste) общий для всех стратегий.
+    Эффективное значение входа - его сумма минус комиссия за сам вход.
+    """
+
+    name = None
+
+    def __init__(self, long_term_fee_rate=LONG_TERM_FEE_RATE, max_weight=MAX_STANDARD_TX_WEIGHT):
+        """
+        Args:
+            long_term_fee_rate: ставка будущей траты сдачи, sat/vB
+            max_weight: лимит веса транзакции в WU (None - без лимита)
+        """
+        self.long_term_fee_rate = long_term_fee_rate
+        self.max_weight = max_weight
+
+    def max_inputs_for(self, n_outputs, n_utxos):
+        """Сколько входов помещается в max_weight вместе с n_outputs выходами и сдачей"""
+        if self.max_weight is None:
+            return n_utxos
+        # 16 WU - запас на трехбайтовый счетчик входов
+        return max((self.max_weight - estimate_weight(0, n_outputs + 1) - 16) // P2WPKH_INPUT_WEIGHT, 0)
+
+    def select(self, utxos, target, fee_rate, n_outputs=1):
+        """
+        Выбрать UTXO для оплаты target сатоши
+
+        Args:
+            utxos: список UTXO ({"txid", "vout", "value"}) или UtxoPool
+            target: сумма выходов получателям в сатоши
+            fee_rate: ставка комиссии в sat/vB
+            n_outputs: количество выходов получателям (без сдачи)
+
+        Returns:
+            dict: {"strategy", "utxos", "total", "fee", "change", "vsize", "waste"}
+                  или None, если средств недостаточно или нужные входы не
+                  помещаются в max_weight
+        """
+        pool = utxos if isinstance(utxos, UtxoPool) else UtxoPool(utxos)
+        self.max_inputs = self.max_inputs_for(n_outputs, len(pool))
+        if not self.max_inputs:
+            return None
+        input_fee = fee_rate * P2WPKH_INPUT_VSIZE
+        # Сумма, которую должны покрыть эффективные значения входов (без сдачи);
+        # запас в 1 vbyte и 1 сатоши покрывает округление размера и комиссии вверх
+        selection_target = target + fee_rate * (estimate_weight(0, n_outputs) / 4 + 1) + 1
+        cost_of_change = fee_rate * P2WPKH_OUTPUT_VSIZE + self.long_term_fee_rate * P2WPKH_INPUT_VSIZE
+        self.input_waste = (fee_rate - self.long_term_fee_rate) * P2WPKH_INPUT_VSIZE
+
+        chosen = self._choose(pool.sorted_values, input_fee, selection_target, cost_of_change)
+        if not chosen:
+            return None
+        return self._finalize(pool, chosen, target, fee_rate, n_outputs, cost_of_change)
+
+    def _choose(self, sorted_values, input_fee, selection_target, cost_of_change):
+        raise NotImplementedError
+
+    def _finalize(self, pool, chosen, target, fee_rate, n_outputs, cost_of_change):
+        total = sum(chosen)
+        n_inputs = len(chosen)
+        if n_inputs > self.max_inputs:
+            return None
+
+        vsize = estimate_vsize(n_inputs, n_outputs)
+        fee = fee_for(vsize, fee_rate)
+        if total < target + fee:
+            return None
+
+        excess = total - target - fee
+        change = 0
+        vsize_with_change = estimate_vsize(n_inputs, n_outputs + 1)
+        fee_with_change = fee_for(vsize_with_change, fee_rate)
+        if excess > cost_of_change and total - target - fee_with_change >= DUST_LIMIT:
+            change = total - target - fee_with_change
+            vsize, fee = vsize_with_change, fee_with_change
+
+        # Потери: переплата за входы относительно долгосрочной ставки
+        # плюс стоимость сдачи либо отданный майнерам излишек
+        waste = n_inputs * self.input_waste
+        waste += cost_of_change if change else total - target - fee
+
+        return {
+            "strategy": self.name,
+            "utxos": [pool.utxos[i] for i in pool.indices_of(chosen)],
+            "total": total,
+            "fee": fee,
+            "change": change,
+            "vsize": vsize,
+            "waste": waste,
+        }
+
+
+def _spendable_start(sorted_values, input_fee):
+    """Позиция первого UTXO с положительным эффективным значением"""
+    return bisect.bisect_right(sorted_values, input_fee)
+
+
+def _largest_first(sorted_values, lo, hi, input_fee, selection_target, max_inputs):
+    """Набирать значения sorted_values[lo:hi] от больших к меньшим до selection_target, не больше max_inputs"""
+    chosen = []
+    total = 0
+    for i in range(hi - 1, max(lo, hi - max_inputs) - 1, -1):
+        chosen.append(sorted_values[i])
+        total += sorted_values[i] - input_fee
+        if total >= selection_target:
+            return chosen
+    return None
+
+
+class LargestFirstSelector(CoinSelector):
+    """От больших UTXO к меньшим: минимум входов и минимальная комиссия сейчас"""
+
+    name = "largest-first"
+
+    def _choose(self, sorted_values, input_fee, selection_target, cost_of_change):
+        lo = _spendable_start(sorted_values, input_fee)
+        return _largest_first(sorted_values, lo, len(sorted_values), input_fee, selection_target,
+                              self.max_inputs)
+
+
+class SmallestFirstSelector(CoinSelector):
+    """От меньших UTXO к большим: консолидирует мелкие выходы (пока комиссия низкая)"""
+
+    name = "smallest-first"
+
+    def _choose(self, sorted_values, input_fee, selection_target, cost_of_change):
+        chosen = []
+        total = 0
+        for i in range(_spendable_start(sorted_values, input_fee), len(sorted_values)):
+            if len(chosen) == self.max_inputs:
+                # Мелких выходов на сумму не хватает в пределах лимита веса
+                return None
+            chosen.append(sorted_values[i])
+            total += sorted_values[i] - input_fee
+            if total >= selection_target:
+                return chosen
+        return None
+
+
+class BranchAndBoundSelector(CoinSelector):
+    """
+    Branch-and-bound (алгоритм Bitcoin Core)
+
+    Ищет набор входов, эффективная сумма которых попадает в
+    [selection_target, selection_target + cost_of_change], т.е. транзакцию
+    без сдачи, минимизируя потери. Перебор ограничен BNB_MAX_TRIES,
+    глубина ветви - числом входов, помещающихся в max_weight.
+    """
+
+    name = "bnb"
+
+    def __init__(self, long_term_fee_rate=LONG_TERM_FEE_RATE, max_tries=BNB_MAX_TRIES,
+                 max_weight=MAX_STANDARD_TX_WEIGHT):
+        super().__init__(long_term_fee_rate, max_weight)
+        self.max_tries = max_tries
+
+    def _choose(self, sorted_values, input_fee, selection_target, cost_of_change):
+        upper = selection_target + cost_of_change
+        # UTXO больше верхней границы не могут входить ни в одно решение
+        lo = _spendable_start(sorted_values, input_fee)
+        hi = bisect.bisect_right(sorted_values, upper + input_fee)
+        pool = sorted_values[lo:hi]
+        pool.reverse()
+        values = [value - input_fee for value in pool]
+
+        available = sum(values)
+        if available < selection_target:
+            return None
+
+        input_waste = self.input_waste
+        max_inputs = self.max_inputs
+        feerate_high = input_waste > 0
+        selection = []
+        value = 0
+        waste = 0.0
+        best = None
+        best_waste = math.inf
+        index = 0
+
+        for _ in range(self.max_tries):
+            backtrack = False
+            if (value + available < selection_target or value > upper
+                    or len(selection) > max_inputs
+                    or (feerate_high and waste > best_waste)):
+                backtrack = True
+            elif value >= selection_target:
+                total_waste = waste + (value - selection_target)
+                if total_waste <= best_waste:
+                    best = list(selection)
+                    best_waste = total_waste
+                backtrack = True
+
+            if backtrack:
+                if not selection:
+                    break
+                # Возвращаем пропущенные UTXO в доступную сумму и исключаем последний выбранный
+                index -= 1
+                while index > selection[-1]:
+                    available += values[index]
+                    index -= 1
+                value -= values[index]
+                waste -= input_waste
+                selection.pop()
+            else:
+                ev = values[index]
+                available -= ev
+                # Не перебираем ветку, эквивалентную только что исключенному UTXO того же размера
+                if not selection or index - 1 == selection[-1] or ev != values[index - 1]:
+                    selection.append(index)
+                    value += ev
+                    waste += input_waste
+            index += 1
+
+        if best is None:
+            return None
+        return [pool[i] for i in best]
+
+
+class KnapsackSelector(CoinSelector):
+    """
+    Приближенный подбор подмножества (ApproximateBestSubset из Bitcoin Core)
+
+    Случайный перебор идет по KNAPSACK_MAX_CANDIDATES крупнейшим подходящим
+    UTXO, чтобы время не росло с размером кошелька.
+    """
+
+    name = "knapsack"
+
+    def __init__(self, long_term_fee_rate=LONG_TERM_FEE_RATE, seed=None,
+                 iterations=KNAPSACK_ITERATIONS, max_candidates=KNAPSACK_MAX_CANDIDATES,
+                 max_weight=MAX_STANDARD_TX_WEIGHT):
+        super().__init__(long_term_fee_rate, max_weight)
+        self.random = random.Random(seed)
+        self.iterations = iterations
+        self.max_candidates = max_candidates
+
+    def _choose(self, sorted_values, input_fee, selection_target, cost_of_change):
+        min_change = cost_of_change + DUST_LIMIT
+        lo = _spendable_start(sorted_values, input_fee)
+
+        # Попадание одним UTXO без сдачи
+        exact = bisect.bisect_left(sorted_values, selection_target + input_fee, lo)
+        if exact < len(sorted_values) and sorted_values[exact] - input_fee < selection_target + cost_of_change:
+            return [sorted_values[exact]]
+
+        # Подходящие UTXO меньше target + min_change и наименьший из больших
+        hi = bisect.bisect_left(sorted_values, selection_target + min_change + input_fee, lo)
+        lowest_larger = sorted_values[hi] if hi < len(sorted_values) else None
+        applicable_total = sum(sorted_values[lo:hi]) - (hi - lo) * input_fee
+
+        if applicable_total < selection_target:
+            return [lowest_larger] if lowest_larger is not None else None
+
+        candidates = sorted_values[max(lo, hi - self.max_candidates):hi]
+        candidates.reverse()
+        effective = [value - input_fee for value in candidates]
+        if sum(effective) < selection_target:
+            # Нужно больше входов, чем кандидатов: набираем от больших к меньшим
+            return _largest_first(sorted_values, lo, hi, input_fee, selection_target, self.max_inputs)
+
+        best = self._approximate_best_subset(effective, selection_target + min_change)
+        best_value = sum(effective[j] for j in best)
+        if best_value < selection_target + min_change:
+            best = self._approximate_best_subset(effective, selection_target)
+            best_value = sum(effective[j] for j in best)
+
+        if lowest_larger is not None and (
+                best_value < selection_target or lowest_larger - input_fee <= best_value):
+            return [lowest_larger]
+        if best_value < selection_target:
+            return None
+        if len(best) > self.max_inputs:
+            # Подмножество не помещается в лимит веса: набираем минимум входов
+            return _largest_first(sorted_values, lo, hi, input_fee, selection_target, self.max_inputs)
+        return [candidates[j] for j in best]
+
+    def _approximate_best_subset(self, values, target):
+        best_mask = [True] * len(values)
+        best_total = sum(values)
+
+        for _ in range(self.iterations):
+            if best_total == target:
+                break
+            mask = [False] * len(values)
+            total = 0
+            reached = False
+            for attempt in range(2):
+                for j, ev in enumerate(values):
+                    # Первый проход - случайное включение, второй - добираем невключенные
+                    include = self.random.random() < 0.5 if attempt == 0 else not mask[j]
+                    if include and not mask[j]:
+                        total += ev
+                        mask[j] = True
+                        if total >= target:
+                            reached = True
+                            if total < best_total:
+                                best_total = total
+                                best_mask = list(mask)
+                            total -= ev
+                            mask[j] = False
+                if reached:
+                    break
+
+        return [j for j, used in enumerate(best_mask) if used]
+
+
+STRATEGIES = {
+    "bnb": BranchAndBoundSelector,
+    "knapsack": KnapsackSelector,
+    "largest-first": LargestFirstSelector,
+    "smallest-first": SmallestFirstSelector,
+}
+
+
+def select_coins(utxos, target, fee_rate, strategy="auto", n_outputs=1,
+                 long_term_fee_rate=LONG_TERM_FEE_RATE, max_weight=MAX_STANDARD_TX_WEIGHT):
+    """
+    Выбрать UTXO указанной стратегией
+
+    strategy="auto" запускает bnb, knapsack и largest-first и возвращает
+    результат с минимальными потерями (waste), как это делает Bitcoin Core.
+
+    Args:
+        utxos: список UTXO или UtxoPool (чтобы не готовить его заново при повторных вызовах)
+        max_weight: лимит веса транзакции в WU (None - без лимита)
+
+    Returns:
+        dict: результат CoinSelector.select() или None, если средств недостаточно
+              или входы не помещаются в max_weight
+    """
+    pool = utxos if isinstance(utxos, UtxoPool) else UtxoPool(utxos)
+    if strategy != "auto":
+        selector = STRATEGIES[strategy](long_term_fee_rate, max_weight=max_weight)
+        return selector.select(pool, target, fee_rate, n_outputs)
+
+    results = []
+    for name in ("bnb", "knapsack", "largest-first"):
+        selector = STRATEGIES[name](long_term_fee_rate, max_weight=max_weight)
+        result = selector.select(pool, target, fee_rate, n_outputs)
+        if result:
+            results.append(result)
+    if not results:
+        return None
+    return min(results, key=lambda r: (r["waste"], len(r["utxos"])))
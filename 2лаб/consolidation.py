@@ -0,0 +1,196 @@
+"""
+Планировщик консолидации UTXO
+
+Фрагментированный кошелек платит за каждый вход при каждой будущей трате.
+Планировщик объединяет мелкие выходы в транзакции "много входов -> один
+выход" в пределах лимита веса и только при ставке не выше заданного
+потолка, то есть когда мемпул свободен и консолидация дешевле, чем трата
+тех же входов в будущем.
+
+Принимает UTXO в двух форматах:
+    mempool.space: {"txid", "vout", "value"} (сатоши)
+    listunspent Bitcoin Core: {"txid", "vout", "amount", "desc", ...} (BTC)
+Вес входа определяется по дескриптору listunspent (wpkh, sh(wpkh), pkh,
+tr); UTXO без дескриптора считаются P2WPKH.
+"""
+import math
+from decimal import Decimal
+
+from fees import (
+    DUST_LIMIT, MAX_STANDARD_TX_WEIGHT, P2WPKH_INPUT_VSIZE, P2WPKH_INPUT_WEIGHT,
+    P2WPKH_OUTPUT_WEIGHT, TX_OVERHEAD_WEIGHT, estimate_weight, fee_for, varint_size,
+)
+
+SATOSHI = Decimal("100000000")
+SMALL_UTXO_THRESHOLD = 100000  # сатоши; выходы меньше считаются мелкими
+LONG_TERM_FEE_RATE = 10.0      # sat/vB, ожидаемая ставка будущих трат
+MAX_CONSOLIDATION_FEE_RATE = 5.0  # sat/vB, потолок ставки по умолчанию
+MIN_INPUTS = 2
+
+# Вес входа по началу дескриптора listunspent, WU (подпись максимальной длины)
+INPUT_WEIGHTS = (
+    ("sh(wpkh(", 364),   # scriptSig 23 байта + witness P2WPKH
+    ("wpkh(", P2WPKH_INPUT_WEIGHT),
+    ("pkh(", 592),       # scriptSig с подписью и pubkey, без witness
+    ("tr(", 230),        # key path: одна подпись Schnorr 64 байта
+)
+
+
+def input_weight(utxo):
+    """Вес входа, тратящего utxo, по его дескриптору (без дескриптора - P2WPKH)"""
+    desc = utxo.get("desc", "")
+    for prefix, weight in INPUT_WEIGHTS:
+        if desc.startswith(prefix):
+            return weight
+    return P2WPKH_INPUT_WEIGHT
+
+
+def normalize_utxo(utxo):
+    """UTXO любого из поддерживаемых форматов с полями value (сатоши) и weight (WU входа)"""
+    if "value" in utxo:
+        value = int(utxo["value"])
+    else:
+        value = int(Decimal(str(utxo["amount"])) * SATOSHI)
+    return dict(utxo, value=value, weight=input_weight(utxo))
+
+
+def consolidation_vsize(chunk):
+    """Виртуальный размер транзакции "входы chunk -> один выход" в vbytes"""
+    weight = estimate_weight(0, 1) + (varint_size(len(chunk)) - 1) * 4 + sum(u["weight"] for u in chunk)
+    return math.ceil(weight / 4)
+
+
+def classify(utxos, fee_rate, small_threshold=SMALL_UTXO_THRESHOLD):
+    """
+    Разделить UTXO по экономической ценности при ставке fee_rate
+
+    Returns:
+        dict: {"uneconomical": [...], "small": [...], "large": [...]}
+              uneconomical - вход стоит дороже своей суммы
+    """
+    groups = {"uneconomical": [], "small": [], "large": []}
+    for utxo in utxos:
+        if utxo["value"] <= fee_rate * utxo["weight"] / 4:
+            groups["uneconomical"].append(utxo)
+        elif utxo["value"] < small_threshold:
+            groups["small"].append(utxo)
+        else:
+            groups["large"].append(utxo)
+    return groups
+
+
+def plan_consolidation(utxos, fee_rate, max_fee_rate, max_weight=MAX_STANDARD_TX_WEIGHT,
+                       small_threshold=SMALL_UTXO_THRESHOLD, long_term_fee_rate=LONG_TERM_FEE_RATE,
+                       min_inputs=MIN_INPUTS, signing_seconds_per_input=None):
+    """
+    Расписание консолидирующих транзакций
+
+    В консолидацию идут мелкие UTXO, которые окупают свой вход при текущей
+    ставке, от меньших к большим. Транзакции заполняются до лимита веса;
+    последняя неполная партия отбрасывается, если в ней меньше min_inputs
+    входов или ее выход оказался бы dust.
+
+    Args:
+        utxos: UTXO в формате mempool.space или listunspent
+        fee_rate: текущая ставка, sat/vB
+        max_fee_rate: потолок ставки; выше него консолидация не планируется
+        max_weight: лимит веса одной транзакции, WU
+        signing_seconds_per_input: измеренное время подписи одного входа (для отчета)
+
+    Returns:
+        dict: {"transactions": [{"utxos", "total", "fee", "vsize", "output"}, ...],
+               "groups": результат classify, "skipped_reason": None или причина,
+               "savings": оценка экономии (см. consolidation_savings)}
+    """
+    utxos = [normalize_utxo(utxo) for utxo in utxos]
+    groups = classify(utxos, fee_rate, small_threshold)
+    plan = {"transactions": [], "groups": groups, "skipped_reason": None}
+
+    if fee_rate > max_fee_rate:
+        plan["skipped_reason"] = f"ставка {fee_rate} sat/vB выше потолка {max_fee_rate} sat/vB"
+    else:
+        candidates = sorted(groups["small"], key=lambda u: u["value"])
+        # 16 WU - запас на трехбайтовый счетчик входов
+        budget = max_weight - TX_OVERHEAD_WEIGHT - P2WPKH_OUTPUT_WEIGHT - 16
+        chunks, chunk, weight = [], [], 0
+        for utxo in candidates:
+            if chunk and weight + utxo["weight"] > budget:
+                chunks.append(chunk)
+                chunk, weight = [], 0
+            chunk.append(utxo)
+            weight += utxo["weight"]
+        if chunk:
+            chunks.append(chunk)
+        for chunk in chunks:
+            if len(chunk) < min_inputs:
+                break
+            total = sum(u["value"] for u in chunk)
+            vsize = consolidation_vsize(chunk)
+            fee = fee_for(vsize, fee_rate)
+            if total - fee < DUST_LIMIT:
+                break
+            plan["transactions"].append({
+                "utxos": chunk, "total": total, "fee": fee, "vsize": vsize, "output": total - fee,
+            })
+        if not plan["transactions"]:
+            plan["skipped_reason"] = "нет мелких UTXO, которые выгодно объединить"
+
+    plan["savings"] = consolidation_savings(plan["transactions"], long_term_fee_rate,
+                                            signing_seconds_per_input)
+    return plan
+
+
+def consolidation_savings(transactions, long_term_fee_rate=LONG_TERM_FEE_RATE,
+                          signing_seconds_per_input=None):
+    """
+    Оценка экономии для будущих трат
+
+    Каждая консолидирующая транзакция заменяет n входов одним P2WPKH,
+    поэтому будущая трата этих средств короче на (n - 1) входов и требует
+    на n - 1 подписей меньше.
+
+    Returns:
+        dict: {"inputs_removed", "future_vsize_saved", "future_fee_saved",
+               "fee_paid", "net_saved", "signing_seconds_saved"}
+    """
+    inputs_removed = sum(len(tx["utxos"]) - 1 for tx in transactions)
+    future_vsize_saved = sum(sum(u["weight"] for u in tx["utxos"]) / 4 - P2WPKH_INPUT_VSIZE
+                             for tx in transactions)
+    future_fee_saved = fee_for(future_vsize_saved, long_term_fee_rate)
+    fee_paid = sum(tx["fee"] for tx in transactions)
+    return {
+        "inputs_removed": inputs_removed,
+        "future_vsize_saved": future_vsize_saved,
+        "future_fee_saved": future_fee_saved,
+        "fee_paid": fee_paid,
+        "net_saved": future_fee_saved - fee_paid,
+        "signing_seconds_saved": (inputs_removed * signing_seconds_per_input
+                                  if signing_seconds_per_input is not None else None),
+    }
+
+
+def print_plan(plan, fee_rate):
+    """Вывести анализ UTXO, расписание консолидации и оценку экономии"""
+    groups = plan["groups"]
+    print(f"Анализ UTXO при ставке {fee_rate} sat/vB:")
+    for name, title in (("uneconomical", "невыгодно тратить"), ("small", "мелкие"), ("large", "крупные")):
+        utxos = groups[name]
+        print(f"  {title:<18} {len(utxos):>6} UTXO на {sum(u['value'] for u in utxos):>14} сатоши")
+
+    if plan["skipped_reason"]:
+        print(f"Консолидация не требуется: {plan['skipped_reason']}")
+        return
+
+    print(f"\nРасписание: {len(plan['transactions'])} транзакций")
+    for number, tx in enumerate(plan["transactions"], 1):
+        print(f"  {number:>3}. {len(tx['utxos']):>5} входов -> 1 выход {tx['output']} сатоши, "
+              f"{tx['vsize']} vB, комиссия {tx['fee']} сатоши")
+
+    savings = plan["savings"]
+    print(f"\nВходов в будущих тратах меньше на {savings['inputs_removed']}: "
+          f"-{savings['future_vsize_saved']:.0f} vB, ~{savings['future_fee_saved']} сатоши "
+          f"по долгосрочной ставке")
+    print(f"Комиссия консолидации сейчас: {savings['fee_paid']} сатоши, "
+          f"чистая экономия: {savings['net_saved']} сатоши")
+    if savings["signing_seconds_saved"] is not None:
+        print(f"Время подписи будущих трат меньше на ~{savings['signing_seconds_saved']:.2f} с")
@@ -0,0 +1,110 @@
+"""
+Оценка размера P2WPKH транзакций и выбор ставки комиссии
+
+До подписи размер оценивается по количеству входов и выходов
+(estimate_vsize), ставка берется из аргумента командной строки или из
+/v1/fees/recommended mempool.space. После подписи комиссия сверяется с
+фактическим весом сериализованной witness-транзакции (check_fee).
+"""
+import math
+
+# Размеры P2WPKH в weight units (1 vbyte = 4 WU)
+TX_OVERHEAD_WEIGHT = 42      # version, locktime, счетчики входов/выходов, marker и flag
+P2WPKH_INPUT_WEIGHT = 272    # outpoint, пустой scriptSig, sequence + witness (подпись до 72 байт, pubkey)
+P2WPKH_OUTPUT_WEIGHT = 124   # value + scriptPubKey (22 байта)
+
+P2WPKH_INPUT_VSIZE = P2WPKH_INPUT_WEIGHT / 4
+P2WPKH_OUTPUT_VSIZE = P2WPKH_OUTPUT_WEIGHT / 4
+
+DUST_LIMIT = 294             # минимальный P2WPKH выход
+MAX_STANDARD_TX_WEIGHT = 400000  # стандартный лимит веса транзакции для ретрансляции
+MIN_RELAY_FEE_RATE = 1.0     # sat/vB, ниже узлы не ретранслируют транзакцию
+
+# Цели подтверждения и соответствующие поля ответа /v1/fees/recommended
+FEE_TARGETS = {
+    "fastest": "fastestFee",
+    "half-hour": "halfHourFee",
+    "hour": "hourFee",
+    "economy": "economyFee",
+    "minimum": "minimumFee",
+}
+DEFAULT_FEE_TARGET = "half-hour"
+
+
+def varint_size(n):
+    """Размер varint для счетчика n"""
+    if n < 0xfd:
+        return 1
+    if n <= 0xffff:
+        return 3
+    if n <= 0xffffffff:
+        return 5
+    return 9
+
+
+def estimate_weight(n_inputs, n_outputs):
+    """Оценка веса P2WPKH транзакции в weight units"""
+    # Счетчики входов и выходов больше одного байта увеличивают базовый размер
+    extra = (varint_size(n_inputs) - 1 + varint_size(n_outputs) - 1) * 4
+    return TX_OVERHEAD_WEIGHT + extra + n_inputs * P2WPKH_INPUT_WEIGHT + n_outputs * P2WPKH_OUTPUT_WEIGHT
+
+
+def estimate_vsize(n_inputs, n_outputs):
+    """Оценка виртуального размера P2WPKH транзакции в vbytes"""
+    return math.ceil(estimate_weight(n_inputs, n_outputs) / 4)
+
+
+def fee_for(vsize, fee_rate):
+    """Комиссия в сатоши для размера vsize при ставке fee_rate sat/vB"""
+    return math.ceil(vsize * fee_rate)
+
+
+def tx_weight(tx):
+    """Фактический вес подписанной транзакции bitcoinutils по ее сериализации"""
+    base_size = len(tx.to_bytes(False))
+    total_size = len(tx.to_bytes(tx.has_segwit))
+    return base_size * 3 + total_size
+
+
+def tx_vsize(tx):
+    """Фактический виртуальный размер подписанной транзакции в vbytes"""
+    return math.ceil(tx_weight(tx) / 4)
+
+
+async def fetch_fee_rate(client, target=DEFAULT_FEE_TARGET):
+    """
+    Ставка из /v1/fees/recommended для цели target (см. FEE_TARGETS)
+
+    Ответ кэшируется клиентом (MempoolClient.get_recommended_fees),
+    поэтому повторные запуски в пределах TTL не обращаются к сети.
+    """
+    fees = await client.get_recommended_fees()
+    return max(float(fees[FEE_TARGETS[target]]), MIN_RELAY_FEE_RATE)
+
+
+async def resolve_fee_rate(client, fee_rate=None, target=DEFAULT_FEE_TARGET):
+    """
+    Ставка комиссии: явно заданная или рекомендованная mempool.space
+
+    Returns:
+        tuple: (ставка sat/vB, источник - "cli" или имя поля рекомендаций)
+    """
+    if fee_rate is not None:
+        return max(float(fee_rate), MIN_RELAY_FEE_RATE), "cli"
+    return await fetch_fee_rate(client, target), FEE_TARGETS[target]
+
+
+def check_fee(tx, fee, fee_rate):
+    """
+    Сверить комиссию с фактическим размером подписанной транзакции
+
+    Оценка P2WPKH входа рассчитана на подпись максимальной длины, поэтому
+    реальный размер обычно на несколько vbytes меньше оценки.
+
+    Returns:
+        dict: {"vsize", "required_fee", "delta"} - delta > 0 означает переплату,
+              delta < 0 - недоплату относительно fee_rate
+    """
+    vsize = tx_vsize(tx)
+    required_fee = fee_for(vsize, fee_rate)
+    return {"vsize": vsize, "required_fee": required_fee, "delta": fee - required_fee}
@@ -0,0 +1,470 @@
+"""
+Массовый вывод адресов HD-кошелька (BIP32/BIP84) и сканирование с gap limit
+
+Промежуточные расширенные ключи (m/84'/coin'/account'/change) кэшируются,
+поэтому каждый адрес диапазона - один шаг публичного вывода от ключа
+цепочки: HMAC-SHA512, сложение точек и hash160. Диапазоны делятся на
+куски и выводятся пулом процессов.
+
+Эллиптическая арифметика - через coincurve (libsecp256k1), если он
+установлен, иначе через ecdsa (примерно на порядок медленнее).
+coincurve - необязательная зависимость: pip install coincurve
+
+Примеры:
+    python hd_derivation.py --xkey vprv... --count 100000 --workers 8 -o addresses.txt
+    python hd_derivation.py --mnemonic "abandon ... about" --network mainnet --count 20
+    python hd_derivation.py --xkey vpub... --scan used_addresses.json --gap-limit 20
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from base58check import b58decode, b58encode
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+    from ecdsa import SECP256k1
+    from ecdsa.ellipticcurve import PointJacobi
+
+HARDENED = 0x80000000
+CURVE_ORDER = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
+FIELD_PRIME = 0xfffffffffffffffffffffffffffffffffffffffffffffffffffffffefffffc2f
+
+# Версии сериализации расширенных ключей: (сеть, приватный ли ключ)
+VERSIONS = {
+    bytes.fromhex("0488ade4"): ("mainnet", True),    # xprv
+    bytes.fromhex("0488b21e"): ("mainnet", False),   # xpub
+    bytes.fromhex("04b2430c"): ("mainnet", True),    # zprv (BIP84)
+    bytes.fromhex("04b24746"): ("mainnet", False),   # zpub (BIP84)
+    bytes.fromhex("04358394"): ("testnet", True),    # tprv
+    bytes.fromhex("043587cf"): ("testnet", False),   # tpub
+    bytes.fromhex("045f18bc"): ("testnet", True),    # vprv (BIP84)
+    bytes.fromhex("045f1cf6"): ("testnet", False),   # vpub (BIP84)
+}
+BIP84_VERSIONS = {
+    ("mainnet", True): bytes.fromhex("04b2430c"),
+    ("mainnet", False): bytes.fromhex("04b24746"),
+    ("testnet", True): bytes.fromhex("045f18bc"),
+    ("testnet", False): bytes.fromhex("045f1cf6"),
+}
+HRP = {"mainnet": "bc", "testnet": "tb"}
+COIN_TYPE = {"mainnet": 0, "testnet": 1}
+
+DEFAULT_GAP_LIMIT = 20
+DEFAULT_BATCH_SIZE = 1000
+
+
+def hash160(data):
+    try:
+        return hashlib.new("ripemd160", hashlib.sha256(data).digest()).digest()
+    except ValueError:
+        # OpenSSL 3 без legacy-провайдера: чистый Python из bitcoinutils
+        from bitcoinutils.ripemd160 import ripemd160
+        return ripemd160(hashlib.sha256(data).digest())
+
+
+def base58check_encode(payload):
+    checksum = hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    return b58encode(payload + checksum).decode()
+
+
+def base58check_decode(text):
+    data = b58decode(text.encode())
+    payload, checksum = data[:-4], data[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Неверная контрольная сумма расширенного ключа")
+    return payload
+
+
+def mnemonic_to_seed(mnemonic, passphrase=""):
+    """Сид BIP39 из мнемоники"""
+    password = unicodedata.normalize("NFKD", mnemonic).encode()
+    salt = ("mnemonic" + unicodedata.normalize("NFKD", passphrase)).encode()
+    return hashlib.pbkdf2_hmac("sha512", password, salt, 2048)
+
+
+# ---------- Эллиптическая арифметика ----------
+
+if coincurve is not None:
+    def pubkey_from_secret(secret):
+        return coincurve.PublicKey.from_secret(secret.to_bytes(32, "big")).format()
+
+    def child_pubkey_deriver(pubkey):
+        """Функция tweak -> сжатый ключ pubkey + tweak*G для одного родителя"""
+        parent = coincurve.PublicKey(pubkey)
+        return lambda tweak: parent.add(tweak.to_bytes(32, "big")).format()
+else:
+    _G = SECP256k1.generator
+
+    def _compress(x, y):
+        return bytes([2 + (y & 1)]) + x.to_bytes(32, "big")
+
+    def _decompress(pubkey):
+        x = int.from_bytes(pubkey[1:], "big")
+        y = pow((pow(x, 3, FIELD_PRIME) + 7) % FIELD_PRIME, (FIELD_PRIME + 1) // 4, FIELD_PRIME)
+        if y & 1 != pubkey[0] & 1:
+            y = FIELD_PRIME - y
+        return x, y
+
+    def pubkey_from_secret(secret):
+        point = (_G * secret).to_affine()
+        return _compress(point.x(), point.y())
+
+    def child_pubkey_deriver(pubkey):
+        """Функция tweak -> сжатый ключ pubkey + tweak*G для одного родителя"""
+        # Родитель разжимается один раз; сложение в аффинных координатах - одно обращение по модулю
+        x1, y1 = _decompress(pubkey)
+
+        def derive(tweak):
+            point = (_G * tweak).to_affine()
+            x2, y2 = point.x(), point.y()
+            if x1 == x2:
+                # Совпадение точек практически невозможно; общий путь ecdsa
+                point = (PointJacobi(SECP256k1.curve, x1, y1, 1) + _G * tweak).to_affine()
+                return _compress(point.x(), point.y())
+            slope = (y2 - y1) * pow(x2 - x1, -1, FIELD_PRIME) % FIELD_PRIME
+            x3 = (slope * slope - x1 - x2) % FIELD_PRIME
+            y3 = (slope * (x1 - x3) - y1) % FIELD_PRIME
+            return _compress(x3, y3)
+        return derive
+
+
+def pubkey_add_tweak(pubkey, tweak):
+    return child_pubkey_deriver(pubkey)(tweak)
+
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+BECH32_GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+
+
+# XOR генераторов для каждого значения старших 5 бит - шаг polymod без внутреннего цикла
+BECH32_TABLE = [0] * 32
+for _top in range(32):
+    for _i in range(5):
+        if (_top >> _i) & 1:
+            BECH32_TABLE[_top] ^= BECH32_GENERATOR[_i]
+
+
+def _bech32_polymod(chk, values):
+    table = BECH32_TABLE
+    for value in values:
+        chk = (chk & 0x1ffffff) << 5 ^ value ^ table[chk >> 25]
+    return chk
+
+
+class P2wpkhEncoder:
+    """
+    Кодирование hash160 в bech32 P2WPKH адрес
+
+    Состояние контрольной суммы для префикса (hrp и версия witness)
+    считается один раз, а 20 байт hash160 - ровно 32 группы по 5 бит.
+    """
+
+    def __init__(self, hrp):
+        self.prefix = hrp + "1" + BECH32_CHARSET[0]
+        expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+        self.state = _bech32_polymod(1, expanded + [0])
+
+    def encode(self, program):
+        n = int.from_bytes(program, "big")
+        data = [(n >> shift) & 31 for shift in range(155, -1, -5)]
+        chk = _bech32_polymod(self.state, data + [0] * 6) ^ 1
+        checksum = [(chk >> 5 * (5 - i)) & 31 for i in range(6)]
+        return self.prefix + "".join(BECH32_CHARSET[d] for d in data + checksum)
+
+
+def p2wpkh_address(pubkey, hrp):
+    return P2wpkhEncoder(hrp).encode(hash160(pubkey))
+
+
+# ---------- BIP32 ----------
+
+class ExtendedKey:
+    """Узел BIP32: приватный (secret) или только публичный ключ и chain code"""
+
+    def __init__(self, chain_code, pubkey, secret=None, depth=0, fingerprint=b"\0" * 4,
+                 child_number=0, network="testnet"):
+        self.chain_code = chain_code
+        self.pubkey = pubkey
+        self.secret = secret
+        self.depth = depth
+        self.fingerprint = fingerprint
+        self.child_number = child_number
+        self.network = network
+
+    @classmethod
+    def from_seed(cls, seed, network="testnet"):
+        digest = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+        secret = int.from_bytes(digest[:32], "big")
+        return cls(digest[32:], pubkey_from_secret(secret), secret, network=network)
+
+    @classmethod
+    def from_string(cls, text):
+        """Разобрать xprv/xpub, tprv/tpub, zprv/zpub или vprv/vpub"""
+        payload = base58check_decode(text.strip())
+        if len(payload) != 78 or payload[:4] not in VERSIONS:
+            raise ValueError("Неподдерживаемый расширенный ключ")
+        network, private = VERSIONS[payload[:4]]
+        chain_code, key = payload[13:45], payload[45:]
+        secret = int.from_bytes(key[1:], "big") if private else None
+        pubkey = pubkey_from_secret(secret) if private else key
+        return cls(chain_code, pubkey, secret, payload[4], payload[5:9],
+                   int.from_bytes(payload[9:13], "big"), network)
+
+    @property
+    def identifier(self):
+        return hash160(self.pubkey)
+
+    def child(self, index):
+        """Дочерний узел (index >= HARDENED - усиленный вывод, нужен приватный ключ)"""
+        if index >= HARDENED:
+            if self.secret is None:
+                raise ValueError("Усиленный вывод невозможен из публичного ключа")
+            data = b"\0" + self.secret.to_bytes(32, "big") + index.to_bytes(4, "big")
+        else:
+            data = self.pubkey + index.to_bytes(4, "big")
+        digest = hmac.new(self.chain_code, data, hashlib.sha512).digest()
+        tweak = int.from_bytes(digest[:32], "big")
+
+        if self.secret is not None:
+            secret = (self.secret + tweak) % CURVE_ORDER
+            pubkey = pubkey_from_secret(secret)
+        else:
+            secret = None
+            pubkey = pubkey_add_tweak(self.pubkey, tweak)
+        return ExtendedKey(digest[32:], pubkey, secret, self.depth + 1, self.identifier[:4],
+                           index, self.network)
+
+    def public(self):
+        return ExtendedKey(self.chain_code, self.pubkey, None, self.depth, self.fingerprint,
+                           self.child_number, self.network)
+
+    def to_string(self, private=None):
+        """Сериализация в формате BIP84 (zprv/zpub, vprv/vpub)"""
+        private = self.secret is not None if private is None else private
+        key = b"\0" + self.secret.to_bytes(32, "big") if private else self.pubkey
+        payload = (BIP84_VERSIONS[(self.network, private)] + bytes([self.depth]) + self.fingerprint
+                   + self.child_number.to_bytes(4, "big") + self.chain_code + key)
+        return base58check_encode(payload)
+
+
+def _derive_chunk(pubkey, chain_code, hrp, start, stop):
+    """Адреса [start, stop) цепочки: по одному шагу публичного вывода на адрес"""
+    derive = child_pubkey_deriver(pubkey)
+    encoder = P2wpkhEncoder(hrp)
+    addresses = []
+    for index in range(start, stop):
+        digest = hmac.new(chain_code, pubkey + index.to_bytes(4, "big"), hashlib.sha512).digest()
+        addresses.append(encoder.encode(hash160(derive(int.from_bytes(digest[:32], "big")))))
+    return addresses
+
+
+class AddressDeriver:
+    """
+    Вывод диапазонов адресов BIP84 с кэшем промежуточных ключей
+
+    Пример:
+        with AddressDeriver(ExtendedKey.from_string("vprv..."), workers=8) as deriver:
+            addresses = deriver.derive_range(0, 100000)
+            result = deriver.scan(used_addresses)
+    """
+
+    def __init__(self, root, account=0, workers=None, chunk_size=2000):
+        """
+        Args:
+            root: ExtendedKey - мастер-ключ (depth 0) или ключ аккаунта m/84'/coin'/account'
+            account: номер аккаунта (если root - мастер-ключ)
+            workers: количество процессов (None - os.cpu_count(), 1 - без пула)
+            chunk_size: адресов на одну задачу пула
+        """
+        self.root = root
+        self.hrp = HRP[root.network]
+        self.account_path = ((84 + HARDENED, COIN_TYPE[root.network] + HARDENED, account + HARDENED)
+                             if root.depth == 0 else ())
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.nodes = {(): root}
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def node(self, path):
+        """Узел по пути (кортеж индексов от root) с выводом от ближайшего кэшированного предка"""
+        path = tuple(path)
+        depth = len(path)
+        while path[:depth] not in self.nodes:
+            depth -= 1
+        node = self.nodes[path[:depth]]
+        for i in range(depth, len(path)):
+            node = node.child(path[i])
+            self.nodes[path[:i + 1]] = node
+        return node
+
+    def chain(self, change=0):
+        """Ключ цепочки: 0 - адреса получения, 1 - сдачи"""
+        return self.node(self.account_path + (change,))
+
+    def derive_range(self, start, count, change=0):
+        """
+        Адреса start..start+count-1 цепочки change
+
+        Returns:
+            list: адреса bech32 в порядке индексов
+        """
+        chain = self.chain(change)
+        bounds = [(i, min(i + self.chunk_size, start + count))
+                  for i in range(start, start + count, self.chunk_size)]
+        if self.workers == 1 or len(bounds) == 1:
+            chunks = (_derive_chunk(chain.pubkey, chain.chain_code, self.hrp, lo, hi) for lo, hi in bounds)
+        else:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers)
+            n = len(bounds)
+            chunks = self.pool.map(_derive_chunk, [chain.pubkey] * n, [chain.chain_code] * n,
+                                   [self.hrp] * n, [lo for lo, _ in bounds], [hi for _, hi in bounds])
+        addresses = []
+        for chunk in chunks:
+            addresses.extend(chunk)
+        return addresses
+
+    def scan(self, used, gap_limit=DEFAULT_GAP_LIMIT, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Найти использованные адреса обеих цепочек с учетом gap limit
+
+        Цепочка сканируется пакетами по batch_size адресов, пока после
+        последнего использованного адреса не наберется gap_limit неиспользованных.
+
+        Args:
+            used: множество (или любой контейнер) использованных адресов
+
+        Returns:
+            dict: {change: {"used": [(index, address), ...], "next_index", "derived"}}
+        """
+        result = {}
+        for change in (0, 1):
+            found = []
+            last_used = -1
+            start = 0
+            exhausted = False
+            while not exhausted:
+                batch = self.derive_range(start, max(batch_size, gap_limit), change)
+                for index, address in enumerate(batch, start):
+                    if index - last_used > gap_limit:
+                        # gap_limit подряд неиспользованных адресов - дальше не смотрим
+                        exhausted = True
+                        break
+                    if address in used:
+                        found.append((index, address))
+                        last_used = index
+                start += len(batch)
+            result[change] = {"used": found, "next_index": last_used + 1, "derived": start}
+        return result
+
+
+def load_used_addresses(path):
+    """
+    Локальный индекс использованных адресов
+
+    Поддерживаются: база address_sync.sqlite (адреса с транзакциями), JSON
+    (список адресов, список объектов с "address" или объект с адресами в ключах,
+    например экспорт Electrum) и текстовый файл по адресу в строке.
+    """
+    if path.endswith(".sqlite"):
+        db = sqlite3.connect(path)
+        try:
+            rows = db.execute("SELECT address FROM addresses WHERE tx_count > 0").fetchall()
+        finally:
+            db.close()
+        return {address.lower() for address, in rows}
+
+    with open(path, 'r') as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+            if isinstance(data, dict):
+                items = data.keys()
+            else:
+                items = (item["address"] if isinstance(item, dict) else item for item in data)
+        else:
+            items = (line.strip() for line in f if line.strip())
+        return {address.lower() for address in items}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вывод адресов BIP84 и сканирование с gap limit")
+    key = parser.add_mutually_exclusive_group(required=True)
+    key.add_argument("--xkey", help="Расширенный ключ: мастер или аккаунта (xprv/tprv/zprv/vprv, *pub)")
+    key.add_argument("--seed", help="Сид в hex")
+    key.add_argument("--mnemonic", help="Мнемоника BIP39")
+    parser.add_argument("--passphrase", default="", help="Пароль BIP39")
+    parser.add_argument("--network", choices=list(HRP), default="testnet", help="Сеть для --seed/--mnemonic")
+    parser.add_argument("--account", type=int, default=0)
+    parser.add_argument("--change", type=int, choices=[0, 1], default=0, help="0 - получение, 1 - сдача")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--workers", type=int, help="Процессов (по умолчанию - по числу CPU)")
+    parser.add_argument("-o", "--output", help="Сохранить адреса в файл (index address)")
+    parser.add_argument("--scan", metavar="INDEX", help="Сканировать по индексу использованных адресов")
+    parser.add_argument("--gap-limit", type=int, default=DEFAULT_GAP_LIMIT)
+    args = parser.parse_args()
+
+    if args.xkey:
+        root = ExtendedKey.from_string(args.xkey)
+    else:
+        seed = bytes.fromhex(args.seed) if args.seed else mnemonic_to_seed(args.mnemonic, args.passphrase)
+        root = ExtendedKey.from_seed(seed, args.network)
+
+    backend = "coincurve" if coincurve is not None else "ecdsa"
+    with AddressDeriver(root, args.account, args.workers) as deriver:
+        account = deriver.node(deriver.account_path)
+        print(f"Аккаунт: {account.public().to_string()} ({backend}, процессов: {deriver.workers})")
+
+        if args.scan:
+            used = load_used_addresses(args.scan)
+            start = time.perf_counter()
+            result = deriver.scan(used, args.gap_limit)
+            elapsed = time.perf_counter() - start
+            for change, chain in result.items():
+                title = "сдачи" if change else "получения"
+                print(f"\nЦепочка {title}: использовано {len(chain['used'])}, "
+                      f"следующий индекс {chain['next_index']}, выведено {chain['derived']}")
+                for index, address in chain["used"]:
+                    print(f"  {index:>7} {address}")
+            print(f"\nСканирование заняло {elapsed:.2f} с")
+            return
+
+        start = time.perf_counter()
+        addresses = deriver.derive_range(args.start, args.count, args.change)
+        elapsed = time.perf_counter() - start
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            for index, address in enumerate(addresses, args.start):
+                f.write(f"{index} {address}\n")
+        print(f"Сохранено в {args.output}")
+    else:
+        for index, address in enumerate(addresses[:20], args.start):
+            print(f"{index:>7} {address}")
+        if len(addresses) > 20:
+            print(f"... и еще {len(addresses) - 20}")
+    print(f"Выведено {len(addresses)} адресов за {elapsed:.2f} с ({len(addresses) / elapsed:.0f} адр/с)")
+
+
+if __name__ == "__main__":
+    main()
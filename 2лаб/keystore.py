@@ -0,0 +1,209 @@
+"""
+Индексированное хранилище WIF-ключей
+
+Загружает экспорт приватных ключей Electrum ({address: "p2wpkh:WIF"}) и
+другие JSON-дампы (список {"address", "wif"} или пар [address, wif]) в
+хэш-индексы по нормализованному адресу и по hash160 из адреса, поэтому
+поиск ключа - O(1) независимо от количества ключей. Публичные ключи
+выводятся из WIF один раз и кэшируются; массовая проверка соответствия
+WIF -> адрес выполняется пулом процессов.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from bitcoinutils.keys import P2pkhAddress, P2shAddress, P2wpkhAddress, PrivateKey
+from bitcoinutils.setup import get_network, setup
+
+BECH32_PREFIXES = ("bc1", "tb1", "bcrt1")
+DEFAULT_SCRIPT_TYPE = "p2wpkh"
+
+
+def normalize_address(address):
+    """bech32 адреса не зависят от регистра и приводятся к нижнему; base58 остаются как есть"""
+    address = address.strip()
+    if address.lower().startswith(BECH32_PREFIXES):
+        return address.lower()
+    return address
+
+
+def split_wif(value):
+    """'p2wpkh:WIF' -> ('p2wpkh', 'WIF'); WIF без префикса - тип по умолчанию"""
+    if ":" in value:
+        script_type, wif = value.split(":", 1)
+        return script_type, wif
+    return None, value
+
+
+def address_hash160(address):
+    """hash160 из адреса: хэш ключа для P2WPKH/P2PKH, хэш скрипта для P2SH"""
+    if address.startswith(BECH32_PREFIXES):
+        return P2wpkhAddress(address).to_witness_program()
+    if address[0] in "23":
+        return P2shAddress(address).to_hash160()
+    return P2pkhAddress(address).to_hash160()
+
+
+def derive_address(wif, script_type=DEFAULT_SCRIPT_TYPE):
+    """
+    Адрес и публичный ключ, выведенные из WIF
+
+    Returns:
+        tuple: (адрес, публичный ключ в hex)
+    """
+    pub = PrivateKey(wif).get_public_key()
+    if script_type == "p2pkh":
+        address = pub.get_address()
+    elif script_type == "p2wpkh-p2sh":
+        address = P2shAddress.from_script(pub.get_segwit_address().to_script_pub_key())
+    else:
+        address = pub.get_segwit_address()
+    return address.to_string(), pub.to_hex()
+
+
+def _init_worker(network):
+    setup(network)
+
+
+def _derive_chunk(entries):
+    results = []
+    for address, wif, script_type in entries:
+        try:
+            results.append((address,) + derive_address(wif, script_type))
+        except Exception as e:
+            results.append((address, None, str(e)))
+    return results
+
+
+class Keystore:
+    """
+    Ключи с индексами по адресу и hash160
+
+    Пример:
+        store = Keystore.from_file("electrum_keys.json")
+        entry = store.lookup("tb1q...")
+        pub_hex = store.public_key("tb1q...")
+        mismatches = store.verify_all(workers=4)
+    """
+
+    def __init__(self):
+        self.by_address = {}
+        self.by_hash160 = {}
+        self.pubkeys = {}
+
+    def __len__(self):
+        return len(self.by_address)
+
+    def __contains__(self, address):
+        return normalize_address(address) in self.by_address
+
+    @classmethod
+    def from_file(cls, path):
+        store = cls()
+        store.load(path)
+        return store
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls()
+        store.add_many(data)
+        return store
+
+    def load(self, path):
+        """Загрузить JSON-файл экспорта; возвращает количество добавленных ключей"""
+        with open(path, 'r') as f:
+            return self.add_many(json.load(f))
+
+    def add_many(self, data):
+        """
+        Добавить ключи из распарсенного JSON
+
+        Поддерживаются: {address: "тип:WIF"} (Electrum), [{"address", "wif"|"privkey",
+        "type"}], [[address, "тип:WIF"], ...].
+        """
+        if isinstance(data, dict):
+            items = data.items()
+        else:
+            items = (
+                (item["address"], item.get("wif") or item["privkey"], item.get("type"))
+                if isinstance(item, dict) else item
+                for item in data
+            )
+
+        count = 0
+        for item in items:
+            address, wif = item[0], item[1]
+            script_type = item[2] if len(item) > 2 else None
+            self.add(address, wif, script_type)
+            count += 1
+        return count
+
+    def add(self, address, wif, script_type=None):
+        """Добавить ключ; тип берется из префикса 'тип:WIF' или script_type"""
+        prefix, wif = split_wif(wif)
+        address = normalize_address(address)
+        entry = {
+            "address": address,
+            "wif": wif.strip(),
+            "script_type": prefix or script_type or DEFAULT_SCRIPT_TYPE,
+            "hash160": address_hash160(address),
+        }
+        self.by_address[address] = entry
+        self.by_hash160[entry["hash160"]] = entry
+        return entry
+
+    def lookup(self, address):
+        """Запись {"address", "wif", "script_type", "hash160"} или None"""
+        return self.by_address.get(normalize_address(address))
+
+    def lookup_hash160(self, hash160):
+        """Поиск по hash160 (hex), например из scriptPubKey P2WPKH выхода"""
+        return self.by_hash160.get(hash160.lower())
+
+    def public_key(self, address):
+        """Публичный ключ (hex) для адреса; выводится из WIF один раз"""
+        address = normalize_address(address)
+        if address not in self.pubkeys:
+            entry = self.by_address[address]
+            self.pubkeys[address] = PrivateKey(entry["wif"]).get_public_key().to_hex()
+        return self.pubkeys[address]
+
+    def verify(self, address):
+        """Проверить, что WIF соответствует адресу"""
+        entry = self.lookup(address)
+        if entry is None:
+            return False
+        derived, pub_hex = derive_address(entry["wif"], entry["script_type"])
+        self.pubkeys[entry["address"]] = pub_hex
+        return normalize_address(derived) == entry["address"]
+
+    def verify_all(self, workers=None):
+        """
+        Проверить все пары WIF -> адрес пулом процессов
+
+        Выведенные публичные ключи попадают в кэш.
+
+        Returns:
+            list: [(адрес, выведенный адрес или текст ошибки), ...] для несовпадений
+        """
+        entries = [(e["address"], e["wif"], e["script_type"]) for e in self.by_address.values()]
+        workers = workers or os.cpu_count() or 1
+        size = max(1, -(-len(entries) // (workers * 4)))
+        chunks = [entries[i:i + size] for i in range(0, len(entries), size)]
+
+        if workers == 1:
+            return self._collect(map(_derive_chunk, chunks))
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(get_network(),)) as pool:
+            return self._collect(pool.map(_derive_chunk, chunks))
+
+    def _collect(self, chunk_results):
+        mismatches = []
+        for results in chunk_results:
+            for address, derived, pub_or_error in results:
+                if derived is None:
+                    mismatches.append((address, pub_or_error))
+                    continue
+                self.pubkeys[address] = pub_or_error
+                if normalize_address(derived) != address:
+                    mismatches.append((address, derived))
+        return mismatches
@@ -0,0 +1,132 @@
+"""
+Пакетные выплаты: много получателей в одной транзакции
+
+Список выплат читается из CSV (address,amount) или JSONL
+({"address": ..., "amount": ...}), суммы в сатоши. Выплаты собираются
+в одну транзакцию или, если она превышает лимит веса, в минимальный
+набор транзакций: каждая партия получает столько выходов, сколько
+помещается вместе с выбранными для нее входами.
+"""
+import csv
+import json
+import math
+
+from coin_selection import select_coins
+from fees import (
+    DUST_LIMIT, MAX_STANDARD_TX_WEIGHT, P2WPKH_INPUT_WEIGHT, P2WPKH_OUTPUT_WEIGHT, TX_OVERHEAD_WEIGHT,
+    estimate_weight,
+)
+from tx_builder import check_address
+
+
+def load_payouts(path):
+    """
+    Прочитать выплаты из CSV или JSONL
+
+    CSV может начинаться со строки заголовка (address,amount). Адреса
+    проверяются для сети, выбранной bitcoinutils.setup.setup().
+
+    Returns:
+        list: [(адрес, сумма в сатоши), ...] в порядке файла
+
+    Raises:
+        ValueError: некорректная строка, неверный адрес или сумма меньше DUST_LIMIT
+    """
+    payouts = []
+    with open(path, 'r', newline='') as f:
+        if path.endswith(".jsonl") or path.endswith(".ndjson"):
+            rows = ((json.loads(line), n) for n, line in enumerate(f, 1) if line.strip())
+            rows = (((row["address"], row["amount"]), n) for row, n in rows)
+        else:
+            rows = ((row, n) for n, row in enumerate(csv.reader(f), 1) if row)
+
+        for row, line_no in rows:
+            if len(row) < 2:
+                raise ValueError(f"{path}:{line_no}: ожидается address,amount")
+            address, amount = str(row[0]).strip(), str(row[1]).strip()
+            if line_no == 1 and amount.lower() == "amount":
+                continue
+            if not amount.isdigit():
+                raise ValueError(f"{path}:{line_no}: сумма должна быть целым числом сатоши: {amount}")
+            if int(amount) < DUST_LIMIT:
+                raise ValueError(f"{path}:{line_no}: сумма {amount} меньше порога dust {DUST_LIMIT}")
+            try:
+                check_address(address)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: {e}") from None
+            payouts.append((address, int(amount)))
+    return payouts
+
+
+def max_outputs_for(max_weight, n_inputs=1):
+    """Сколько выходов получателей помещается в max_weight вместе с n_inputs входами и сдачей"""
+    # estimate_weight(n_inputs, 1) учитывает выход сдачи; 16 WU - запас на трехбайтовые счетчики
+    free = max_weight - estimate_weight(n_inputs, 1) - 16
+    return max(1, free // P2WPKH_OUTPUT_WEIGHT)
+
+
+def plan_payouts(utxos, payouts, fee_rate, strategy="auto", max_weight=MAX_STANDARD_TX_WEIGHT):
+    """
+    Разбить выплаты на минимальное количество транзакций в пределах max_weight
+
+    Для каждой партии выполняется один подбор UTXO на сумму всех ее выплат;
+    если выбранные входы не помещаются в лимит, партия уменьшается на
+    вытесняемое ими количество выходов. Использованные UTXO исключаются
+    из подбора для следующих партий.
+
+    Returns:
+        list: [{"payouts": [...], "selection": результат select_coins}, ...]
+
+    Raises:
+        ValueError: средств недостаточно или входы одной выплаты превышают лимит
+    """
+    remaining = list(utxos)
+    batches = []
+    start = 0
+
+    while start < len(payouts):
+        size = min(len(payouts) - start, max_outputs_for(max_weight))
+        while True:
+            chunk = payouts[start:start + size]
+            target = sum(amount for _, amount in chunk)
+            selection = select_coins(remaining, target, fee_rate, strategy, n_outputs=len(chunk),
+                                     max_weight=max_weight)
+            if selection is None:
+                # В лимит не помещается: подбор без лимита показывает, сколько входов нужно
+                selection = select_coins(remaining, target, fee_rate, strategy, n_outputs=len(chunk),
+                                         max_weight=None)
+            if selection is None:
+                raise ValueError(f"Недостаточно средств для выплат {start + 1}-{start + len(chunk)} "
+                                 f"на сумму {target} сатоши при ставке {fee_rate} sat/vB")
+
+            n_inputs = len(selection["utxos"])
+            n_outputs = len(chunk) + (1 if selection["change"] else 0)
+            weight = estimate_weight(n_inputs, n_outputs)
+            if weight <= max_weight:
+                break
+            if size == 1:
+                raise ValueError(f"Выплата {start + 1} требует {n_inputs} входов и не помещается "
+                                 f"в {max_weight} WU")
+            # Входы не помещаются: освобождаем место, убирая выходы
+            excess = weight - max_weight
+            size = max(1, min(size - 1, max_outputs_for(max_weight, n_inputs),
+                              size - math.ceil(excess / P2WPKH_OUTPUT_WEIGHT)))
+
+        batches.append({"payouts": chunk, "selection": selection})
+        spent = {(utxo["txid"], int(utxo["vout"])) for utxo in selection["utxos"]}
+        remaining = [utxo for utxo in remaining if (utxo["txid"], int(utxo["vout"])) not in spent]
+        start += len(chunk)
+
+    return batches
+
+
+def separate_vsize(n_payouts, n_inputs):
+    """
+    Нижняя оценка суммарного vsize при отдельной транзакции на каждого получателя
+
+    Каждая такая транзакция тратит хотя бы один вход и создает выход
+    получателю и сдачу; все входы пакетных транзакций тоже пришлось бы потратить.
+    """
+    weight = (n_payouts * (TX_OVERHEAD_WEIGHT + 2 * P2WPKH_OUTPUT_WEIGHT)
+              + max(n_payouts, n_inputs) * P2WPKH_INPUT_WEIGHT)
+    return math.ceil(weight / 4)
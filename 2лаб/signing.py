@@ -0,0 +1,177 @@
+"""
+Параллельная подпись P2WPKH входов
+
+bitcoinutils в sign_segwit_input() для каждого входа заново хэширует все
+входы и выходы (hashPrevouts, hashSequence, hashOutputs из BIP143), поэтому
+подпись n входов стоит O(n^2). Здесь эти хэши считаются один раз на
+транзакцию (Bip143Midstate), дайджесты входов - за O(n), а сами подписи
+ECDSA раздаются пулу процессов.
+
+Подпись детерминированная (RFC6979, low-R, low-S) и выполняется той же
+функцией PrivateKey._sign_input, поэтому результат побайтно совпадает с
+последовательной подписью через sign_segwit_input().
+"""
+import hashlib
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitcoinutils.constants import SIGHASH_ALL
+from bitcoinutils.keys import PrivateKey
+from bitcoinutils.setup import get_network, setup
+from bitcoinutils.transactions import TxWitnessInput
+
+from tx_builder import p2wpkh_script_code
+
+# Меньше этого количества входов запуск пула дороже самой подписи
+MIN_PARALLEL_INPUTS = 16
+
+
+def hash256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def encode_varint(n):
+    if n < 0xfd:
+        return struct.pack("<B", n)
+    if n <= 0xffff:
+        return b"\xfd" + struct.pack("<H", n)
+    if n <= 0xffffffff:
+        return b"\xfe" + struct.pack("<I", n)
+    return b"\xff" + struct.pack("<Q", n)
+
+
+def outpoint(txin):
+    return bytes.fromhex(txin.txid)[::-1] + struct.pack("<I", txin.txout_index)
+
+
+class Bip143Midstate:
+    """
+    Общие для всех входов части BIP143 дайджеста (SIGHASH_ALL)
+
+    hashPrevouts, hashSequence и hashOutputs зависят только от транзакции,
+    поэтому считаются один раз, а дайджест каждого входа добавляет к ним
+    outpoint, scriptCode, сумму и sequence этого входа.
+    """
+
+    def __init__(self, tx):
+        self.tx = tx
+        self.hash_prevouts = hash256(b"".join(outpoint(txin) for txin in tx.inputs))
+        self.hash_sequence = hash256(b"".join(txin.sequence for txin in tx.inputs))
+        self.hash_outputs = hash256(b"".join(txout.to_bytes() for txout in tx.outputs))
+        self.prefix = tx.version + self.hash_prevouts + self.hash_sequence
+        self.suffix = self.hash_outputs + tx.locktime + struct.pack("<i", SIGHASH_ALL)
+
+    def digest(self, txin_index, script_code, amount):
+        """Дайджест входа txin_index, совпадающий с Transaction.get_transaction_segwit_digest()"""
+        txin = self.tx.inputs[txin_index]
+        script_bytes = script_code.to_bytes()
+        preimage = (self.prefix + outpoint(txin)
+                    + encode_varint(len(script_bytes)) + script_bytes
+                    + struct.pack("<q", amount) + txin.sequence + self.suffix)
+        return hash256(preimage)
+
+
+_worker_key = None
+
+
+def _init_worker(network, wif):
+    """Инициализация процесса пула: сеть и ключ создаются один раз на процесс"""
+    global _worker_key
+    setup(network)
+    _worker_key = PrivateKey(wif)
+
+
+def _sign_digests(digests):
+    return [_worker_key._sign_input(digest, SIGHASH_ALL) for digest in digests]
+
+
+def _chunks(items, n):
+    size = -(-len(items) // n)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class InputSigner:
+    """
+    Подпись всех входов транзакции одним ключом с пулом процессов
+
+    Пул создается при первой параллельной подписи и переиспользуется
+    (например, при переподписи после корректировки комиссии).
+
+    Пример:
+        with InputSigner(priv, workers=4) as signer:
+            signer.sign(tx, utxos)
+    """
+
+    def __init__(self, priv, workers=None, min_parallel=MIN_PARALLEL_INPUTS):
+        """
+        Args:
+            priv: bitcoinutils PrivateKey
+            workers: количество процессов (None - os.cpu_count(), 1 - без пула)
+            min_parallel: минимальное количество входов для использования пула
+        """
+        self.priv = priv
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=(get_network(), self.priv.to_wif()),
+            )
+        return self.pool
+
+    def signatures(self, tx, utxos):
+        """
+        Подписи входов tx в порядке входов
+
+        Args:
+            tx: неподписанная транзакция bitcoinutils
+            utxos: потраченные UTXO в порядке входов (нужны суммы)
+
+        Returns:
+            list: подписи в hex (DER + байт SIGHASH_ALL)
+        """
+        script_code = p2wpkh_script_code(self.priv.get_public_key())
+        midstate = Bip143Midstate(tx)
+        digests = [midstate.digest(idx, script_code, int(utxo["value"]))
+                   for idx, utxo in enumerate(utxos)]
+
+        if self.workers == 1 or len(digests) < self.min_parallel:
+            return [self.priv._sign_input(digest, SIGHASH_ALL) for digest in digests]
+
+        # Куски по числу процессов: ключ и сеть не передаются с каждым входом
+        chunks = _chunks(digests, self.workers)
+        signatures = []
+        for part in self._get_pool().map(_sign_digests, chunks):
+            signatures.extend(part)
+        return signatures
+
+    def sign(self, tx, utxos):
+        """Подписать все входы и заполнить tx.witnesses"""
+        pub_hex = self.priv.get_public_key().to_hex()
+        tx.witnesses = [TxWitnessInput([sig, pub_hex]) for sig in self.signatures(tx, utxos)]
+        return tx
+
+
+def measure_signing_time(priv, samples=20):
+    """Среднее время подписи одного входа в секундах (для оценок в отчетах)"""
+    digests = [hash256(i.to_bytes(4, "little")) for i in range(samples)]
+    start = time.perf_counter()
+    for digest in digests:
+        priv._sign_input(digest, SIGHASH_ALL)
+    return (time.perf_counter() - start) / samples
@@ -0,0 +1,114 @@
+"""
+Сборка и подпись P2WPKH транзакций из выбранных UTXO
+
+Комиссия, рассчитанная до подписи по оценке размера, после подписи
+сверяется с фактическим размером (fees.check_fee). Разница переносится
+в сдачу и транзакция переподписывается, поэтому итоговая ставка точно
+равна целевой: без переплаты за завышенную оценку и без недоплаты.
+"""
+from bitcoinutils.keys import P2wpkhAddress
+from bitcoinutils.script import Script
+from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
+
+from fees import DUST_LIMIT, check_fee
+
+MAX_FEE_ADJUSTMENTS = 3
+
+
+def check_address(address):
+    """
+    Проверить P2WPKH адрес текущей сети (после bitcoinutils.setup.setup)
+
+    Raises:
+        ValueError: адрес не разбирается как P2WPKH этой сети
+    """
+    try:
+        P2wpkhAddress(address)
+    except ValueError:
+        raise ValueError(f"неверный P2WPKH адрес: {address}") from None
+
+
+def p2wpkh_script_code(pub):
+    """scriptCode для подписи P2WPKH входа (BIP143)"""
+    return Script(["OP_DUP", "OP_HASH160", pub.to_hash160(), "OP_EQUALVERIFY", "OP_CHECKSIG"])
+
+
+def build_tx(utxos, payments, change_address=None, change=0):
+    """
+    Неподписанная транзакция
+
+    Args:
+        utxos: выбранные UTXO ({"txid", "vout", "value"})
+        payments: список (адрес, сумма в сатоши)
+        change_address: адрес сдачи
+        change: сумма сдачи (0 - без выхода сдачи)
+    """
+    tx_inputs = [TxInput(utxo["txid"], int(utxo["vout"])) for utxo in utxos]
+    outputs = [TxOutput(int(amount), P2wpkhAddress(address).to_script_pub_key())
+               for address, amount in payments]
+    if change > 0:
+        outputs.append(TxOutput(change, P2wpkhAddress(change_address).to_script_pub_key()))
+    return Transaction(tx_inputs, outputs, has_segwit=True)
+
+
+def sign_tx(tx, priv, utxos, signer=None):
+    """
+    Подписать все входы одним ключом (все UTXO принадлежат одному P2WPKH адресу)
+
+    signer - signing.InputSigner для подписи с общими хэшами BIP143 и пулом
+    процессов; без него входы подписываются последовательно через bitcoinutils.
+    """
+    if signer is not None:
+        return signer.sign(tx, utxos)
+
+    pub = priv.get_public_key()
+    pub_hex = pub.to_hex()
+    script_code = p2wpkh_script_code(pub)
+
+    tx.witnesses = []
+    for idx, utxo in enumerate(utxos):
+        sig = priv.sign_segwit_input(tx, idx, script_code, int(utxo["value"]))
+        tx.witnesses.append(TxWitnessInput([sig, pub_hex]))
+    return tx
+
+
+def build_signed_tx(priv, utxos, payments, fee, fee_rate, change_address=None, change=0,
+                    signer=None):
+    """
+    Собрать и подписать транзакцию, сверив комиссию с фактическим размером
+
+    Если есть сдача, разница между оценочной и требуемой комиссией
+    переносится в нее. Без сдачи излишек остается майнерам, а недоплата
+    считается ошибкой.
+
+    Returns:
+        dict: {"tx", "fee", "change", "vsize", "estimated_fee"}
+
+    Raises:
+        ValueError: комиссия ниже fee_rate для фактического размера
+    """
+    estimated_fee = fee
+    for _ in range(MAX_FEE_ADJUSTMENTS):
+        tx = sign_tx(build_tx(utxos, payments, change_address, change), priv, utxos, signer)
+        check = check_fee(tx, fee, fee_rate)
+        delta = check["delta"]
+        if delta == 0 or not change or change + delta < DUST_LIMIT:
+            break
+        # Размер выхода не зависит от суммы: меняем только сдачу и переподписываем
+        change += delta
+        fee = check["required_fee"]
+    else:
+        tx = sign_tx(build_tx(utxos, payments, change_address, change), priv, utxos, signer)
+        check = check_fee(tx, fee, fee_rate)
+
+    if check["delta"] < 0:
+        raise ValueError(f"Комиссия {fee} сатоши меньше требуемой {check['required_fee']} "
+                         f"для {check['vsize']} vB при {fee_rate} sat/vB")
+
+    return {
+        "tx": tx,
+        "fee": fee,
+        "change": change,
+        "vsize": check["vsize"],
+        "estimated_fee": estimated_fee,
+    }
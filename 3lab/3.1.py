@@ -1,7 +1,61 @@
 from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException
-import json
+import os
+import sys
 from decimal import Decimal
 
+from rpc_batch import BatchRPC
+from utxo_export import UtxoExporter, read_export
+from utxo_set import UtxoSet
+
+SATOSHI_PER_BTC = 100000000
+EXPORT_CHUNK_ADDRESSES = 1000  # адресов в одном listunspent при экспорте
+
+
+def btc_to_sat(amount):
+    """Сумма в BTC (Decimal из JSON-RPC, строка или float) в целые сатоши без потери точности"""
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int(amount * SATOSHI_PER_BTC)
+
+
+def summarize_unspent(address, unspent):
+    """
+    Сумма UTXO адреса из ответа listunspent
+    
+    Returns:
+        dict: {'address', 'total_btc', 'total_satoshis', 'utxo_count', 'utxos'}
+    """
+    total_satoshis = 0
+    utxos = []
+    
+    for tx in unspent:
+        # Проверяем, что UTXO принадлежит нашему адресу
+        if tx['address'] == address:
+            amount_sat = btc_to_sat(tx['amount'])
+            total_satoshis += amount_sat
+            
+            utxo_info = {
+                'txid': tx['txid'],
+                'vout': tx['vout'],
+                'amount_btc': float(tx['amount']),
+                'amount_sat': amount_sat,
+                'confirmations': tx['confirmations'],
+                'spendable': tx['spendable'],
+                'safe': tx.get('safe', True)
+            }
+            utxos.append(utxo_info)
+    
+    total_btc = Decimal(total_satoshis) / Decimal('1e8')
+    
+    return {
+        'address': address,
+        'total_btc': total_btc,
+        'total_satoshis': total_satoshis,
+        'utxo_count': len(utxos),
+        'utxos': utxos
+    }
+
+
 class BitcoinWalletAnalyzer:
     def __init__(self, rpc_user, rpc_password, rpc_host='127.0.0.1', rpc_port=8332, wallet_name=''):
         """
@@ -27,11 +81,14 @@ class BitcoinWalletAnalyzer:
             self.rpc_url = f"http://{rpc_user}:{rpc_password}@{rpc_host}:{rpc_port}/"
         
         self.rpc_connection = None
+        self.batch_rpc = None
     
     def connect(self):
         """Установить соединение с Bitcoin Core"""
         try:
             self.rpc_connection = AuthServiceProxy(self.rpc_url)
+            # Пакетные вызовы идут по отдельному постоянному соединению
+            self.batch_rpc = BatchRPC(self.rpc_url)
             # Проверяем соединение
             info = self.rpc_connection.getblockchaininfo()
             print(f"✓ Подключено к {info['chain']} сети")
@@ -58,39 +115,8 @@ class BitcoinWalletAnalyzer:
         try:
             # Получаем все непотраченные выходы
             unspent = self.rpc_connection.listunspent(0, 9999999, [address])
+            return summarize_unspent(address, unspent)
             
-            total_satoshis = 0
-            utxos = []
-            
-            for tx in unspent:
-                # Проверяем, что UTXO принадлежит нашему адресу
-                if tx['address'] == address:
-                    amount_sat = int(Decimal(tx['amount']) * Decimal('1e8'))
-                    total_satoshis += amount_sat
-                    
-                    utxo_info = {
-                        'txid': tx['txid'],
-                        'vout': tx['vout'],
-                        'amount_btc': float(tx['amount']),
-                        'amount_sat': amount_sat,
-                        'confirmations': tx['confirmations'],
-                        'spendable': tx['spendable'],
-                        'safe': tx.get('safe', True)
-                    }
-                    utxos.append(utxo_info)
-            
-            total_btc = Decimal(total_satoshis) / Decimal('1e8')
-            
-            result = {
-                'address': address,
-                'total_btc': total_btc,
-                'total_satoshis': total_satoshis,
-                'utxo_count': len(utxos),
-                'utxos': utxos
-            }
-            
-            return result
-            
         except JSONRPCException as e:
             print(f"✗ RPC ошибка: {e}")
             return None
@@ -98,6 +124,122 @@ class BitcoinWalletAnalyzer:
             print(f"✗ Ошибка: {e}")
             return None
     
+    def analyze_addresses(self, addresses):
+        """
+        Суммы UTXO для списка адресов за один сетевой запрос
+        
+        Вызовы listunspent для всех адресов отправляются одним JSON-RPC
+        пакетом; ошибка по одному адресу (например, неверный адрес) не
+        влияет на остальные.
+        
+        Args:
+            addresses: список Bitcoin адресов
+        
+        Returns:
+            dict: {адрес: результат как у get_address_utxo_sum или None при ошибке}
+        """
+        if not self.batch_rpc:
+            print("Сначала установите соединение с помощью метода connect()")
+            return None
+        
+        addresses = list(dict.fromkeys(addresses))
+        pending = [self.batch_rpc.queue('listunspent', 0, 9999999, [address])
+                   for address in addresses]
+        try:
+            self.batch_rpc.flush()
+        except Exception as e:
+            print(f"✗ Ошибка пакетного запроса: {e}")
+            return None
+        
+        results = {}
+        for address, item in zip(addresses, pending):
+            if item.error is not None:
+                print(f"✗ RPC ошибка для {address}: {item.error.get('message')}")
+                results[address] = None
+            else:
+                results[address] = summarize_unspent(address, item.result)
+        return results
+    
+    def get_wallet_utxo_summary(self, min_conf=0, addresses=None):
+        """
+        Агрегаты UTXO по всем адресам кошелька одним вызовом listunspent
+        
+        Стоимость O(количество UTXO) вместо одного RPC на адрес. Ответ
+        переводится в компактный UtxoSet, агрегаты считаются по его столбцам.
+        
+        Args:
+            min_conf: минимальное количество подтверждений
+            addresses: ограничить отчет этими адресами (None - весь кошелек)
+        
+        Returns:
+            dict: {'addresses': результат UtxoSet.by_address, 'utxo_count',
+                   'total_satoshis', 'spendable_satoshis'} или None при ошибке
+        """
+        if not self.rpc_connection:
+            print("Сначала установите соединение с помощью метода connect()")
+            return None
+        
+        try:
+            if addresses:
+                unspent = self.rpc_connection.listunspent(min_conf, 9999999, list(addresses))
+            else:
+                unspent = self.rpc_connection.listunspent(min_conf)
+        except JSONRPCException as e:
+            print(f"✗ RPC ошибка: {e}")
+            return None
+        except Exception as e:
+            print(f"✗ Ошибка: {e}")
+            return None
+        
+        utxo_set = UtxoSet.from_listunspent(unspent)
+        del unspent  # словари ответа больше не нужны
+        summary = utxo_set.summary()
+        return {
+            'addresses': utxo_set.by_address(),
+            'utxo_count': summary['utxo_count'],
+            'total_satoshis': summary['total_satoshis'],
+            'spendable_satoshis': summary['spendable_satoshis'],
+        }
+    
+    def export_utxos(self, path, addresses=None, min_conf=0, fmt=None):
+        """
+        Потоково записать UTXO в NDJSON или бинарный файл (см. utxo_export)
+        
+        Записи пишутся по мере обработки ответов listunspent; адреса
+        запрашиваются порциями по EXPORT_CHUNK_ADDRESSES, поэтому в памяти
+        одновременно находится только ответ на одну порцию.
+        
+        Args:
+            path: файл экспорта (.ndjson/.jsonl или .utxo)
+            addresses: список адресов (None - весь кошелек одним вызовом)
+            min_conf: минимальное количество подтверждений
+            fmt: формат, если не определяется по расширению
+        
+        Returns:
+            dict: {'path', 'utxo_count', 'total_satoshis'} или None при ошибке
+        """
+        if not self.rpc_connection:
+            print("Сначала установите соединение с помощью метода connect()")
+            return None
+        
+        try:
+            with UtxoExporter(path, fmt) as exporter:
+                if addresses:
+                    addresses = list(addresses)
+                    for start in range(0, len(addresses), EXPORT_CHUNK_ADDRESSES):
+                        chunk = addresses[start:start + EXPORT_CHUNK_ADDRESSES]
+                        exporter.write_many(self.rpc_connection.listunspent(min_conf, 9999999, chunk))
+                else:
+                    exporter.write_many(self.rpc_connection.listunspent(min_conf))
+        except JSONRPCException as e:
+            print(f"✗ RPC ошибка: {e}")
+            return None
+        except Exception as e:
+            print(f"✗ Ошибка экспорта: {e}")
+            return None
+        
+        return {'path': path, 'utxo_count': exporter.count, 'total_satoshis': exporter.total_sat}
+    
     def get_wallet_balance(self):
         """Получить общий баланс кошелька"""
         try:
@@ -157,15 +299,36 @@ def print_utxo_summary(result):
     else:
         print("UTXO не найдены")
 
+def print_wallet_summary(summary):
+    """Вывести агрегаты UTXO по адресам кошелька"""
+    if not summary:
+        print("Нет данных для отображения")
+        return
+    
+    print("\n" + "="*60)
+    print(f"UTXO кошелька: {len(summary['addresses'])} адресов, {summary['utxo_count']} UTXO")
+    print("="*60)
+    rows = sorted(summary['addresses'].items(), key=lambda item: -item[1]['total_satoshis'])
+    for address, agg in rows:
+        print(f"{address}")
+        print(f"   UTXO: {agg['utxo_count']}, сумма: {agg['total_satoshis']:,} сатоши "
+              f"(доступно {agg['spendable_satoshis']:,})")
+        print(f"   Подтверждений: {agg['min_confirmations']}..{agg['max_confirmations']}")
+    print("-"*60)
+    print(f"Всего: {summary['total_satoshis']:,} сатоши "
+          f"({Decimal(summary['total_satoshis']) / SATOSHI_PER_BTC:.8f} BTC)")
+
 def main():
     # Конфигурация для testnet3
-    RPC_USER = '***'
-    RPC_PASSWORD = '***'
-    RPC_HOST = '127.0.0.1'
-    RPC_PORT =   # Порт для testnet
-    WALLET_NAME = 'mywallet'  # Имя кошелька
+    # Переменные окружения BITCOIN_RPC_* переопределяют значения по умолчанию
+    RPC_USER = os.environ.get('BITCOIN_RPC_USER', '***')
+    RPC_PASSWORD = os.environ.get('BITCOIN_RPC_PASSWORD', '***')
+    RPC_HOST = os.environ.get('BITCOIN_RPC_HOST', '127.0.0.1')
+    RPC_PORT = int(os.environ.get('BITCOIN_RPC_PORT', '18332'))  # Порт для testnet
+    WALLET_NAME = os.environ.get('BITCOIN_RPC_WALLET', 'mywallet')  # Имя кошелька
     
     TARGET_ADDRESS = 'tb1qfzj8zf78efn054996k0twh9wfjpa9t5kxwu0qz'
+    EXPORT_PATH = 'utxo_analysis.ndjson'  # .utxo - компактный бинарный формат
     
     print("Bitcoin UTXO Calculator")
     print("="*60)
@@ -189,24 +352,44 @@ def main():
     if wallet_balance:
         print(f"Баланс кошелька: {wallet_balance['total_balance_btc']:.8f} BTC")
     
-    # Получаем сумму UTXO для адреса
+    # --wallet: сводка по всем адресам кошелька одним вызовом listunspent
+    if '--wallet' in sys.argv[1:]:
+        print_wallet_summary(analyzer.get_wallet_utxo_summary())
+        return
+    
+    # Несколько адресов из командной строки анализируются одним пакетом
+    addresses = sys.argv[1:]
+    if len(addresses) > 1:
+        print(f"\nАнализируем {len(addresses)} адресов одним пакетным запросом")
+        results = analyzer.analyze_addresses(addresses)
+        for result in (results or {}).values():
+            print_utxo_summary(result)
+        return
+    if addresses:
+        TARGET_ADDRESS = addresses[0]
+    
+    # Получаем сумму UTXO для адреса и сразу пишем UTXO в файл по одной
     print(f"\nАнализируем адрес: {TARGET_ADDRESS}")
-    result = analyzer.get_address_utxo_sum(TARGET_ADDRESS)
+    result = analyzer.export_utxos(EXPORT_PATH, [TARGET_ADDRESS])
     
     # Выводим результат
     if result:
-        print_utxo_summary(result)
-        
-        # Сохраняем в JSON файл
-        with open('utxo_analysis.json', 'w') as f:
-            json.dump({
-                'address': result['address'],
-                'total_btc': str(result['total_btc']),
-                'total_satoshis': result['total_satoshis'],
-                'utxo_count': result['utxo_count'],
-                'utxos': result['utxos']
-            }, f, indent=2)
-        print("\nРезультат сохранен в utxo_analysis.json")
+        print("\n" + "="*60)
+        print(f"Анализ UTXO для адреса: {TARGET_ADDRESS}")
+        print("="*60)
+        print(f"Общее количество UTXO: {result['utxo_count']}")
+        print(f"Общий баланс: {Decimal(result['total_satoshis']) / SATOSHI_PER_BTC:.8f} BTC")
+        print(f"Общий баланс: {result['total_satoshis']:,} сатоши")
+        print("-"*60)
+        
+        # Первые записи читаются из файла лениво
+        for i, utxo in enumerate(read_export(EXPORT_PATH), 1):
+            if i > 10:
+                print(f"... и еще {result['utxo_count'] - 10} UTXO в {EXPORT_PATH}")
+                break
+            print(f"{i}. TXID: {utxo['txid'][:20]}... vout {utxo['vout']} - "
+                  f"{utxo['amount_sat']:,} сатоши, {utxo['confirmations']} conf")
+        print(f"\nРезультат сохранен в {EXPORT_PATH}")
     else:
         print("Не удалось получить данные UTXO")
 
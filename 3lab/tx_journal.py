@@ -0,0 +1,238 @@
+"""
+Журнал отправленных транзакций (SQLite)
+
+Заменяет текстовый transaction.log: каждая отправка - запись с
+фиксированной схемой (txid, получатель, сумма и комиссия в сатоши,
+ставка, время отправки и подтверждения). Записи копятся в буфере и
+пишутся одной транзакцией БД в commit(); база в режиме WAL с
+synchronous=FULL, поэтому после commit() данные сброшены на диск (fsync).
+
+Индексы по txid и времени отправки позволяют отвечать на запросы без
+чтения всего журнала:
+    fees_per_day()            - сумма комиссий по дням
+    unconfirmed_older_than(n) - неподтвержденные отправки старше n минут
+
+Старый transaction.log можно перенести командой:
+    python tx_journal.py import transaction.log
+"""
+import argparse
+import re
+import sqlite3
+import time
+from decimal import Decimal
+
+DEFAULT_JOURNAL_PATH = "transactions.sqlite"
+BUFFER_SIZE = 500  # записей в буфере до автоматического commit()
+SATOSHI = Decimal("100000000")
+
+COLUMNS = ("txid", "destination", "amount_sat", "fee_sat", "fee_rate", "vsize",
+           "created_at", "broadcast_at")
+
+
+def btc_to_sat(amount):
+    if amount is None:
+        return None
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int(abs(amount) * SATOSHI)
+
+
+def _read_varint(raw, pos):
+    first = raw[pos]
+    if first < 0xfd:
+        return first, pos + 1
+    size = {0xfd: 2, 0xfe: 4, 0xff: 8}[first]
+    return int.from_bytes(raw[pos + 1:pos + 1 + size], "little"), pos + 1 + size
+
+
+def raw_tx_vsize(raw_hex):
+    """Виртуальный размер сериализованной транзакции (hex) без decoderawtransaction"""
+    raw = bytes.fromhex(raw_hex)
+    if raw[4:6] != b"\x00\x01":
+        return len(raw)
+    pos = 6
+    n_in, pos = _read_varint(raw, pos)
+    for _ in range(n_in):
+        pos += 36
+        script_len, pos = _read_varint(raw, pos)
+        pos += script_len + 4
+    n_out, pos = _read_varint(raw, pos)
+    for _ in range(n_out):
+        pos += 8
+        script_len, pos = _read_varint(raw, pos)
+        pos += script_len
+    # marker, flag и witness (от конца выходов до locktime) не входят в базовый размер
+    witness_size = len(raw) - 4 - pos
+    base_size = len(raw) - witness_size - 2
+    return -(-(base_size * 3 + len(raw)) // 4)
+
+
+class TxJournal:
+    """
+    Журнал отправок с буферизацией записи
+
+    Пример:
+        with TxJournal() as journal:
+            journal.record_send(txid, address, Decimal("0.001"), fee_btc=Decimal("0.00000141"))
+        journal.mark_confirmed(txid, confirmations=1)
+        for day in journal.fees_per_day():
+            print(day)
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, buffer_size=BUFFER_SIZE):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS sends (
+                id INTEGER PRIMARY KEY,
+                txid TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                amount_sat INTEGER NOT NULL,
+                fee_sat INTEGER,
+                fee_rate REAL,
+                vsize INTEGER,
+                created_at REAL NOT NULL,
+                broadcast_at REAL NOT NULL,
+                confirmed_at REAL,
+                confirmations INTEGER NOT NULL DEFAULT 0,
+                blockhash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS sends_txid ON sends (txid);
+            CREATE INDEX IF NOT EXISTS sends_broadcast_at ON sends (broadcast_at);
+            CREATE INDEX IF NOT EXISTS sends_unconfirmed ON sends (broadcast_at)
+                WHERE confirmed_at IS NULL;
+        """)
+        self.db.commit()
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.commit()
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def record_send(self, txid, destination, amount_btc, fee_btc=None, fee_rate=None,
+                    vsize=None, broadcast_at=None):
+        """
+        Добавить отправку в буфер (запись на диск - в commit())
+
+        Для транзакции с несколькими получателями - одна запись на выход;
+        комиссия записывается только в первую, чтобы суммы по дням не
+        учитывали ее несколько раз.
+        """
+        now = time.time()
+        self.buffer.append((txid, destination, btc_to_sat(amount_btc), btc_to_sat(fee_btc),
+                            fee_rate, vsize, now, broadcast_at or now))
+        if len(self.buffer) >= self.buffer_size:
+            self.commit()
+
+    def commit(self):
+        """Записать буфер одной транзакцией БД; возвращает количество записей"""
+        if not self.buffer:
+            return 0
+        rows, self.buffer = self.buffer, []
+        with self.db:
+            self.db.executemany(
+                f"INSERT INTO sends ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+        return len(rows)
+
+    def mark_confirmed(self, txid, confirmations=1, blockhash=None, confirmed_at=None):
+        """Отметить подтверждение txid (время первого подтверждения не перезаписывается)"""
+        self.commit()
+        with self.db:
+            self.db.execute(
+                "UPDATE sends SET confirmed_at = COALESCE(confirmed_at, ?), confirmations = ?, "
+                "blockhash = COALESCE(?, blockhash) WHERE txid = ?",
+                (confirmed_at or time.time(), confirmations, blockhash, txid),
+            )
+
+    def get(self, txid):
+        """Записи отправки txid (по одной на получателя)"""
+        self.commit()
+        cursor = self.db.execute("SELECT * FROM sends WHERE txid = ? ORDER BY id", (txid,))
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def fees_per_day(self, since=None):
+        """
+        Комиссии по дням (локальное время)
+
+        Returns:
+            list: [{"day", "transactions", "fee_sat"}, ...]
+        """
+        self.commit()
+        rows = self.db.execute(
+            "SELECT date(broadcast_at, 'unixepoch', 'localtime') AS day, "
+            "COUNT(DISTINCT txid), COALESCE(SUM(fee_sat), 0) "
+            "FROM sends WHERE broadcast_at >= ? GROUP BY day ORDER BY day",
+            (since or 0,),
+        )
+        return [{"day": day, "transactions": count, "fee_sat": fee} for day, count, fee in rows]
+
+    def unconfirmed_older_than(self, minutes):
+        """Неподтвержденные отправки старше minutes минут: [{"txid", "broadcast_at", "age_minutes"}]"""
+        self.commit()
+        now = time.time()
+        rows = self.db.execute(
+            "SELECT txid, MIN(broadcast_at) FROM sends "
+            "WHERE confirmed_at IS NULL AND broadcast_at < ? GROUP BY txid ORDER BY 2",
+            (now - minutes * 60,),
+        )
+        return [{"txid": txid, "broadcast_at": at, "age_minutes": (now - at) / 60} for txid, at in rows]
+
+    def import_text_log(self, path):
+        """Перенести записи старого transaction.log; возвращает количество"""
+        pattern = re.compile(
+            r"\[(?P<time>[^\]]+)\] SEND\s+TXID: (?P<txid>\w+)\s+To: (?P<to>\S+)\s+"
+            r"Amount: (?P<amount>[\d.]+) BTC\s+Fee: (?P<fee>[\d.]+) BTC"
+        )
+        with open(path, "r") as f:
+            text = f.read()
+        count = 0
+        for match in pattern.finditer(text):
+            at = time.mktime(time.strptime(match["time"]))
+            self.record_send(match["txid"], match["to"], Decimal(match["amount"]),
+                             Decimal(match["fee"]), broadcast_at=at)
+            count += 1
+        self.commit()
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Журнал отправленных транзакций")
+    parser.add_argument("--db", default=DEFAULT_JOURNAL_PATH, help="файл журнала")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("fees-per-day", help="комиссии по дням")
+    unconfirmed = commands.add_parser("unconfirmed", help="неподтвержденные отправки")
+    unconfirmed.add_argument("--minutes", type=float, default=30)
+    show = commands.add_parser("show", help="записи по txid")
+    show.add_argument("txid")
+    imported = commands.add_parser("import", help="перенести старый transaction.log")
+    imported.add_argument("log")
+    args = parser.parse_args()
+
+    journal = TxJournal(args.db)
+    if args.command == "fees-per-day":
+        for day in journal.fees_per_day():
+            print(f"{day['day']}  {day['transactions']:>5} транзакций  {day['fee_sat']:>12,} сатоши")
+    elif args.command == "unconfirmed":
+        for tx in journal.unconfirmed_older_than(args.minutes):
+            print(f"{tx['txid']}  {tx['age_minutes']:.0f} мин")
+    elif args.command == "show":
+        for record in journal.get(args.txid):
+            print(record)
+    else:
+        print(f"Перенесено записей: {journal.import_text_log(args.log)}")
+    journal.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Отслеживание подтверждений многих транзакций одним циклом опроса
+
+wait_for_confirmation(txid) ждет одну транзакцию и делает один
+gettransaction за такт. TxTracker отслеживает любое количество txid в
+фоновом потоке: за такт отправляется один пакетный запрос (getblockcount +
+gettransaction для всех ожидающих транзакций, см. rpc_batch.BatchRPC).
+
+Интервал опроса привязан к ожидаемому времени блока сети
+(EXPECTED_BLOCK_TIME / POLLS_PER_BLOCK) и уточняется по фактически
+наблюдаемым интервалам между блоками (экспоненциальное среднее), поэтому
+в regtest с частым майнингом опрос частый, а в testnet - редкий.
+
+Для каждого txid возвращается concurrent.futures.Future; результат -
+словарь с задержкой от отправки до первого подтверждения.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from rpc_batch import BatchRPC
+
+# Ожидаемое время между блоками по сети из getblockchaininfo, секунд
+EXPECTED_BLOCK_TIME = {"main": 600, "test": 600, "testnet4": 600, "signet": 600, "regtest": 10}
+POLLS_PER_BLOCK = 20
+MIN_POLL_INTERVAL = 0.2
+MAX_POLL_INTERVAL = 30.0
+BLOCK_TIME_SMOOTHING = 0.3  # вес нового наблюдения в среднем интервале блоков
+
+
+class TxTracker:
+    """
+    Фоновое отслеживание подтверждений
+
+    Пример:
+        with TxTracker(rpc_url) as tracker:
+            futures = [tracker.track(txid) for txid in txids]
+            for future in futures:
+                info = future.result(timeout=3600)
+                print(info["txid"], info["latency"])
+    """
+
+    def __init__(self, rpc_url, block_time=None):
+        """
+        Args:
+            rpc_url: URL JSON-RPC кошелька
+            block_time: ожидаемое время блока в секундах (None - по сети узла)
+        """
+        self.rpc = BatchRPC(rpc_url)
+        if block_time is None:
+            chain = self.rpc.call("getblockchaininfo")["chain"]
+            block_time = EXPECTED_BLOCK_TIME.get(chain, 600)
+        self.block_time = float(block_time)
+        self.height = self.rpc.call("getblockcount")
+        self.last_block_at = time.time()
+        self.pending = {}  # txid -> (Future, время отправки, нужно подтверждений)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.ticks = 0
+        self.thread = threading.Thread(target=self._loop, name="TxTracker", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Остановить цикл; незавершенные Future отменяются"""
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join()
+        self.rpc.close()
+        with self.lock:
+            for future, _, _ in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+
+    @property
+    def poll_interval(self):
+        return min(max(self.block_time / POLLS_PER_BLOCK, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+    def track(self, txid, broadcast_at=None, confirmations=1, callback=None):
+        """
+        Начать отслеживание txid
+
+        Args:
+            txid: ID транзакции
+            broadcast_at: время отправки (time.time()); None - сейчас
+            confirmations: сколько подтверждений ждать
+            callback: функция(future), вызывается по завершении
+
+        Returns:
+            Future: результат {"txid", "confirmations", "blockhash", "latency",
+                    "block_latency"}; latency - секунд от отправки до обнаружения
+                    подтверждения, block_latency - до времени блока
+        """
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+        with self.lock:
+            self.pending[txid] = (future, broadcast_at or time.time(), confirmations)
+        self.wakeup.set()
+        return future
+
+    def track_many(self, txids, broadcast_at=None, confirmations=1):
+        return {txid: self.track(txid, broadcast_at, confirmations) for txid in txids}
+
+    def wait_all(self, futures, timeout=None):
+        """Дождаться всех Future; возвращает {txid: результат или None по таймауту}"""
+        deadline = None if timeout is None else time.time() + timeout
+        results = {}
+        for txid, future in futures.items():
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            try:
+                results[txid] = future.result(remaining)
+            except Exception:
+                results[txid] = None
+        return results
+
+    def _loop(self):
+        while not self.stopped:
+            with self.lock:
+                pending = dict(self.pending)
+            if not pending:
+                # Нечего отслеживать - ждем новую транзакцию
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            try:
+                self._tick(pending)
+            except Exception as e:
+                print(f"✗ Ошибка опроса транзакций: {e}")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+    def _tick(self, pending):
+        self.ticks += 1
+        height_call = self.rpc.queue("getblockcount")
+        calls = {txid: self.rpc.queue("gettransaction", txid) for txid in pending}
+        self.rpc.flush()
+        now = time.time()
+
+        height = height_call.get()
+        if height > self.height:
+            # Уточняем ожидаемое время блока по наблюдаемому интервалу
+            observed = (now - self.last_block_at) / (height - self.height)
+            self.block_time += BLOCK_TIME_SMOOTHING * (observed - self.block_time)
+            self.height, self.last_block_at = height, now
+
+        for txid, item in calls.items():
+            future, broadcast_at, needed = pending[txid]
+            # Ошибка -5: кошелек еще не знает транзакцию
+            if item.error is not None or future.done():
+                continue
+            tx = item.result
+            if tx.get("confirmations", 0) < needed:
+                continue
+            with self.lock:
+                self.pending.pop(txid, None)
+            future.set_result({
+                "txid": txid,
+                "confirmations": tx["confirmations"],
+                "blockhash": tx.get("blockhash"),
+                "latency": now - broadcast_at,
+                "block_latency": tx["blocktime"] - broadcast_at if "blocktime" in tx else None,
+            })
@@ -0,0 +1,186 @@
+"""
+Потоковый экспорт UTXO
+
+Записи пишутся по одной по мере обработки ответов RPC, без накопления
+списка в памяти и без форматирования json.dump(..., indent=2):
+
+    NDJSON (.ndjson, .jsonl) - одна компактная JSON-запись на строку
+    бинарный (.utxo)         - заголовок MAGIC и записи фиксированной части
+                               RECORD (txid 32 байта, vout, сатоши,
+                               подтверждения, флаги) + адрес с длиной
+
+Читатель (read_export) также потоковый: записи разбираются и фильтруются
+по одной, поэтому файл любого размера можно просмотреть или
+отфильтровать без загрузки целиком.
+
+Формат записи: {"address", "txid", "vout", "amount_sat", "confirmations",
+"spendable", "safe"}; суммы только в целых сатоши.
+"""
+import json
+import os
+import struct
+from decimal import Decimal
+
+MAGIC = b"UTXOBIN1"
+RECORD = struct.Struct("<32sIqIBH")  # txid, vout, сатоши, подтверждения, флаги, длина адреса
+FLAG_SPENDABLE = 1
+FLAG_SAFE = 2
+
+FORMATS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".utxo": "binary", ".bin": "binary"}
+WRITE_BUFFER = 1 << 20
+
+
+def detect_format(path):
+    """Формат по расширению файла; по умолчанию NDJSON"""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "ndjson")
+
+
+def utxo_record(utxo, address=None):
+    """Запись экспорта из элемента listunspent (сумма в BTC) или записи экспорта"""
+    if "amount_sat" in utxo:
+        amount_sat = int(utxo["amount_sat"])
+    else:
+        amount = utxo["amount"]
+        if not isinstance(amount, Decimal):
+            amount = Decimal(str(amount))
+        amount_sat = int(amount * 100000000)
+    return {
+        "address": address or utxo.get("address", ""),
+        "txid": utxo["txid"],
+        "vout": utxo["vout"],
+        "amount_sat": amount_sat,
+        "confirmations": utxo.get("confirmations", 0),
+        "spendable": bool(utxo.get("spendable", True)),
+        "safe": bool(utxo.get("safe", True)),
+    }
+
+
+class UtxoExporter:
+    """
+    Запись UTXO в файл по одной
+
+    Пример:
+        with UtxoExporter("utxos.ndjson") as exporter:
+            for utxo in rpc.listunspent(0):
+                exporter.write(utxo)
+        print(exporter.count, exporter.total_sat)
+    """
+
+    def __init__(self, path, fmt=None):
+        """
+        Args:
+            path: файл экспорта
+            fmt: "ndjson" или "binary" (None - по расширению)
+        """
+        self.path = path
+        self.format = fmt or detect_format(path)
+        if self.format not in ("ndjson", "binary"):
+            raise ValueError(f"неизвестный формат экспорта: {self.format}")
+        self.count = 0
+        self.total_sat = 0
+        if self.format == "binary":
+            self.file = open(path, "wb", buffering=WRITE_BUFFER)
+            self.file.write(MAGIC)
+        else:
+            self.file = open(path, "w", buffering=WRITE_BUFFER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def write(self, utxo, address=None):
+        """Записать один UTXO (элемент listunspent или запись экспорта)"""
+        record = utxo_record(utxo, address)
+        if self.format == "binary":
+            address_bytes = record["address"].encode("ascii")
+            flags = (FLAG_SPENDABLE if record["spendable"] else 0) | (FLAG_SAFE if record["safe"] else 0)
+            self.file.write(RECORD.pack(
+                bytes.fromhex(record["txid"]), record["vout"], record["amount_sat"],
+                record["confirmations"], flags, len(address_bytes),
+            ))
+            self.file.write(address_bytes)
+        else:
+            self.file.write(json.dumps(record, separators=(",", ":")))
+            self.file.write("\n")
+        self.count += 1
+        self.total_sat += record["amount_sat"]
+        return record
+
+    def write_many(self, utxos, address=None):
+        for utxo in utxos:
+            self.write(utxo, address)
+        return self.count
+
+
+def _iter_ndjson(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _iter_binary(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: не бинарный экспорт UTXO")
+        while True:
+            header = f.read(RECORD.size)
+            if not header:
+                return
+            if len(header) < RECORD.size:
+                raise ValueError(f"{path}: обрезанная запись")
+            txid, vout, amount_sat, confirmations, flags, address_len = RECORD.unpack(header)
+            yield {
+                "address": f.read(address_len).decode("ascii"),
+                "txid": txid.hex(),
+                "vout": vout,
+                "amount_sat": amount_sat,
+                "confirmations": confirmations,
+                "spendable": bool(flags & FLAG_SPENDABLE),
+                "safe": bool(flags & FLAG_SAFE),
+            }
+
+
+def read_export(path, address=None, min_amount=None, min_conf=None, spendable=None, where=None):
+    """
+    Лениво прочитать экспорт с фильтрацией
+
+    Args:
+        path: файл экспорта (формат определяется по расширению)
+        address: только UTXO этого адреса
+        min_amount: минимальная сумма в сатоши
+        min_conf: минимальное количество подтверждений
+        spendable: True/False - только доступные/недоступные
+        where: дополнительный предикат record -> bool
+
+    Yields:
+        dict: записи экспорта
+    """
+    records = _iter_binary(path) if detect_format(path) == "binary" else _iter_ndjson(path)
+    for record in records:
+        if address is not None and record["address"] != address:
+            continue
+        if min_amount is not None and record["amount_sat"] < min_amount:
+            continue
+        if min_conf is not None and record["confirmations"] < min_conf:
+            continue
+        if spendable is not None and record["spendable"] != spendable:
+            continue
+        if where is not None and not where(record):
+            continue
+        yield record
+
+
+def export_totals(path, **filters):
+    """Количество и сумма UTXO в экспорте за один потоковый проход"""
+    count = total = 0
+    for record in read_export(path, **filters):
+        count += 1
+        total += record["amount_sat"]
+    return {"utxo_count": count, "total_satoshis": total}
@@ -0,0 +1,437 @@
+"""
+Компактное хранение набора UTXO
+
+Словарь listunspent (txid строкой, Decimal, булевы поля, адрес) или
+utxo_info из 3.1.py занимает в памяти сотни байт. UtxoSet хранит тот же
+набор столбцами:
+
+    txids          bytearray, 32 байта на UTXO
+    vouts          array('I')
+    amounts        array('q'), сатоши
+    confirmations  array('i')
+    flags          array('B'), spendable/safe
+    address_ids    array('I') + общий список адресов
+
+Индекс outpoint -> строка строится при первом поиске (он занимает больше,
+чем сами данные, и нужен не всегда). Суммы, фильтры и сортировка
+выполняются над столбцами - через NumPy, если он установлен, иначе
+обычными циклами по массивам без создания словарей.
+
+Набор можно передать в выбор UTXO 2лаб/coin_selection.py (pool()),
+построить сводку по адресам (by_address()) и записать в экспорт
+utxo_export (write_export()).
+"""
+import argparse
+import os
+import struct
+import sys
+import tracemalloc
+from array import array
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utxo_export import UtxoExporter, read_export, utxo_record
+
+# Выбор UTXO общий с 2лаб
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "2лаб"))
+from coin_selection import UtxoPool, select_coins  # noqa: E402
+from fees import MAX_STANDARD_TX_WEIGHT  # noqa: E402
+
+FLAG_SPENDABLE = 1
+FLAG_SAFE = 2
+SORT_KEYS = {"amount": "amounts", "confirmations": "confirmations", "vout": "vouts"}
+
+
+class UtxoRows:
+    """Последовательность UTXO набора в формате {"txid", "vout", "value", ...}; словари создаются при обращении"""
+
+    def __init__(self, utxo_set, rows=None):
+        self.utxo_set = utxo_set
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows) if self.rows is not None else len(self.utxo_set)
+
+    def __getitem__(self, i):
+        row = self.rows[i] if self.rows is not None else i
+        return self.utxo_set.row(row)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class UtxoSet:
+    """
+    Набор UTXO в столбцах с индексом по outpoint
+
+    Пример:
+        utxos = UtxoSet.from_listunspent(rpc.listunspent(1))
+        print(utxos.total(), utxos.memory_bytes() / len(utxos))
+        small = utxos.filter(max_amount=100000, min_conf=1)
+        result = utxos.select(50000, fee_rate=2.0)
+        utxos.write_export("utxos.utxo")
+    """
+
+    def __init__(self):
+        self.txids = bytearray()
+        self.vouts = array("I")
+        self.amounts = array("q")
+        self.confirmations = array("i")
+        self.flags = array("B")
+        self.address_ids = array("I")
+        self.addresses = []
+        self.address_index = {}
+        self._index = None
+
+    def __len__(self):
+        return len(self.vouts)
+
+    def __contains__(self, outpoint):
+        return self.find(*outpoint) is not None
+
+    # ---------- построение ----------
+
+    @classmethod
+    def from_listunspent(cls, unspent):
+        """Набор из ответа listunspent (суммы в BTC) или записей экспорта"""
+        utxo_set = cls()
+        utxo_set.extend(unspent)
+        return utxo_set
+
+    @classmethod
+    def from_export(cls, path, **filters):
+        """Набор из файла utxo_export (NDJSON или бинарного); фильтры как у read_export"""
+        utxo_set = cls()
+        utxo_set.extend(read_export(path, **filters))
+        return utxo_set
+
+    def extend(self, utxos):
+        for utxo in utxos:
+            self.add(utxo)
+
+    def add(self, utxo):
+        """Добавить UTXO (элемент listunspent, запись экспорта или {"txid", "vout", "value"})"""
+        if "value" in utxo and "amount" not in utxo:
+            utxo = dict(utxo, amount_sat=utxo["value"])
+        record = utxo_record(utxo)
+        address_id = self.address_index.get(record["address"])
+        if address_id is None:
+            address_id = self.address_index[record["address"]] = len(self.addresses)
+            self.addresses.append(record["address"])
+
+        row = len(self.vouts)
+        self.txids += bytes.fromhex(record["txid"])
+        self.vouts.append(record["vout"])
+        self.amounts.append(record["amount_sat"])
+        self.confirmations.append(record["confirmations"])
+        self.flags.append((FLAG_SPENDABLE if record["spendable"] else 0)
+                          | (FLAG_SAFE if record["safe"] else 0))
+        self.address_ids.append(address_id)
+        if self._index is not None:
+            self._index[self._key(self.txids[-32:], record["vout"])] = row
+        return row
+
+    def take(self, rows):
+        """Новый набор из строк rows (в их порядке)"""
+        subset = UtxoSet()
+        # Копии: новые адреса, добавленные в подмножество, не меняют таблицу исходного набора
+        subset.addresses = list(self.addresses)
+        subset.address_index = dict(self.address_index)
+        txids = memoryview(self.txids)
+        subset.txids = bytearray(b"".join(txids[r * 32:(r + 1) * 32] for r in rows))
+        for name in ("vouts", "amounts", "confirmations", "flags", "address_ids"):
+            column = getattr(self, name)
+            setattr(subset, name, array(column.typecode, map(column.__getitem__, rows)))
+        return subset
+
+    # ---------- доступ ----------
+
+    @staticmethod
+    def _key(txid_bytes, vout):
+        return bytes(txid_bytes) + struct.pack("<I", vout)
+
+    def _build_index(self):
+        txids = memoryview(self.txids)
+        self._index = {
+            self._key(txids[row * 32:(row + 1) * 32], vout): row
+            for row, vout in enumerate(self.vouts)
+        }
+
+    def find(self, txid, vout):
+        """Номер строки UTXO txid:vout или None"""
+        if self._index is None:
+            self._build_index()
+        return self._index.get(self._key(bytes.fromhex(txid), vout))
+
+    def txid(self, row):
+        return self.txids[row * 32:(row + 1) * 32].hex()
+
+    def row(self, row):
+        """UTXO строки row в формате coin_selection/экспорта"""
+        flags = self.flags[row]
+        return {
+            "txid": self.txid(row),
+            "vout": self.vouts[row],
+            "value": self.amounts[row],
+            "address": self.addresses[self.address_ids[row]],
+            "confirmations": self.confirmations[row],
+            "spendable": bool(flags & FLAG_SPENDABLE),
+            "safe": bool(flags & FLAG_SAFE),
+        }
+
+    def remove(self, txid, vout):
+        """
+        Удалить потраченный UTXO; последняя строка переносится на его место
+
+        Returns:
+            bool: был ли UTXO в наборе
+        """
+        row = self.find(txid, vout)
+        if row is None:
+            return False
+        last = len(self.vouts) - 1
+        key = self._key(bytes.fromhex(txid), vout)
+        if row != last:
+            self.txids[row * 32:(row + 1) * 32] = self.txids[last * 32:]
+            for name in ("vouts", "amounts", "confirmations", "flags", "address_ids"):
+                column = getattr(self, name)
+                column[row] = column[last]
+            self._index[self._key(self.txids[row * 32:(row + 1) * 32], self.vouts[row])] = row
+        del self.txids[last * 32:]
+        for name in ("vouts", "amounts", "confirmations", "flags", "address_ids"):
+            getattr(self, name).pop()
+        del self._index[key]
+        return True
+
+    # ---------- векторные операции ----------
+
+    def _np(self, name):
+        column = getattr(self, name)
+        return np.frombuffer(column, dtype=column.typecode) if len(column) else np.zeros(0, column.typecode)
+
+    def total(self, rows=None):
+        """Сумма в сатоши (всего набора или строк rows)"""
+        if rows is None:
+            if np is not None:
+                return int(self._np("amounts").sum())
+            return sum(self.amounts)
+        return sum(map(self.amounts.__getitem__, rows))
+
+    def select_rows(self, min_amount=None, max_amount=None, min_conf=None, spendable=None,
+                    address=None):
+        """Номера строк, удовлетворяющих всем условиям"""
+        address_id = None
+        if address is not None:
+            address_id = self.address_index.get(address)
+            if address_id is None:
+                return []
+
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            if min_amount is not None:
+                mask &= self._np("amounts") >= min_amount
+            if max_amount is not None:
+                mask &= self._np("amounts") <= max_amount
+            if min_conf is not None:
+                mask &= self._np("confirmations") >= min_conf
+            if spendable is not None:
+                mask &= ((self._np("flags") & FLAG_SPENDABLE) != 0) == spendable
+            if address_id is not None:
+                mask &= self._np("address_ids") == address_id
+            return np.flatnonzero(mask).tolist()
+
+        rows = range(len(self))
+        if min_amount is not None:
+            rows = [r for r in rows if self.amounts[r] >= min_amount]
+        if max_amount is not None:
+            rows = [r for r in rows if self.amounts[r] <= max_amount]
+        if min_conf is not None:
+            rows = [r for r in rows if self.confirmations[r] >= min_conf]
+        if spendable is not None:
+            rows = [r for r in rows if bool(self.flags[r] & FLAG_SPENDABLE) == spendable]
+        if address_id is not None:
+            rows = [r for r in rows if self.address_ids[r] == address_id]
+        return list(rows)
+
+    def filter(self, **conditions):
+        """Новый набор из UTXO, удовлетворяющих условиям select_rows"""
+        return self.take(self.select_rows(**conditions))
+
+    def sorted_rows(self, key="amount", reverse=False):
+        """Номера строк, упорядоченные по столбцу key (см. SORT_KEYS)"""
+        column = SORT_KEYS[key]
+        if np is not None:
+            order = np.argsort(self._np(column), kind="stable")
+            return (order[::-1] if reverse else order).tolist()
+        return sorted(range(len(self)), key=getattr(self, column).__getitem__, reverse=reverse)
+
+    def sort(self, key="amount", reverse=False):
+        return self.take(self.sorted_rows(key, reverse))
+
+    # ---------- сводки, выбор UTXO, экспорт ----------
+
+    def summary(self):
+        """{'utxo_count', 'total_satoshis', 'spendable_satoshis', 'min_confirmations', 'max_confirmations'}"""
+        spendable = self.select_rows(spendable=True)
+        return {
+            "utxo_count": len(self),
+            "total_satoshis": self.total(),
+            "spendable_satoshis": self.total(spendable),
+            "min_confirmations": min(self.confirmations) if len(self) else None,
+            "max_confirmations": max(self.confirmations) if len(self) else None,
+        }
+
+    def by_address(self):
+        """
+        Агрегаты UTXO по адресам
+
+        Returns:
+            dict: {адрес: {'utxo_count', 'total_satoshis', 'spendable_satoshis',
+                           'min_confirmations', 'max_confirmations'}}
+        """
+        n = len(self.addresses)
+        if np is not None and len(self):
+            ids = self._np("address_ids")
+            amounts = self._np("amounts")
+            confirmations = self._np("confirmations")
+            spendable = (self._np("flags") & FLAG_SPENDABLE) != 0
+            counts = np.bincount(ids, minlength=n)
+            # Суммы в целых сатоши (bincount с weights считает во float64)
+            totals = np.zeros(n, dtype=np.int64)
+            spendable_totals = np.zeros(n, dtype=np.int64)
+            np.add.at(totals, ids, amounts)
+            np.add.at(spendable_totals, ids[spendable], amounts[spendable])
+            min_conf = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+            max_conf = np.full(n, np.iinfo(np.int32).min, dtype=np.int32)
+            np.minimum.at(min_conf, ids, confirmations)
+            np.maximum.at(max_conf, ids, confirmations)
+            return {
+                self.addresses[i]: {
+                    "utxo_count": int(counts[i]),
+                    "total_satoshis": int(totals[i]),
+                    "spendable_satoshis": int(spendable_totals[i]),
+                    "min_confirmations": int(min_conf[i]),
+                    "max_confirmations": int(max_conf[i]),
+                }
+                for i in np.flatnonzero(counts)
+            }
+        # [количество, сумма, сумма доступных, мин. подтверждений, макс. подтверждений]
+        acc = [None] * n
+        for address_id, amount, conf, flags in zip(self.address_ids, self.amounts,
+                                                    self.confirmations, self.flags):
+            spendable = amount if flags & FLAG_SPENDABLE else 0
+            row = acc[address_id]
+            if row is None:
+                acc[address_id] = [1, amount, spendable, conf, conf]
+                continue
+            row[0] += 1
+            row[1] += amount
+            row[2] += spendable
+            row[3] = min(row[3], conf)
+            row[4] = max(row[4], conf)
+        return {
+            self.addresses[i]: {
+                "utxo_count": row[0],
+                "total_satoshis": row[1],
+                "spendable_satoshis": row[2],
+                "min_confirmations": row[3],
+                "max_confirmations": row[4],
+            }
+            for i, row in enumerate(acc) if row is not None
+        }
+
+    def pool(self, rows=None):
+        """UtxoPool для coin_selection; словари UTXO создаются только для выбранных входов"""
+        rows = self.select_rows(spendable=True) if rows is None else rows
+        return UtxoPool.from_values(map(self.amounts.__getitem__, rows), UtxoRows(self, rows))
+
+    def select(self, target, fee_rate, strategy="auto", n_outputs=1, max_weight=MAX_STANDARD_TX_WEIGHT):
+        """Выбрать UTXO среди доступных (см. coin_selection.select_coins)"""
+        return select_coins(self.pool(), target, fee_rate, strategy, n_outputs, max_weight=max_weight)
+
+    def write_export(self, path, fmt=None):
+        """Записать набор в экспорт utxo_export; возвращает количество записей"""
+        with UtxoExporter(path, fmt) as exporter:
+            for row in range(len(self)):
+                record = self.row(row)
+                record["amount_sat"] = record.pop("value")
+                exporter.write(record)
+        return exporter.count
+
+    def memory_bytes(self, include_index=True):
+        """Память, занятая столбцами (и индексом, если он построен)"""
+        size = sum(sys.getsizeof(getattr(self, name)) for name in
+                   ("txids", "vouts", "amounts", "confirmations", "flags", "address_ids"))
+        size += sys.getsizeof(self.addresses) + sum(map(sys.getsizeof, self.addresses))
+        if include_index and self._index is not None:
+            size += sys.getsizeof(self._index) + sum(map(sys.getsizeof, self._index))
+        return size
+
+
+def fake_listunspent(count, n_addresses=100):
+    """Ответ listunspent из count UTXO (как его декодирует AuthServiceProxy)"""
+    return [{
+        "txid": f"{i:064x}",
+        "vout": i % 4,
+        "address": f"bcrt1qfake{i % n_addresses:032d}",
+        "label": "",
+        "scriptPubKey": "0014" + f"{i:040x}",
+        "amount": Decimal(1000 + i * 37 % 1000000) / Decimal(100000000),
+        "confirmations": i % 1000,
+        "spendable": True,
+        "solvable": True,
+        "safe": True,
+    } for i in range(count)]
+
+
+def _traced(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def measure_memory(count=100000):
+    """
+    Память на один UTXO: словари listunspent, utxo_info 3.1.py и UtxoSet
+
+    Returns:
+        dict: байт на UTXO для каждого представления
+    """
+    unspent, unspent_size = _traced(lambda: fake_listunspent(count))
+    _, info_size = _traced(lambda: [{
+        "txid": u["txid"], "vout": u["vout"], "amount_btc": float(u["amount"]),
+        "amount_sat": int(u["amount"] * 100000000), "confirmations": u["confirmations"],
+        "spendable": u["spendable"], "safe": u["safe"],
+    } for u in unspent])
+    utxo_set, set_size = _traced(lambda: UtxoSet.from_listunspent(unspent))
+    _, index_size = _traced(utxo_set._build_index)
+    return {
+        "count": count,
+        "listunspent": unspent_size / count,
+        "utxo_info": info_size / count,
+        "utxo_set": set_size / count,
+        "utxo_set_with_index": (set_size + index_size) / count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Память на один UTXO в разных представлениях")
+    parser.add_argument("--count", type=int, default=100000, help="количество UTXO")
+    args = parser.parse_args()
+
+    result = measure_memory(args.count)
+    print(f"UTXO: {result['count']} (NumPy: {'да' if np is not None else 'нет'})")
+    for name in ("listunspent", "utxo_info", "utxo_set", "utxo_set_with_index"):
+        print(f"  {name:<22} {result[name]:>8.1f} байт/UTXO "
+              f"(x{result['listunspent'] / result[name]:.1f})")
+
+
+if __name__ == "__main__":
+    main()
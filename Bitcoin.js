@@ -1,36 +1,48 @@
-import requests
+import argparse
+import asyncio
 import json
+import time
 
-def get_bitcoin_balance(address):
-    try:
-        # Определяем сеть по префиксу адреса
-        if address.startswith(('tb1', '2', 'n', 'm')):  # Testnet адреса
-            base_url = "https://mempool.space/testnet/api"
-            network = "testnet"
-        else:  # Mainnet адреса
-            base_url = "https://mempool.space/api"
-            network = "mainnet"
+from mempool_client import (MempoolClient, MempoolError, MAINNET_URL, TESTNET_URL,
+                            DEFAULT_CONCURRENCY, DEFAULT_RATE_LIMIT)
+from mempool_cache import ResponseCache, DEFAULT_CACHE_PATH, DEFAULT_TTL
+from address_sync import AddressStore, AddressSyncer, DEFAULT_STORE_PATH
+
+
+def detect_network(address):
+    """Определяет сеть и базовый URL API по префиксу адреса"""
+    if address.startswith(('tb1', '2', 'n', 'm')):  # Testnet адреса
+        return "testnet", TESTNET_URL
+    # Mainnet адреса
+    return "mainnet", MAINNET_URL
 
-        print(f"Using {network} API...")
 
-        url = f"{base_url}/address/{address}"
-        response = requests.get(url)
-        response.raise_for_status()
+def build_balance_info(address, network, data):
+    """Формирует информацию о балансе из ответа /address/{address}"""
+    balance_satoshis = data["chain_stats"]["funded_txo_sum"] - data["chain_stats"]["spent_txo_sum"]
 
-        data = response.json()
+    return {
+        "address": address,
+        "network": network,
+        "balance_satoshis": balance_satoshis,
+        "balance_btc": balance_satoshis / 100000000,
+        "total_received": data["chain_stats"]["funded_txo_sum"],
+        "total_sent": data["chain_stats"]["spent_txo_sum"],
+        "transaction_count": data["chain_stats"]["tx_count"]
+    }
 
-        balance_satoshis = data["chain_stats"]["funded_txo_sum"] - data["chain_stats"]["spent_txo_sum"]
+
+def get_bitcoin_balance(address, api_url=None, cache=None):
+    try:
+        network, base_url = detect_network(address)
+        base_url = api_url or base_url
+
+        print(f"Using {network} API...")
+
+        data = asyncio.run(fetch_address(base_url, address, cache))
 
         # Создаем информацию о балансе
-        balance_info = {
-            "address": address,
-            "network": network,
-            "balance_satoshis": balance_satoshis,
-            "balance_btc": balance_satoshis / 100000000,
-            "total_received": data["chain_stats"]["funded_txo_sum"],
-            "total_sent": data["chain_stats"]["spent_txo_sum"],
-            "transaction_count": data["chain_stats"]["tx_count"]
-        }
+        balance_info = build_balance_info(address, network, data)
 
         # Сохраняем в JSON файл
         filename = f"bitcoin_balance_{address}.json"
@@ -39,7 +51,7 @@ def get_bitcoin_balance(address):
 
         return balance_info, filename
 
-    except requests.exceptions.RequestException as e:
+    except MempoolError as e:
         print(f"Error: Failed to fetch data - {e}")
         return None, None
     except KeyError as e:
@@ -49,7 +61,198 @@ def get_bitcoin_balance(address):
         print(f"Error: {e}")
         return None, None
 
-def main():
+
+async def fetch_address(base_url, address, cache=None):
+    """Запрашивает /address/{address} через асинхронный клиент"""
+    async with MempoolClient(base_url, cache=cache) as client:
+        return await client.get_address(address)
+
+
+async def fetch_address_stats(client, address, network):
+    """
+    Получает баланс одного адреса в пакетном режиме
+
+    Returns:
+        dict: информация о балансе (как в get_bitcoin_balance) или запись с ключом "error"
+    """
+    try:
+        return build_balance_info(address, network, await client.get_address(address))
+    except MempoolError as e:
+        return {"address": address, "network": network, "error": str(e)}
+    except KeyError as e:
+        return {"address": address, "network": network,
+                "error": f"Unexpected API response format - {e}"}
+
+
+async def sync_address_stats(syncer, address, network):
+    """
+    Получает баланс адреса инкрементальной синхронизацией (только новые транзакции)
+
+    Returns:
+        dict: информация о балансе с полем new_transactions или запись с ключом "error"
+    """
+    try:
+        state = await syncer.sync(address)
+    except MempoolError as e:
+        return {"address": address, "network": network, "error": str(e)}
+    except KeyError as e:
+        return {"address": address, "network": network,
+                "error": f"Unexpected API response format - {e}"}
+
+    return {
+        "address": address,
+        "network": network,
+        "balance_satoshis": state["balance"],
+        "balance_btc": state["balance"] / 100000000,
+        "total_received": state["received"],
+        "total_sent": state["sent"],
+        "transaction_count": state["tx_count"],
+        "new_transactions": state["new_txs"],
+    }
+
+
+def load_addresses(path):
+    """Читает адреса из файла: по одному на строку, пустые строки и # комментарии пропускаются"""
+    addresses = []
+    seen = set()
+    with open(path, 'r') as f:
+        for line in f:
+            address = line.split('#', 1)[0].strip()
+            if address and address not in seen:
+                seen.add(address)
+                addresses.append(address)
+    return addresses
+
+
+def write_batch_output(results, output_path, output_format="jsonl"):
+    """
+    Записывает результаты пакетного запроса в один файл
+
+    Args:
+        results: итератор записей о балансе
+        output_path: путь к выходному файлу
+        output_format: "jsonl" (одна запись на строку) или "columnar" (JSON с массивами по полям)
+
+    Returns:
+        tuple: (количество успешных записей, количество ошибок)
+    """
+    ok = failed = 0
+
+    if output_format == "jsonl":
+        with open(output_path, 'w') as f:
+            for record in results:
+                f.write(json.dumps(record) + "\n")
+                if "error" in record:
+                    failed += 1
+                else:
+                    ok += 1
+        return ok, failed
+
+    fields = ["address", "network", "balance_satoshis", "total_received",
+              "total_sent", "transaction_count", "new_transactions", "error"]
+    columns = {field: [] for field in fields}
+    for record in results:
+        for field in fields:
+            columns[field].append(record.get(field))
+        if "error" in record:
+            failed += 1
+        else:
+            ok += 1
+
+    with open(output_path, 'w') as f:
+        json.dump(columns, f)
+    return ok, failed
+
+
+async def fetch_balances(addresses, concurrency=DEFAULT_CONCURRENCY, api_url=None,
+                         rate_limit=DEFAULT_RATE_LIMIT, cache=None, store=None):
+    """
+    Параллельно получает балансы для списка адресов в одном event loop
+
+    Для каждой сети используется свой клиент с пулом соединений размера concurrency.
+    Если передан store (AddressStore), балансы считаются инкрементальной
+    синхронизацией истории вместо запроса /address/{address}.
+
+    Returns:
+        list: записи о балансе в порядке addresses
+    """
+    networks = {}
+    for address in addresses:
+        network, base_url = detect_network(address)
+        networks.setdefault(network, api_url or base_url)
+
+    clients = {network: MempoolClient(url, concurrency=concurrency, rate_limit=rate_limit, cache=cache)
+               for network, url in networks.items()}
+    try:
+        tasks = []
+        for address in addresses:
+            network, _ = detect_network(address)
+            if store is not None:
+                syncer = AddressSyncer(clients[network], store)
+                tasks.append(sync_address_stats(syncer, address, network))
+            else:
+                tasks.append(fetch_address_stats(clients[network], address, network))
+        return await asyncio.gather(*tasks)
+    finally:
+        for client in clients.values():
+            await client.close()
+
+
+def get_bitcoin_balances(addresses, concurrency=DEFAULT_CONCURRENCY,
+                         output_path="bitcoin_balances.jsonl", output_format="jsonl", api_url=None,
+                         rate_limit=DEFAULT_RATE_LIMIT, cache=None, store=None):
+    """
+    Пакетное получение балансов для списка адресов
+
+    Запросы выполняются параллельно (не более concurrency одновременно)
+    через общий пул соединений; результат пишется в один файл в порядке адресов.
+
+    Args:
+        addresses: список адресов
+        concurrency: количество одновременных запросов
+        output_path: путь к выходному файлу
+        output_format: "jsonl" или "columnar"
+        api_url: базовый URL API вместо определяемого по адресу (например фейковый сервер)
+        rate_limit: ограничение запросов в секунду на сеть (0 - без ограничения)
+        cache: ResponseCache - свежие ответы берутся из кэша без обращения к сети
+        store: AddressStore - инкрементальная синхронизация вместо полного запроса
+
+    Returns:
+        tuple: (количество успешных записей, количество ошибок, путь к файлу)
+    """
+    results = asyncio.run(fetch_balances(addresses, concurrency, api_url, rate_limit, cache, store))
+    ok, failed = write_batch_output(results, output_path, output_format)
+    return ok, failed, output_path
+
+
+def run_batch(args, cache=None, store=None):
+    """Пакетный режим: адреса из файла и/или аргументов командной строки"""
+    addresses = list(dict.fromkeys(args.addresses))
+    if args.file:
+        known = set(addresses)
+        addresses.extend(a for a in load_addresses(args.file) if a not in known)
+
+    if not addresses:
+        print("Error: No addresses provided!")
+        return
+
+    print(f"Fetching balances for {len(addresses)} addresses "
+          f"(concurrency: {args.concurrency})...")
+
+    start = time.time()
+    ok, failed, output_path = get_bitcoin_balances(
+        addresses, args.concurrency, args.output, args.format, args.api_url, args.rate_limit,
+        cache, store
+    )
+    elapsed = time.time() - start
+
+    print(f"\nResults saved to: {output_path}")
+    print(f"Successful: {ok}, failed: {failed}")
+    print(f"Elapsed: {elapsed:.2f} s ({len(addresses) / elapsed if elapsed else 0:.1f} addresses/s)")
+
+
+def run_interactive(args, cache=None):
+    """Интерактивный режим: один адрес, результат в bitcoin_balance_<адрес>.json"""
     # Получаем Bitcoin адрес от пользователя
     address = input("Enter Bitcoin address: ").strip()
 
@@ -60,7 +263,7 @@ def main():
     print(f"Fetching balance for: {address}")
 
     # Получаем баланс и сохраняем в JSON
-    balance_data, filename = get_bitcoin_balance(address)
+    balance_data, filename = get_bitcoin_balance(address, args.api_url, cache)
 
     if balance_data and filename:
         print(f"\nBalance information saved to: {filename}")
@@ -73,5 +276,47 @@ def main():
     else:
         print("Failed to get balance information")
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Bitcoin balance lookup via mempool.space")
+    parser.add_argument("addresses", nargs="*", help="Адреса для пакетной проверки")
+    parser.add_argument("-f", "--file", help="Файл со списком адресов (по одному на строку)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Количество одновременных запросов")
+    parser.add_argument("-o", "--output", default="bitcoin_balances.jsonl",
+                        help="Выходной файл пакетного режима")
+    parser.add_argument("--format", choices=["jsonl", "columnar"], default="jsonl",
+                        help="Формат выходного файла")
+    parser.add_argument("--api-url", help="Базовый URL API (по умолчанию определяется по адресу)")
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE_LIMIT,
+                        help="Ограничение запросов в секунду (0 - без ограничения)")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="Файл кэша ответов API")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                        help="Время свежести кэша, секунды")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш")
+    parser.add_argument("--sync", action="store_true",
+                        help="Пакетный режим: инкрементальная синхронизация истории адресов")
+    parser.add_argument("--sync-db", default=DEFAULT_STORE_PATH,
+                        help="Файл SQLite с состоянием синхронизации")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResponseCache(args.cache_path, args.cache_ttl)
+    store = AddressStore(args.sync_db) if args.sync else None
+
+    try:
+        if args.addresses or args.file:
+            run_batch(args, cache, store)
+        else:
+            run_interactive(args, cache)
+    finally:
+        if store:
+            store.close()
+        if cache:
+            stats = cache.stats()
+            print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['revalidated']} revalidated")
+            cache.close()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Инкрементальная синхронизация истории адресов
+
+Для каждого адреса в локальной SQLite базе хранится последняя учтенная
+подтвержденная транзакция (tip) и накопленные суммы получено/отправлено.
+При следующей синхронизации запрашиваются только страницы
+/address/{address}/txs/chain/{last_txid} до встречи с сохраненным tip,
+поэтому стоимость пропорциональна количеству новых транзакций, а не всей истории.
+"""
+import asyncio
+import sqlite3
+import time
+
+DEFAULT_STORE_PATH = "address_sync.sqlite"
+PAGE_SIZE = 25  # Esplora отдает по 25 подтвержденных транзакций на страницу
+
+
+class AddressStore:
+    """Локальное хранилище состояния синхронизации адресов (SQLite)"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS addresses (
+                address TEXT PRIMARY KEY,
+                tip_txid TEXT,
+                tip_height INTEGER,
+                received INTEGER NOT NULL DEFAULT 0,
+                sent INTEGER NOT NULL DEFAULT 0,
+                tx_count INTEGER NOT NULL DEFAULT 0,
+                synced_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS address_txs (
+                address TEXT NOT NULL,
+                txid TEXT NOT NULL,
+                height INTEGER,
+                received INTEGER NOT NULL,
+                sent INTEGER NOT NULL,
+                PRIMARY KEY (address, txid)
+            );
+        """)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def get_state(self, address):
+        """Текущее состояние адреса или None, если адрес еще не синхронизировался"""
+        row = self.db.execute(
+            "SELECT tip_txid, tip_height, received, sent, tx_count, synced_at "
+            "FROM addresses WHERE address = ?", (address,)
+        ).fetchone()
+        if row is None:
+            return None
+        tip_txid, tip_height, received, sent, tx_count, synced_at = row
+        return {
+            "address": address,
+            "tip_txid": tip_txid,
+            "tip_height": tip_height,
+            "received": received,
+            "sent": sent,
+            "balance": received - sent,
+            "tx_count": tx_count,
+            "synced_at": synced_at,
+        }
+
+    def apply(self, address, txs, reset=False):
+        """
+        Применить новые транзакции (от старых к новым) и обновить итоги в одной транзакции БД
+
+        Args:
+            address: адрес
+            txs: список (txid, height, received, sent) в порядке от старых к новым
+            reset: удалить прежнее состояние (полная пересинхронизация)
+        """
+        with self.db:
+            if reset:
+                self.db.execute("DELETE FROM addresses WHERE address = ?", (address,))
+                self.db.execute("DELETE FROM address_txs WHERE address = ?", (address,))
+
+            self.db.execute(
+                "INSERT OR IGNORE INTO addresses (address) VALUES (?)", (address,)
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO address_txs (address, txid, height, received, sent) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(address, txid, height, received, sent) for txid, height, received, sent in txs],
+            )
+
+            received = sum(tx[2] for tx in txs)
+            sent = sum(tx[3] for tx in txs)
+            tip_txid, tip_height = (txs[-1][0], txs[-1][1]) if txs else (None, None)
+            self.db.execute(
+                "UPDATE addresses SET received = received + ?, sent = sent + ?, "
+                "tx_count = tx_count + ?, tip_txid = COALESCE(?, tip_txid), "
+                "tip_height = COALESCE(?, tip_height), synced_at = ? WHERE address = ?",
+                (received, sent, len(txs), tip_txid, tip_height, time.time(), address),
+            )
+
+
+def tx_delta(tx, address):
+    """Сколько сатоши адрес получил и отправил в транзакции (формат Esplora)"""
+    received = sum(out["value"] for out in tx["vout"]
+                   if out.get("scriptpubkey_address") == address)
+    sent = sum(vin["prevout"]["value"] for vin in tx["vin"]
+               if vin.get("prevout") and vin["prevout"].get("scriptpubkey_address") == address)
+    return received, sent
+
+
+class AddressSyncer:
+    """
+    Движок инкрементальной синхронизации поверх MempoolClient
+
+    Пример:
+        async with MempoolClient(TESTNET_URL) as client:
+            syncer = AddressSyncer(client, AddressStore())
+            state = await syncer.sync(address)
+    """
+
+    def __init__(self, client, store):
+        self.client = client
+        self.store = store
+
+    async def fetch_new_txs(self, address, tip_txid):
+        """
+        Загрузить подтвержденные транзакции новее tip_txid
+
+        Returns:
+            tuple: (список транзакций от новых к старым, найден ли tip_txid)
+        """
+        new_txs = []
+        last_seen = None
+
+        while True:
+            page = await self.client.get_address_txs_chain(address, last_seen)
+            for tx in page:
+                if tx["txid"] == tip_txid:
+                    return new_txs, True
+                new_txs.append(tx)
+
+            if len(page) < PAGE_SIZE:
+                return new_txs, tip_txid is None
+            last_seen = page[-1]["txid"]
+
+    async def sync(self, address):
+        """
+        Синхронизировать адрес
+
+        Если сохраненный tip больше не найден в истории (реорганизация),
+        состояние адреса пересчитывается с нуля.
+
+        Returns:
+            dict: состояние адреса (как AddressStore.get_state) и new_txs - число новых транзакций
+        """
+        state = self.store.get_state(address)
+        tip_txid = state["tip_txid"] if state else None
+
+        # Если tip пропал из цепочки, new_txs уже содержит всю историю -
+        # пересчитываем состояние с нуля без повторной загрузки
+        new_txs, found = await self.fetch_new_txs(address, tip_txid)
+        reset = not found
+
+        rows = []
+        for tx in reversed(new_txs):
+            received, sent = tx_delta(tx, address)
+            rows.append((tx["txid"], tx["status"].get("block_height"), received, sent))
+        self.store.apply(address, rows, reset=reset)
+
+        result = self.store.get_state(address)
+        result["new_txs"] = len(rows)
+        return result
+
+    async def sync_many(self, addresses):
+        """
+        Синхронизировать несколько адресов параллельно в одном event loop
+
+        Returns:
+            list: состояния в порядке addresses; при ошибке - {"address": ..., "error": ...}
+        """
+        results = await asyncio.gather(*(self.sync(a) for a in addresses), return_exceptions=True)
+        return [
+            {"address": address, "error": str(result)} if isinstance(result, Exception) else result
+            for address, result in zip(addresses, results)
+        ]
@@ -0,0 +1,214 @@
+"""
+Локальный фейковый сервер mempool.space для офлайн-проверки клиентов
+
+Поддерживает эндпоинты, которые использует mempool_client:
+    GET  /address/{address}
+    GET  /address/{address}/utxo
+    GET  /address/{address}/txs/chain[/{last_seen_txid}]
+    POST /tx
+    GET  /tx/{txid}/status
+    GET  /v1/fees/recommended
+
+Ответы по адресам содержат ETag и поддерживают If-None-Match (304).
+
+Запуск отдельно:
+    python fake_mempool.py --port 8999 --fixtures fixtures.json
+    python Bitcoin.js --api-url http://127.0.0.1:8999 tb1q...
+
+Использование из кода:
+    async with FakeMempoolServer(fixtures) as server:
+        async with MempoolClient(server.url) as client:
+            ...
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+
+from aiohttp import web
+
+try:
+    from bitcoinutils.transactions import Transaction
+except ImportError:
+    Transaction = None
+
+
+def compute_txid(raw_tx):
+    """txid raw транзакции; без bitcoinutils - двойной SHA256 от всех байт"""
+    raw = bytes.fromhex(raw_tx)
+    if Transaction is not None:
+        try:
+            return Transaction.from_raw(raw_tx).get_txid()
+        except Exception as e:
+            raise ValueError(str(e)) from e
+    return hashlib.sha256(hashlib.sha256(raw).digest()).digest()[::-1].hex()
+
+
+DEFAULT_FEES = {"fastestFee": 10, "halfHourFee": 5, "hourFee": 3, "economyFee": 2, "minimumFee": 1}
+
+
+def empty_stats():
+    return {"funded_txo_count": 0, "funded_txo_sum": 0,
+            "spent_txo_count": 0, "spent_txo_sum": 0, "tx_count": 0}
+
+
+class FakeMempoolServer:
+    """
+    Фейковый сервер с состоянием в памяти
+
+    fixtures: {"addresses": {address: {"chain_stats": {...}, "utxo": [...], "txs": [...]}},
+               "fees": {"fastestFee": ..., ...}}
+    txs - подтвержденные транзакции в формате Esplora, от новых к старым.
+    Неизвестные адреса возвращают нулевую статистику и пустой список UTXO.
+    """
+
+    def __init__(self, fixtures=None, host="127.0.0.1", port=0, error_rate=0.0, latency=0.0):
+        """
+        Args:
+            fixtures: начальное состояние адресов
+            host: адрес для прослушивания
+            port: порт (0 - выбрать свободный)
+            error_rate: доля запросов, на которые отвечать 429 (для проверки повторов)
+            latency: искусственная задержка ответа в секундах
+        """
+        fixtures = fixtures or {}
+        self.addresses = fixtures.get("addresses", {})
+        self.fees = fixtures.get("fees", dict(DEFAULT_FEES))
+        self.transactions = {}
+        self.host = host
+        self.port = port
+        self.error_rate = error_rate
+        self.latency = latency
+        self.request_count = 0
+        self.runner = None
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes([
+            web.get("/address/{address}", self.handle_address),
+            web.get("/address/{address}/utxo", self.handle_utxo),
+            web.get("/address/{address}/txs/chain", self.handle_txs_chain),
+            web.get("/address/{address}/txs/chain/{last_seen}", self.handle_txs_chain),
+            web.post("/tx", self.handle_broadcast),
+            web.get("/tx/{txid}/status", self.handle_tx_status),
+            web.get("/v1/fees/recommended", self.handle_fees),
+        ])
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        # При port=0 узнаем фактически выбранный порт
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return web.Response(status=429, text="Too Many Requests", headers={"Retry-After": "0"})
+        return await handler(request)
+
+    def json_with_etag(self, request, data):
+        """JSON-ответ с ETag; 304, если клиент прислал совпадающий If-None-Match"""
+        body = json.dumps(data)
+        etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def handle_address(self, request):
+        address = request.match_info["address"]
+        entry = self.addresses.get(address, {})
+        return self.json_with_etag(request, {
+            "address": address,
+            "chain_stats": entry.get("chain_stats", empty_stats()),
+            "mempool_stats": entry.get("mempool_stats", empty_stats()),
+        })
+
+    async def handle_utxo(self, request):
+        address = request.match_info["address"]
+        return self.json_with_etag(request, self.addresses.get(address, {}).get("utxo", []))
+
+    async def handle_txs_chain(self, request):
+        txs = self.addresses.get(request.match_info["address"], {}).get("txs", [])
+        last_seen = request.match_info.get("last_seen")
+        start = 0
+        if last_seen:
+            ids = [tx["txid"] for tx in txs]
+            if last_seen not in ids:
+                return web.json_response([])
+            start = ids.index(last_seen) + 1
+        return web.json_response(txs[start:start + 25])
+
+    async def handle_broadcast(self, request):
+        raw_tx = (await request.text()).strip()
+        try:
+            txid = compute_txid(raw_tx)
+        except ValueError:
+            return web.Response(status=400, text="sendrawtransaction RPC error: TX decode failed")
+        self.transactions[txid] = {"raw": raw_tx, "status": {"confirmed": False}}
+        return web.Response(text=txid)
+
+    async def handle_tx_status(self, request):
+        tx = self.transactions.get(request.match_info["txid"])
+        if tx is None:
+            return web.Response(status=404, text="Transaction not found")
+        return web.json_response(tx["status"])
+
+    async def handle_fees(self, request):
+        return self.json_with_etag(request, self.fees)
+
+    def confirm(self, txid, block_height=1, block_time=0):
+        """Пометить транзакцию подтвержденной"""
+        self.transactions[txid]["status"] = {
+            "confirmed": True, "block_height": block_height, "block_time": block_time
+        }
+
+
+async def serve(args):
+    fixtures = {}
+    if args.fixtures:
+        with open(args.fixtures, 'r') as f:
+            fixtures = json.load(f)
+
+    async with FakeMempoolServer(fixtures, args.host, args.port, args.error_rate, args.latency) as server:
+        print(f"Fake mempool API: {server.url}")
+        await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый сервер mempool.space API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--fixtures", help="JSON файл с состоянием адресов")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа, секунды")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Постоянный кэш ответов mempool.space на диске (SQLite)
+
+Ключ - URL запроса (эндпоинт + адрес). Запись считается свежей в течение TTL;
+после этого клиент перепроверяет ее условным запросом If-None-Match, если
+сервер прислал ETag. Размер кэша ограничен, при превышении удаляются
+записи, к которым дольше всего не обращались (LRU).
+"""
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = "mempool_cache.sqlite"
+DEFAULT_TTL = 60  # секунды
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class ResponseCache:
+    """
+    Кэш ответов с TTL, ETag и LRU-вытеснением по размеру
+
+    Счетчики:
+        hits - ответ взят из кэша без обращения к сети
+        misses - записи нет или она устарела без ETag
+        revalidated - сервер ответил 304 Not Modified на условный запрос
+        evictions - записи, удаленные при превышении размера
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path: путь к файлу SQLite (":memory:" - без сохранения на диск)
+            ttl: время свежести записи в секундах
+            max_bytes: максимальный суммарный размер тел ответов
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def lookup(self, key):
+        """
+        Найти запись
+
+        Returns:
+            tuple: (body, etag, fresh) или None, если записи нет
+        """
+        row = self.db.execute(
+            "SELECT body, etag, stored_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        body, etag, stored_at = row
+        now = time.time()
+        fresh = now - stored_at < self.ttl
+        if fresh:
+            self.hits += 1
+            self.db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.db.commit()
+        elif not etag:
+            self.misses += 1
+        return body, etag, fresh
+
+    def store(self, key, body, etag=None):
+        """Сохранить ответ и при необходимости вытеснить старые записи"""
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses (key, etag, body, size, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, etag, body, len(body), now, now),
+        )
+        self._evict()
+        self.db.commit()
+
+    def refresh(self, key):
+        """Продлить свежесть записи после ответа 304 Not Modified"""
+        now = time.time()
+        self.revalidated += 1
+        self.db.execute(
+            "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+        )
+        self.db.commit()
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self.db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Удалить запись (или весь кэш, если key не указан)"""
+        if key is None:
+            self.db.execute("DELETE FROM responses")
+        else:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.db.commit()
+
+    def stats(self):
+        """Счетчики и текущий размер кэша"""
+        entries, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+        }
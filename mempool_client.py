@@ -0,0 +1,227 @@
+"""
+Асинхронный клиент REST API mempool.space (Esplora)
+
+Используется Bitcoin.js и 2лаб/2.py. Все запросы одного клиента идут через
+одну aiohttp-сессию с пулом keep-alive соединений, поэтому пакетные запросы
+по многим адресам или транзакциям выполняются в одном event loop.
+"""
+import asyncio
+import json
+import time
+
+import aiohttp
+
+MAINNET_URL = "https://mempool.space/api"
+TESTNET_URL = "https://mempool.space/testnet/api"
+TESTNET4_URL = "https://mempool.space/testnet4/api"
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE_LIMIT = 10.0  # запросов в секунду
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0  # секунды, удваивается при каждом повторе
+
+
+class MempoolError(Exception):
+    """Ошибка запроса к API (status=None для сетевых ошибок)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class RateLimiter:
+    """
+    Планировщик запросов с учетом лимитов сервера
+
+    Токен-бакет ограничивает частоту запросов, а после ответа 429 все
+    запросы клиента приостанавливаются до истечения Retry-After.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Дождаться разрешения на отправку запроса"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Приостановить все запросы на seconds секунд (после 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class MempoolClient:
+    """
+    Асинхронный клиент mempool.space
+
+    Пример:
+        async with MempoolClient(TESTNET4_URL) as client:
+            stats = await client.get_address(address)
+            utxos = await client.get_address_utxos(address)
+    """
+
+    def __init__(self, base_url=MAINNET_URL, concurrency=DEFAULT_CONCURRENCY,
+                 rate_limit=DEFAULT_RATE_LIMIT, max_retries=MAX_RETRIES, timeout=30, cache=None):
+        """
+        Args:
+            base_url: базовый URL API (например TESTNET4_URL или адрес фейкового сервера)
+            concurrency: максимальное количество одновременных запросов (и размер пула соединений)
+            rate_limit: ограничение частоты запросов в секунду (None - без ограничения)
+            max_retries: количество повторов при 429, 5xx и сетевых ошибках
+            timeout: таймаут одного запроса в секундах
+            cache: mempool_cache.ResponseCache для запросов по адресам (None - без кэша)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.cache = cache
+        self.semaphore = None
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Создать сессию с пулом keep-alive соединений"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        """Закрыть сессию и все соединения"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, method, path, data=None, as_json=True, cached=False):
+        """
+        Выполнить запрос с учетом лимитов и повторами
+
+        При cached=True свежий ответ берется из кэша без обращения к сети,
+        а устаревший с ETag перепроверяется условным запросом.
+
+        Returns:
+            Распарсенный JSON или текст ответа
+        """
+        await self.open()
+        url = f"{self.base_url}{path}"
+        delay = BACKOFF_BASE
+        headers = {}
+
+        entry = self.cache.lookup(url) if cached and self.cache else None
+        if entry:
+            body, etag, fresh = entry
+            if fresh:
+                return json.loads(body) if as_json else body
+            if etag:
+                headers["If-None-Match"] = etag
+
+        for attempt in range(self.max_retries + 1):
+            async with self.semaphore:
+                if self.limiter:
+                    await self.limiter.acquire()
+                try:
+                    async with self.session.request(method, url, data=data, headers=headers) as response:
+                        if response.status == 304 and entry:
+                            self.cache.refresh(url)
+                            return json.loads(entry[0]) if as_json else entry[0]
+                        if response.status == 429 or response.status >= 500:
+                            text = await response.text()
+                            if attempt == self.max_retries:
+                                raise MempoolError(f"{method} {path}: {response.status} {text}",
+                                                   response.status)
+                            retry_after = response.headers.get("Retry-After", "")
+                            wait = float(retry_after) if retry_after.isdigit() else delay
+                            if response.status == 429 and self.limiter:
+                                self.limiter.pause(wait)
+                        elif response.status >= 400:
+                            text = await response.text()
+                            raise MempoolError(f"{method} {path}: {response.status} {text}",
+                                               response.status)
+                        else:
+                            text = await response.text()
+                            if cached and self.cache:
+                                if headers:
+                                    # Условный запрос вернул новые данные
+                                    self.cache.misses += 1
+                                self.cache.store(url, text, response.headers.get("ETag"))
+                            return json.loads(text) if as_json else text
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt == self.max_retries:
+                        raise MempoolError(f"{method} {path}: {e}") from e
+                    wait = delay
+
+            await asyncio.sleep(wait)
+            delay *= 2
+
+        raise MempoolError(f"{method} {path}: retries exhausted")
+
+    async def get_address(self, address):
+        """Статистика адреса (/address/{address}): chain_stats и mempool_stats"""
+        return await self._request("GET", f"/address/{address}", cached=True)
+
+    async def get_address_utxos(self, address):
+        """Список UTXO адреса (/address/{address}/utxo)"""
+        return await self._request("GET", f"/address/{address}/utxo", cached=True)
+
+    async def get_address_txs_chain(self, address, last_seen_txid=None):
+        """
+        Страница подтвержденных транзакций адреса, от новых к старым
+
+        Args:
+            address: адрес
+            last_seen_txid: последний txid предыдущей страницы (None - первая страница)
+        """
+        path = f"/address/{address}/txs/chain"
+        if last_seen_txid:
+            path += f"/{last_seen_txid}"
+        return await self._request("GET", path)
+
+    async def broadcast_tx(self, raw_tx):
+        """Отправить raw транзакцию (POST /tx), возвращает txid"""
+        txid = await self._request("POST", "/tx", data=raw_tx.encode("utf-8"), as_json=False)
+        return txid.strip()
+
+    async def get_tx_status(self, txid):
+        """Статус транзакции (/tx/{txid}/status): confirmed, block_height, block_time"""
+        return await self._request("GET", f"/tx/{txid}/status")
+
+    async def get_recommended_fees(self):
+        """
+        Рекомендуемые ставки комиссии (/v1/fees/recommended), sat/vB:
+        fastestFee, halfHourFee, hourFee, economyFee, minimumFee
+        """
+        return await self._request("GET", "/v1/fees/recommended", cached=True)
+
+    async def gather(self, func, items):
+        """
+        Выполнить func(item) для всех items в одном event loop
+
+        Returns:
+            list: результаты в порядке items; при ошибке на месте результата MempoolError
+        """
+        return await asyncio.gather(*(func(item) for item in items), return_exceptions=True)
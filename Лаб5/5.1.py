@@ -5,6 +5,9 @@ import os
 from dotenv import load_dotenv
 import time
 
+from nonce_manager import NonceManager, print_gaps
+from receipt_collector import ReceiptCollector, broadcast, print_stats, send_tracked
+
 # Загружаем переменные окружения из .env файла
 load_dotenv()
 
@@ -52,6 +55,10 @@ class EthereumTransactionHandler:
             # Конвертируем переданный адрес в checksum формат
             self.from_address = self.w3.to_checksum_address(self.from_address)
         
+        # Nonce выдаются локально: одна синхронизация с нодой вместо запроса на каждую транзакцию
+        self.nonces = NonceManager(self.w3, self.from_address)
+        self.chain_id = self.w3.eth.chain_id
+        
         # Проверяем баланс
         self.check_balance()
     
@@ -66,7 +73,8 @@ class EthereumTransactionHandler:
         
         return balance_wei
     
-    def create_transaction(self, to_address, value_eth, gas_limit=21000, gas_price=None):
+    def create_transaction(self, to_address, value_eth, gas_limit=21000, gas_price=None, nonce=None,
+                           verbose=True):
         """
         Создает транзакцию
         
@@ -75,6 +83,8 @@ class EthereumTransactionHandler:
             value_eth: Количество ETH для отправки
             gas_limit: Лимит газа
             gas_price: Цена газа (если None, будет получена автоматически)
+            nonce: Nonce транзакции (если None, выдается NonceManager)
+            verbose: Печатать поля транзакции и комиссию
         
         Returns:
             Словарь с данными транзакции
@@ -82,8 +92,9 @@ class EthereumTransactionHandler:
         # Конвертируем ETH в Wei
         value_wei = self.w3.to_wei(value_eth, 'ether')
         
-        # Получаем nonce (количество транзакций отправленных с адреса)
-        nonce = self.w3.eth.get_transaction_count(self.from_address)
+        # Получаем nonce из локального счетчика (учитывает транзакции в пуле)
+        if nonce is None:
+            nonce = self.nonces.next()
 
         # Конвертируем адрес получателя в checksum формат
         to_address_checksum = self.w3.to_checksum_address(to_address)
@@ -101,8 +112,10 @@ class EthereumTransactionHandler:
             'value': value_wei,
             'gas': gas_limit,
             'gasPrice': gas_price,
-            'chainId': self.w3.eth.chain_id,
+            'chainId': self.chain_id,
         }
+        if not verbose:
+            return transaction
         
         print(f"\nСоздана транзакция:")
         print(f"   От: {self.from_address}")
@@ -111,7 +124,7 @@ class EthereumTransactionHandler:
         print(f"   Nonce: {nonce}")
         print(f"   Gas Limit: {gas_limit}")
         print(f"   Gas Price: {gas_price} Wei ({self.w3.from_wei(gas_price, 'gwei')} Gwei)")
-        print(f"   Chain ID: {self.w3.eth.chain_id}")
+        print(f"   Chain ID: {self.chain_id}")
         
         # Рассчитываем комиссию
         fee_wei = gas_limit * gas_price
@@ -120,14 +133,22 @@ class EthereumTransactionHandler:
         
         return transaction
     
-    def sign_transaction(self, transaction):
-        """Подписывает транзакцию приватным ключом"""
-        print(f"\nПодписание транзакции...")
+    def sign_transaction(self, transaction, verbose=True):
+        """
+        Подписывает транзакцию приватным ключом
         
+        Args:
+            transaction: Словарь транзакции
+            verbose: Печатать хэш и подпись (r, s, v)
+        """
         signed_txn = self.w3.eth.account.sign_transaction(
             transaction, 
             self.private_key
         )
+        if not verbose:
+            return signed_txn
+        
+        print(f"\nПодписание транзакции...")
 
         # Конвертируем hash в hex строку
         tx_hash_hex = signed_txn.hash.hex() if hasattr(signed_txn.hash, 'hex') else f"0x{signed_txn.hash:064x}"
@@ -139,13 +160,31 @@ class EthereumTransactionHandler:
         
         return signed_txn
     
-    def send_transaction(self, signed_txn):
-        """Отправляет подписанную транзакцию в сеть"""
+    def send_transaction(self, signed_txn, collector=None, nonce=None):
+        """
+        Отправляет подписанную транзакцию в сеть
+        
+        Args:
+            signed_txn: Подписанная транзакция
+            collector: ReceiptCollector; если указан, квитанция не ожидается,
+                       возвращается (хэш, Future квитанции)
+            nonce: Nonce транзакции; если нода ее отклонила, nonce возвращается
+                   в NonceManager (если None, счетчик пересинхронизируется)
+        """
         print(f"\nОтправка транзакции в сеть...")
         
         try:
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            
+            tx_hash, future = send_tracked(self.w3, signed_txn.raw_transaction, signed_txn.hash,
+                                           collector, self.nonces, nonce)
+        except Exception as e:
+            print(f"Ошибка при отправке транзакции: {e}")
+            raise
+        
+        if collector is not None:
+            print(f"   Хэш транзакции: {tx_hash.hex()}")
+            return tx_hash, future
+        
+        try:
             # Ждем подтверждения
             tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
             
@@ -158,7 +197,8 @@ class EthereumTransactionHandler:
             return tx_hash, tx_receipt
             
         except Exception as e:
-            print(f"Ошибка при отправке транзакции: {e}")
+            # Транзакция уже отправлена, nonce занят
+            print(f"Ошибка при ожидании подтверждения: {e}")
             raise
     
     def get_transaction_info(self, tx_hash):
@@ -231,7 +271,7 @@ class EthereumTransactionHandler:
         signed_txn = self.sign_transaction(transaction)
         
         # 3. Отправляем транзакцию
-        tx_hash, tx_receipt = self.send_transaction(signed_txn)
+        tx_hash, tx_receipt = self.send_transaction(signed_txn, nonce=transaction['nonce'])
         
         # 4. Получаем информацию о транзакции
         tx_info = self.get_transaction_info(tx_hash)
@@ -242,6 +282,50 @@ class EthereumTransactionHandler:
         
         print(f"\nПеревод завершен успешно!")
         return tx_hash
+    
+    def send_queue(self, payments, gas_price=None, ws_url=None, timeout=120):
+        """
+        Подписывает и отправляет очередь переводов подряд, не дожидаясь квитанций
+        
+        Квитанции собирает один фоновый ReceiptCollector; в конце выводятся
+        задержки включения в блок и пропускная способность.
+        
+        Args:
+            payments: Список (адрес получателя, сумма в ETH)
+            gas_price: Цена газа в Gwei (если None, запрашивается один раз на очередь)
+            ws_url: WebSocket ноды для подписки newHeads (если None, опрос блоков)
+            timeout: Время ожидания квитанций, секунд
+        
+        Returns:
+            Список результатов collector.track() (None - квитанция не получена)
+        """
+        if gas_price is None:
+            gas_price = self.w3.from_wei(self.w3.eth.gas_price, 'gwei')
+        
+        nonces = self.nonces.reserve(len(payments))
+        try:
+            signed_txns = [
+                self.sign_transaction(self.create_transaction(to_address, value_eth, gas_price=gas_price,
+                                                              nonce=nonce, verbose=False),
+                                      verbose=False)
+                for (to_address, value_eth), nonce in zip(payments, nonces)
+            ]
+        except Exception:
+            # Ни одна транзакция не отправлена: зарезервированные nonce свободны
+            self.nonces.sync()
+            raise
+        
+        with ReceiptCollector(self.w3, ws_url=ws_url) as collector:
+            print(f"\nОтправка {len(signed_txns)} транзакций...")
+            futures = broadcast(self.w3, signed_txns, collector)
+            sent = [n for n, f in zip(nonces, futures) if not (f.done() and f.exception() is not None)]
+            if len(sent) < len(nonces):
+                print_gaps(self.nonces.reclaim_gaps(sent), len(nonces) - len(sent))
+            
+            results = collector.wait_all(futures, timeout)
+            print_stats(collector.stats(), len(signed_txns))
+        
+        return results
 
 def main():
     """Основная функция с примером использования"""
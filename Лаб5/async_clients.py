@@ -0,0 +1,340 @@
+"""
+Асинхронные варианты клиентов лабораторной 5 (AsyncWeb3)
+
+EthereumTransactionHandler, ContractDeployer, ContractReader и
+ContractWriter создают каждый свой синхронный Web3 и при создании
+последовательно выполняют is_connected, chain_id, block_number и syncing.
+Здесь все клиенты работают через один AsyncNode: один AsyncWeb3 и одна
+aiohttp-сессия (общий пул соединений), стартовые запросы выполняются
+одновременно через asyncio.gather, методы клиентов - корутины. Так один
+процесс может выполнять множество чтений и записей параллельно.
+
+Компиляция контракта остается в deploy_contract.py (solcx);
+AsyncContractDeployer берет ABI и байткод из сохраненных файлов.
+
+Пример:
+    python async_clients.py --reads 200
+    PRIVATE_KEY=0x... python async_clients.py --reads 200 --writes 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+from eth_account import Account
+from web3 import AsyncHTTPProvider, AsyncWeb3
+from web3.middleware import ExtraDataToPOAMiddleware
+
+from nonce_manager import AsyncNonceManager
+
+load_dotenv()
+
+DEFAULT_NODE_URL = "http://localhost:8545"
+POOL_SIZE = 100          # одновременных HTTP-соединений с нодой
+RECEIPT_TIMEOUT = 120
+ABI_PATH = "SimpleStorage_abi.json"
+BYTECODE_PATH = "SimpleStorage_bytecode.txt"
+CONTRACT_ADDRESS_PATH = "contract_address.txt"
+
+
+def load_artifacts(abi_path=ABI_PATH, bytecode_path=BYTECODE_PATH):
+    """ABI и байткод, сохраненные ContractDeployer.compile_contract()"""
+    with open(abi_path, "r") as f:
+        abi = json.load(f)
+    with open(bytecode_path, "r") as f:
+        bytecode = f.read().strip()
+    return abi, bytecode
+
+
+def load_contract_address(contract_address=None):
+    if contract_address:
+        return contract_address
+    try:
+        with open(CONTRACT_ADDRESS_PATH, "r") as f:
+            return f.read().strip()
+    except OSError:
+        raise ValueError("Адрес контракта не найден. Укажите его вручную или убедитесь что contract_address.txt существует")
+
+
+class AsyncNode:
+    """
+    Общее подключение к ноде для асинхронных клиентов
+
+    Пример:
+        async with AsyncNode("http://localhost:8545") as node:
+            reader = AsyncContractReader(node)
+            values = await asyncio.gather(*(reader.get_current_value() for _ in range(100)))
+    """
+
+    def __init__(self, node_url=None, pool_size=POOL_SIZE):
+        self.node_url = node_url or DEFAULT_NODE_URL
+        self.pool_size = pool_size
+        self.session = None
+        self.w3 = None
+        self.chain_id = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        """Создать пул соединений и выполнить стартовые проверки одновременно"""
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        provider = AsyncHTTPProvider(self.node_url)
+        await provider.cache_async_session(self.session)
+        self.w3 = AsyncWeb3(provider)
+        self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+
+        try:
+            connected, chain_id, block_number, syncing = await asyncio.gather(
+                self.w3.is_connected(),
+                self.w3.eth.chain_id,
+                self.w3.eth.block_number,
+                self.w3.eth.syncing,
+            )
+        except Exception:
+            connected = False
+        if not connected:
+            await self.close()
+            raise ConnectionError(f"Не удалось подключиться к ноде по адресу {self.node_url}")
+        self.chain_id = chain_id
+
+        print(f"Успешное подключение к ноде Ethereum")
+        print(f"   URL: {self.node_url}")
+        print(f"   Chain ID: {chain_id}")
+        print(f"   Номер блока: {block_number}")
+        print(f"   Синхронизирована: {syncing}")
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncSender:
+    """Общая часть клиентов, отправляющих транзакции: ключ, nonce, отправка"""
+
+    def __init__(self, node, private_key=None, from_address=None):
+        self.node = node
+        self.w3 = node.w3
+        self.private_key = private_key or os.getenv('PRIVATE_KEY')
+        if not self.private_key:
+            raise ValueError("Приватный ключ не указан. Укажите в аргументе или в .env файле")
+        self.from_address = self.w3.to_checksum_address(
+            from_address or Account.from_key(self.private_key).address
+        )
+        self.nonces = AsyncNonceManager(self.w3, self.from_address)
+
+    def sign_transaction(self, transaction):
+        return Account.sign_transaction(transaction, self.private_key)
+
+    async def send_transaction(self, transaction, wait=True):
+        """
+        Подписать и отправить транзакцию без nonce (nonce выдает NonceManager)
+
+        Returns:
+            tuple: (хэш, квитанция или None при wait=False)
+        """
+        async def build(nonce):
+            return {**transaction, 'nonce': nonce}
+        return await self._send(build, wait)
+
+    async def _send(self, build, wait):
+        """
+        build(nonce) - корутина, возвращающая словарь транзакции с этим nonce
+
+        Неотправленный nonce возвращается, при ошибке nonce отправка
+        повторяется с новым (AsyncNonceManager.send).
+        """
+        async def build_and_send(nonce):
+            signed = self.sign_transaction(await build(nonce))
+            return await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+
+        tx_hash = await self.nonces.send(build_and_send)
+        if not wait:
+            return tx_hash, None
+        receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=RECEIPT_TIMEOUT)
+        return tx_hash, receipt
+
+
+class AsyncTransactionHandler(AsyncSender):
+    """
+    Асинхронный EthereumTransactionHandler
+
+    Пример:
+        handler = AsyncTransactionHandler(node, private_key)
+        hashes = await asyncio.gather(*(handler.transfer_ether(to, 0.01) for to in recipients))
+    """
+
+    async def check_balance(self):
+        """Баланс адреса отправителя в Wei"""
+        return await self.w3.eth.get_balance(self.from_address)
+
+    async def create_transaction(self, to_address, value_eth, gas_limit=21000, gas_price=None):
+        """Словарь транзакции без nonce; gas_price в Gwei (None - цена ноды)"""
+        if gas_price is None:
+            gas_price = await self.w3.eth.gas_price
+        else:
+            gas_price = self.w3.to_wei(gas_price, 'gwei')
+        return {
+            'to': self.w3.to_checksum_address(to_address),
+            'value': self.w3.to_wei(value_eth, 'ether'),
+            'gas': gas_limit,
+            'gasPrice': gas_price,
+            'chainId': self.node.chain_id,
+        }
+
+    async def transfer_ether(self, to_address, value_eth, gas_price=None, wait=True):
+        """Создать, подписать и отправить перевод; возвращает (хэш, квитанция)"""
+        transaction = await self.create_transaction(to_address, value_eth, gas_price=gas_price)
+        return await self.send_transaction(transaction, wait)
+
+    async def get_transaction_info(self, tx_hash):
+        return await self.w3.eth.get_transaction(tx_hash)
+
+    async def get_block_info(self, block_number):
+        return await self.w3.eth.get_block(block_number)
+
+
+class AsyncContractDeployer(AsyncSender):
+    """
+    Асинхронный ContractDeployer (без компиляции)
+
+    Пример:
+        deployer = AsyncContractDeployer(node, private_key)
+        address, receipt = await deployer.deploy_contract(*load_artifacts(), initial_value=100)
+    """
+
+    async def deploy_contract(self, abi, bytecode, initial_value=42):
+        """Развернуть контракт; возвращает (адрес контракта, квитанция)"""
+        contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
+        gas_price = await self.w3.eth.gas_price
+
+        async def build(nonce):
+            return await contract.constructor(initial_value).build_transaction({
+                'chainId': self.node.chain_id,
+                'gas': 2000000,  # Больше газа для деплоя
+                'gasPrice': gas_price,
+                'nonce': nonce,
+                'from': self.from_address,
+            })
+        _, receipt = await self._send(build, wait=True)
+        return receipt.contractAddress, receipt
+
+    async def get_contract_info(self, contract_address):
+        """Баланс (Wei) и размер кода контракта, запрошенные одновременно"""
+        balance, code = await asyncio.gather(
+            self.w3.eth.get_balance(contract_address),
+            self.w3.eth.get_code(contract_address),
+        )
+        return {"balance": balance, "code_size": len(code)}
+
+
+class AsyncContractReader:
+    """
+    Асинхронный ContractReader
+
+    Пример:
+        reader = AsyncContractReader(node)
+        value = await reader.get_current_value()
+    """
+
+    def __init__(self, node, contract_address=None, abi_path=ABI_PATH):
+        self.node = node
+        self.w3 = node.w3
+        self.contract_address = self.w3.to_checksum_address(load_contract_address(contract_address))
+        try:
+            with open(abi_path, "r") as f:
+                self.abi = json.load(f)
+        except OSError:
+            raise ValueError("ABI не найден. Сначала скомпилируйте контракт")
+        self.contract = self.w3.eth.contract(address=self.contract_address, abi=self.abi)
+
+    async def get_current_value(self):
+        """Значение get() контракта"""
+        return await self.contract.functions.get().call()
+
+    async def get_contract_info(self):
+        """Баланс (Wei) и размер кода контракта, запрошенные одновременно"""
+        balance, code = await asyncio.gather(
+            self.w3.eth.get_balance(self.contract_address),
+            self.w3.eth.get_code(self.contract_address),
+        )
+        return {"balance": balance, "code_size": len(code)}
+
+
+class AsyncContractWriter(AsyncSender):
+    """
+    Асинхронный ContractWriter
+
+    Пример:
+        writer = AsyncContractWriter(node, private_key)
+        results = await asyncio.gather(*(writer.set_value(v) for v in range(10)))
+    """
+
+    def __init__(self, node, private_key=None, contract_address=None, abi_path=ABI_PATH):
+        super().__init__(node, private_key)
+        self.reader = AsyncContractReader(node, contract_address, abi_path)
+        self.contract = self.reader.contract
+        self.contract_address = self.reader.contract_address
+
+    async def set_value(self, new_value, wait=True):
+        """Вызвать set(new_value); возвращает (хэш, квитанция или None при wait=False)"""
+        gas_price = await self.w3.eth.gas_price
+
+        async def build(nonce):
+            return await self.contract.functions.set(new_value).build_transaction({
+                'chainId': self.node.chain_id,
+                'gas': 100000,
+                'gasPrice': gas_price,
+                'nonce': nonce,
+                'from': self.from_address,
+            })
+        return await self._send(build, wait)
+
+
+async def run_demo(node_url, reads, writes, contract_address=None):
+    async with AsyncNode(node_url) as node:
+        reader = AsyncContractReader(node, contract_address)
+
+        start = time.perf_counter()
+        values = await asyncio.gather(*(reader.get_current_value() for _ in range(reads)))
+        elapsed = time.perf_counter() - start
+        print(f"\nЧтений get(): {reads} за {elapsed:.2f} с ({reads / elapsed:.0f}/с), значение: {values[-1] if values else None}")
+
+        if writes:
+            writer = AsyncContractWriter(node, contract_address=contract_address)
+            start = time.perf_counter()
+            results = await asyncio.gather(*(writer.set_value(v) for v in range(writes)),
+                                           return_exceptions=True)
+            elapsed = time.perf_counter() - start
+            failed = [r for r in results if isinstance(r, Exception)]
+            print(f"Записей set(): {writes - len(failed)} из {writes} за {elapsed:.2f} с")
+            for error in failed[:3]:
+                print(f"   Ошибка: {error}")
+            print(f"Значение после записи: {await reader.get_current_value()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельные чтения и записи SimpleStorage через AsyncWeb3")
+    parser.add_argument("--node-url", default=os.getenv("NODE_URL", DEFAULT_NODE_URL))
+    parser.add_argument("--contract", help="адрес контракта (по умолчанию из contract_address.txt)")
+    parser.add_argument("--reads", type=int, default=100)
+    parser.add_argument("--writes", type=int, default=0, help="транзакций set() (нужен PRIVATE_KEY)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_demo(args.node_url, args.reads, args.writes, args.contract))
+    except Exception as e:
+        print(f"\nОшибка: {e}")
+
+
+if __name__ == "__main__":
+    main()
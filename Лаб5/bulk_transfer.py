@@ -0,0 +1,253 @@
+"""
+Массовые переводы ETH по списку получателей
+
+transfer_ether() на каждый платеж проверяет баланс, ждет квитанцию и
+запрашивает информацию о транзакции и блоке. BulkTransfer для выплат по
+списку:
+    1. читает файл получателей (CSV или JSONL) и проверяет адреса;
+    2. один раз запрашивает цену газа и баланс - на всю сумму с комиссиями;
+    3. подписывает все транзакции заранее с nonce из NonceManager.reserve
+       (сначала заполняются пропуски, затем новые nonce);
+       (с signer=SigningPool - параллельно в нескольких процессах);
+    4. отправляет их параллельно из нескольких потоков;
+    5. собирает квитанции одним ReceiptCollector, без диагностических запросов;
+    6. пишет компактный файл результатов - строка на получателя.
+
+Формат файла получателей:
+    CSV   - заголовок address,amount (ETH), остальные столбцы игнорируются
+    JSONL - {"address": "0x...", "amount": "0.01"} в строке
+
+Пример:
+    PRIVATE_KEY=0x... python bulk_transfer.py payroll.csv --out payroll_result.csv
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from nonce_manager import print_gaps
+from receipt_collector import ReceiptCollector, print_stats, send_tracked
+from signing_pool import SigningPool, sign_batch
+
+BROADCAST_WORKERS = 8
+TRANSFER_GAS = 21000
+RESULT_FIELDS = ("address", "amount", "nonce", "tx_hash", "status", "block_number", "error")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_recipients(path):
+    """
+    Прочитать получателей из CSV или JSONL
+
+    Returns:
+        list: [(адрес, сумма в ETH как Decimal), ...] в порядке файла
+    """
+    recipients = []
+    with open(path, "r", newline="") as f:
+        if path.endswith(".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            recipients.append((row["address"].strip(), Decimal(str(row["amount"]).strip())))
+    return recipients
+
+
+def write_results(path, results):
+    """Записать результаты: CSV, или JSONL для файла с расширением .jsonl"""
+    with open(path, "w", newline="") as f:
+        if path.endswith(".jsonl"):
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+            return
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+class BulkTransfer:
+    """
+    Выплаты по списку через EthereumTransactionHandler
+
+    Пример:
+        bulk = BulkTransfer(handler)
+        results = bulk.run(read_recipients("payroll.csv"))
+        write_results("payroll_result.csv", results)
+    """
+
+    def __init__(self, handler, workers=BROADCAST_WORKERS, signer=None):
+        """
+        Args:
+            handler: EthereumTransactionHandler (подключение, ключ, NonceManager)
+            workers: количество потоков отправки
+            signer: SigningPool для подписи в нескольких процессах (None - в текущем)
+        """
+        self.handler = handler
+        self.w3 = handler.w3
+        self.workers = workers
+        self.signer = signer
+
+    def prepare(self, recipients, gas_price=None):
+        """
+        Проверить адреса и баланс, подписать все транзакции
+
+        Returns:
+            list: словари результатов (status "signed") с сериализованной транзакцией в "raw"
+
+        Raises:
+            ValueError: неверный адрес или недостаточно средств на всю выплату
+        """
+        payments = []
+        for address, amount in recipients:
+            if not self.w3.is_address(address):
+                raise ValueError(f"Неверный адрес получателя: {address}")
+            payments.append((self.w3.to_checksum_address(address), amount, self.w3.to_wei(amount, 'ether')))
+
+        gas_price = self.w3.eth.gas_price if gas_price is None else self.w3.to_wei(gas_price, 'gwei')
+        total_wei = sum(value for _, _, value in payments) + len(payments) * TRANSFER_GAS * gas_price
+        balance = self.w3.eth.get_balance(self.handler.from_address)
+        if balance < total_wei:
+            raise ValueError(
+                f"Недостаточно средств: требуется {self.w3.from_wei(total_wei, 'ether')} ETH "
+                f"с комиссиями, доступно {self.w3.from_wei(balance, 'ether')} ETH"
+            )
+
+        nonces = self.handler.nonces.reserve(len(payments))
+        transactions = [{
+            'nonce': nonce,
+            'to': address,
+            'value': value,
+            'gas': TRANSFER_GAS,
+            'gasPrice': gas_price,
+            'chainId': self.handler.chain_id,
+        } for (address, _, value), nonce in zip(payments, nonces)]
+        try:
+            if self.signer is not None:
+                signed = self.signer.sign(transactions)
+            else:
+                signed = sign_batch(transactions, self.handler.private_key)
+        except Exception:
+            # Ни одна транзакция не отправлена: зарезервированные nonce свободны
+            self.handler.nonces.sync()
+            raise
+
+        return [{
+            "address": address, "amount": str(amount), "nonce": tx['nonce'],
+            "tx_hash": "0x" + tx_hash.hex(), "status": "signed",
+            "block_number": None, "error": None, "raw": raw,
+        } for (address, amount, _), tx, (raw, tx_hash) in zip(payments, transactions, signed)]
+
+    def broadcast(self, results, collector=None):
+        """
+        Отправить подписанные транзакции параллельно; ошибки записываются в результаты
+
+        nonce неотправленных транзакций, которых нет у ноды, возвращаются в
+        NonceManager (reclaim_gaps): следующие отправки заполнят пропуски.
+
+        Returns:
+            dict: хэш -> Future квитанции для отправленных транзакций
+        """
+        futures = {}
+
+        def send(result):
+            try:
+                _, future = send_tracked(self.w3, result["raw"], result["tx_hash"], collector)
+            except Exception as e:
+                return result, e
+            if future is not None:
+                futures[result["tx_hash"]] = future
+            return result, None
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            for result, error in pool.map(send, results):
+                if error is not None:
+                    result["status"], result["error"] = "failed", str(error)
+                else:
+                    result["status"] = "sent"
+
+        sent = [r["nonce"] for r in results if r["status"] == "sent"]
+        if len(sent) < len(results):
+            print_gaps(self.handler.nonces.reclaim_gaps(sent), len(results) - len(sent))
+        return futures
+
+    def run(self, recipients, gas_price=None, wait=True, timeout=300):
+        """
+        Выполнить выплату
+
+        Args:
+            recipients: [(адрес, сумма в ETH), ...]
+            gas_price: цена газа в Gwei (None - текущая цена ноды)
+            wait: ждать квитанций (иначе статус "sent" после отправки)
+            timeout: время ожидания квитанций, секунд
+
+        Returns:
+            list: результаты по получателям в порядке recipients
+        """
+        results = self.prepare(recipients, gas_price)
+        print(f"Подписано транзакций: {len(results)}, nonce {results[0]['nonce']}..{results[-1]['nonce']}"
+              if results else "Нет получателей")
+
+        if wait:
+            with ReceiptCollector(self.w3) as collector:
+                futures = self.broadcast(results, collector)
+                receipts = collector.wait_all(list(futures.values()), timeout)
+                by_hash = {r["tx_hash"]: r for r in results}
+                for tx_hash, receipt in zip(futures, receipts):
+                    result = by_hash[tx_hash]
+                    if receipt is not None:
+                        result["status"] = "included" if receipt["status"] == 1 else "reverted"
+                        result["block_number"] = receipt["block_number"]
+                print_stats(collector.stats(), len(futures))
+        else:
+            self.broadcast(results)
+
+        for result in results:
+            del result["raw"]
+        return results
+
+
+def load_handler_class():
+    """EthereumTransactionHandler из 5.1.py (имя файла не является идентификатором)"""
+    spec = importlib.util.spec_from_file_location("eth_transactions", os.path.join(HERE, "5.1.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EthereumTransactionHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Массовые переводы ETH по списку получателей")
+    parser.add_argument("recipients", help="CSV (address,amount) или JSONL")
+    parser.add_argument("--out", help="файл результатов (по умолчанию <имя>_result.<расширение>)")
+    parser.add_argument("--node-url", default=os.getenv("NODE_URL", "http://localhost:8545"))
+    parser.add_argument("--gas-price", type=Decimal, help="цена газа, Gwei")
+    parser.add_argument("--workers", type=int, default=BROADCAST_WORKERS, help="потоков отправки")
+    parser.add_argument("--sign-workers", type=int, default=1, help="процессов подписи")
+    parser.add_argument("--no-wait", action="store_true", help="не ждать квитанций")
+    args = parser.parse_args()
+
+    recipients = read_recipients(args.recipients)
+    handler = load_handler_class()(node_url=args.node_url)
+    signer = SigningPool(handler.private_key, args.sign_workers) if args.sign_workers > 1 else None
+    try:
+        bulk = BulkTransfer(handler, args.workers, signer)
+        results = bulk.run(recipients, args.gas_price, wait=not args.no_wait)
+    finally:
+        if signer is not None:
+            signer.close()
+
+    base, ext = os.path.splitext(args.recipients)
+    out = args.out or f"{base}_result{ext}"
+    write_results(out, results)
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print(f"Результаты записаны в {out}: " + ", ".join(f"{k} - {v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ from web3.middleware import ExtraDataToPOAMiddleware
 from solcx import compile_standard, install_solc
 import os
 
+from nonce_manager import NonceManager
+from receipt_collector import send_tracked
+
 # Установка конкретной версии solc
 install_solc('0.8.0')
 
@@ -29,6 +32,9 @@ class ContractDeployer:
         
         print(f"Адрес отправителя: {self.from_address}")
         
+        # Локальный счетчик nonce (одна синхронизация с нодой)
+        self.nonces = NonceManager(self.w3, self.from_address)
+        
     def compile_contract(self, contract_path="SimpleStorage.sol"):
         """
         Компилирует Solidity контракт
@@ -78,36 +84,44 @@ class ContractDeployer:
         
         return abi, bytecode
     
-    def deploy_contract(self, abi, bytecode, initial_value=42):
+    def deploy_contract(self, abi, bytecode, initial_value=42, collector=None):
         """
         Деплоит контракт в сеть
+        
+        Если указан collector (ReceiptCollector), квитанция не ожидается:
+        возвращается (хэш, Future квитанции), адрес контракта - в
+        contractAddress квитанции.
         """
         print(f"\nДеплой контракта с начальным значением: {initial_value}")
         
         # Создаем объект контракта
         Contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
         
-        # Получаем nonce
-        nonce = self.w3.eth.get_transaction_count(self.from_address)
-        
-        # Строим транзакцию для деплоя
-        transaction = Contract.constructor(initial_value).build_transaction({
-            'chainId': self.w3.eth.chain_id,
-            'gas': 2000000,  # Больше газа для деплоя
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': nonce,
-            'from': self.from_address
-        })
-        
-        # Подписываем транзакцию
-        signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-        
-        # Отправляем транзакцию
-        print("Отправка транзакции деплоя...")
-        tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        def build_and_send(nonce):
+            # Строим транзакцию для деплоя
+            transaction = Contract.constructor(initial_value).build_transaction({
+                'chainId': self.w3.eth.chain_id,
+                'gas': 2000000,  # Больше газа для деплоя
+                'gasPrice': self.w3.eth.gas_price,
+                'nonce': nonce,
+                'from': self.from_address
+            })
+            
+            # Подписываем транзакцию
+            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+            
+            # Отправляем транзакцию
+            print("Отправка транзакции деплоя...")
+            return send_tracked(self.w3, signed_txn.raw_transaction, signed_txn.hash, collector)
+        
+        # nonce выдает локальный счетчик; неотправленный возвращается, при ошибке nonce - повтор
+        tx_hash, future = self.nonces.send(build_and_send)
         tx_hash_hex = tx_hash.hex() if hasattr(tx_hash, 'hex') else f"0x{tx_hash:064x}"
         print(f"Транзакция отправлена: {tx_hash_hex}")
         
+        if collector is not None:
+            return tx_hash, future
+        
         # Ждем подтверждения
         print("Ожидание подтверждения...")
         tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
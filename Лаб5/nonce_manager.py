@@ -0,0 +1,282 @@
+"""
+Локальная выдача nonce для отправки транзакций с одного адреса
+
+get_transaction_count() перед каждой транзакцией стоит лишний запрос к
+ноде, а две отправки подряд получают один и тот же nonce, если первая еще
+не попала в пул. NonceManager один раз синхронизируется по счетчику
+'pending' и дальше выдает nonce локально под блокировкой, поэтому его
+можно использовать из нескольких потоков.
+
+Если транзакция не была отправлена (ошибка подписи, сети), ее nonce
+возвращается через release() и выдается повторно - без пропуска в
+последовательности. Ошибки ноды "nonce too low", "already known",
+"replacement transaction underpriced" означают рассинхронизацию:
+handle_error() заново читает счетчик с ноды.
+
+После пакетной отправки gaps() сравнивает счетчик 'pending' ноды с
+выданным диапазоном и находит nonce без транзакции, а reclaim_gaps()
+возвращает их в выдачу: следующие отправки заполняют пропуски, и
+транзакции с большими nonce, ждущие в очереди ноды, попадают в блок.
+
+С AsyncWeb3 используется AsyncNonceManager: те же методы, но корутины;
+первую синхронизацию выполняет одна задача, остальные ждут ее результата.
+"""
+import asyncio
+import heapq
+import threading
+
+# Фрагменты сообщений ноды (geth, anvil, hardhat), после которых нужна ресинхронизация
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "already known",
+    "known transaction",
+    "replacement transaction underpriced",
+    "invalid nonce",
+)
+MAX_RETRIES = 3
+
+
+def is_nonce_error(error):
+    """Ошибка отправки вызвана неверным nonce"""
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_ERRORS)
+
+
+class NonceManager:
+    """
+    Атомарная выдача nonce для одного адреса
+
+    Пример:
+        nonces = NonceManager(w3, from_address)
+        tx = {..., 'nonce': nonces.next()}
+        try:
+            w3.eth.send_raw_transaction(signed.raw_transaction)
+        except Exception as e:
+            nonces.handle_error(e, tx['nonce'])
+            raise
+    """
+
+    def __init__(self, w3, address):
+        self.w3 = w3
+        self.address = address
+        self.lock = threading.Lock()
+        self.next_nonce = None
+        self.released = []  # nonce, выданные, но не отправленные (min-куча)
+        self.queued = set()  # отправленные nonce выше пропуска (ждут в очереди ноды)
+        self.syncs = 0
+
+    def sync(self):
+        """Прочитать счетчик 'pending' с ноды; возвращает следующий nonce"""
+        with self.lock:
+            return self._sync()
+
+    def _sync(self):
+        self.next_nonce = self.w3.eth.get_transaction_count(self.address, 'pending')
+        self.released = []
+        self.queued = set()
+        self.syncs += 1
+        return self.next_nonce
+
+    def next(self):
+        """Следующий свободный nonce (при первом вызове - синхронизация с нодой)"""
+        with self.lock:
+            if self.next_nonce is None:
+                self._sync()
+            return self._take()
+
+    def reserve(self, count):
+        """
+        Выдать count nonce одним вызовом (для пакетной подписи)
+
+        Сначала выдаются возвращенные nonce (release, reclaim_gaps), затем
+        последовательные новые.
+        """
+        with self.lock:
+            if self.next_nonce is None:
+                self._sync()
+            return self._take_range(count)
+
+    def _take(self):
+        if self.released:
+            return heapq.heappop(self.released)
+        nonce = self.next_nonce
+        self.next_nonce += 1
+        return nonce
+
+    def _take_range(self, count):
+        taken = [heapq.heappop(self.released) for _ in range(min(count, len(self.released)))]
+        start = self.next_nonce
+        self.next_nonce += count - len(taken)
+        return taken + list(range(start, self.next_nonce))
+
+    def release(self, nonce):
+        """Вернуть nonce транзакции, которая не была отправлена"""
+        with self.lock:
+            if self.next_nonce is not None and nonce < self.next_nonce:
+                if nonce == self.next_nonce - 1:
+                    self.next_nonce -= 1
+                else:
+                    heapq.heappush(self.released, nonce)
+
+    def handle_error(self, error, nonce=None):
+        """
+        Обработать ошибку отправки
+
+        Returns:
+            bool: True - ошибка из-за nonce, счетчик пересинхронизирован и
+                  отправку можно повторить с новым nonce
+        """
+        if is_nonce_error(error):
+            self.sync()
+            return True
+        if nonce is not None:
+            self.release(nonce)
+        return False
+
+    def gaps(self, sent=()):
+        """
+        Выданные nonce, для которых у ноды нет транзакции
+
+        Счетчик 'pending' ноды - первый nonce без транзакции. Выданные
+        локально nonce от него и выше - пропуски, кроме возвращенных
+        (release) и принятых нодой транзакций, которые ждут в очереди за
+        пропуском: sent и переданных в прошлые вызовы reclaim_gaps().
+        """
+        pending = self.w3.eth.get_transaction_count(self.address, 'pending')
+        with self.lock:
+            return self._gaps(pending, sent)
+
+    def _gaps(self, pending, sent):
+        if self.next_nonce is None or pending >= self.next_nonce:
+            return []
+        skip = self.queued.union(self.released, sent)
+        return [n for n in range(pending, self.next_nonce) if n not in skip]
+
+    def reclaim_gaps(self, sent=()):
+        """
+        Вернуть пропуски (см. gaps) в выдачу: next() сначала заполнит их
+
+        Если нода уже ушла дальше локального счетчика (nonce заняты другим
+        отправителем с тем же ключом), счетчик пересинхронизируется.
+
+        Returns:
+            list: возвращенные nonce по возрастанию
+        """
+        pending = self.w3.eth.get_transaction_count(self.address, 'pending')
+        with self.lock:
+            return self._reclaim(pending, sent)
+
+    def _reclaim(self, pending, sent):
+        if self.next_nonce is not None and pending >= self.next_nonce:
+            self.next_nonce = pending
+            self.released = []
+            self.queued = set()
+            self.syncs += 1
+            return []
+        missing = self._gaps(pending, sent)
+        for nonce in missing:
+            heapq.heappush(self.released, nonce)
+        self.queued = {n for n in self.queued.union(sent) if n >= pending}
+        return missing
+
+    def send(self, build_and_send, retries=MAX_RETRIES):
+        """
+        Отправить транзакцию с повтором при ошибке nonce
+
+        Args:
+            build_and_send: функция(nonce), строит, подписывает и отправляет транзакцию
+        """
+        for attempt in range(retries + 1):
+            nonce = self.next()
+            try:
+                return build_and_send(nonce)
+            except Exception as e:
+                if not self.handle_error(e, nonce) or attempt == retries:
+                    raise
+
+
+def print_gaps(missing, failed):
+    """Итог reclaim_gaps() после пакетной отправки"""
+    print(f"Не отправлено транзакций: {failed}")
+    if missing:
+        print(f"   Пропуски nonce: {', '.join(map(str, missing))} - следующие отправки заполнят их, "
+              f"транзакции с большими nonce ждут в очереди ноды")
+
+
+class AsyncNonceManager(NonceManager):
+    """
+    NonceManager для AsyncWeb3: sync, next, reserve, handle_error, gaps,
+    reclaim_gaps и send - корутины
+
+    Запрос к ноде выполняется под asyncio.Lock: задачи, одновременно
+    запросившие первый nonce, ждут одну синхронизацию, а не отправляют
+    по запросу каждая. release() остается обычным методом.
+
+    Пример:
+        nonces = AsyncNonceManager(async_w3, from_address)
+        values = await asyncio.gather(*(nonces.next() for _ in range(10)))
+    """
+
+    def __init__(self, w3, address):
+        super().__init__(w3, address)
+        self.sync_lock = asyncio.Lock()
+
+    async def sync(self):
+        """Прочитать счетчик 'pending' с ноды; возвращает следующий nonce"""
+        async with self.sync_lock:
+            return await self._sync()
+
+    async def _sync(self):
+        pending = await self.w3.eth.get_transaction_count(self.address, 'pending')
+        with self.lock:
+            self.next_nonce = pending
+            self.released = []
+            self.queued = set()
+            self.syncs += 1
+            return pending
+
+    async def _ensure_synced(self):
+        if self.next_nonce is None:
+            async with self.sync_lock:
+                # Пока задача ждала блокировку, синхронизацию могла выполнить другая
+                if self.next_nonce is None:
+                    await self._sync()
+
+    async def next(self):
+        await self._ensure_synced()
+        with self.lock:
+            return self._take()
+
+    async def reserve(self, count):
+        await self._ensure_synced()
+        with self.lock:
+            return self._take_range(count)
+
+    async def handle_error(self, error, nonce=None):
+        if is_nonce_error(error):
+            await self.sync()
+            return True
+        if nonce is not None:
+            self.release(nonce)
+        return False
+
+    async def gaps(self, sent=()):
+        pending = await self.w3.eth.get_transaction_count(self.address, 'pending')
+        with self.lock:
+            return self._gaps(pending, sent)
+
+    async def reclaim_gaps(self, sent=()):
+        pending = await self.w3.eth.get_transaction_count(self.address, 'pending')
+        with self.lock:
+            return self._reclaim(pending, sent)
+
+    async def send(self, build_and_send, retries=MAX_RETRIES):
+        """send() с корутиной build_and_send(nonce)"""
+        for attempt in range(retries + 1):
+            nonce = await self.next()
+            try:
+                return await build_and_send(nonce)
+            except Exception as e:
+                if not await self.handle_error(e, nonce) or attempt == retries:
+                    raise
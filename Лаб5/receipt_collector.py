@@ -0,0 +1,302 @@
+"""
+Сбор квитанций отправленных транзакций в фоновом потоке
+
+wait_for_transaction_receipt() сразу после send_raw_transaction() дает
+одну транзакцию на блок. ReceiptCollector позволяет отправлять
+транзакции подряд, не дожидаясь квитанций: один фоновый поток следит за
+новыми блоками, ищет в них отслеживаемые хэши и запрашивает квитанции
+только для найденных транзакций (одним пакетным запросом на блок).
+
+О новых блоках поток узнает опросом eth_blockNumber или, если задан
+ws_url, по подписке newHeads (нужен пакет websockets) - тогда блок
+обрабатывается сразу после появления.
+
+Для каждой транзакции возвращается concurrent.futures.Future с задержкой
+включения в блок; stats() считает общую пропускную способность (TPS).
+
+Пример:
+    collector = ReceiptCollector(w3)          # до первой отправки
+    futures = broadcast(w3, signed_txns, collector)
+    collector.wait_all(futures, timeout=120)
+    print(collector.stats())
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from web3.exceptions import TransactionNotFound
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+
+RECEIPT_POLL_INTERVAL = 0.5  # секунд между проверками номера блока
+RECEIPT_TIMEOUT = 120
+
+
+def hash_key(tx_hash):
+    """Хэш транзакции как строка 0x... в нижнем регистре (HexBytes, bytes или str)"""
+    if isinstance(tx_hash, str):
+        value = tx_hash.lower()
+        return value if value.startswith("0x") else "0x" + value
+    return "0x" + bytes(tx_hash).hex()
+
+
+class NewHeads:
+    """Подписка newHeads через WebSocket; каждое событие будит поток сборщика"""
+
+    def __init__(self, ws_url, wakeup):
+        if ws_connect is None:
+            raise RuntimeError("для подписки newHeads нужен пакет websockets")
+        self.connection = ws_connect(ws_url)
+        self.connection.send('{"jsonrpc":"2.0","id":1,"method":"eth_subscribe","params":["newHeads"]}')
+        self.connection.recv()  # ответ с id подписки
+        self.wakeup = wakeup
+        self.thread = threading.Thread(target=self._loop, name="NewHeads", daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        try:
+            for _ in self.connection:
+                self.wakeup.set()
+        except Exception as e:
+            print(f"Подписка newHeads прервана, остается опрос: {e}")
+
+    def close(self):
+        self.connection.close()
+
+
+class ReceiptCollector:
+    """
+    Фоновый сбор квитанций по хэшам транзакций
+
+    Пример:
+        with ReceiptCollector(w3, ws_url="ws://localhost:8546") as collector:
+            tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+            future = collector.track(tx_hash)
+            print(future.result(timeout=120)["latency"])
+    """
+
+    def __init__(self, w3, poll_interval=RECEIPT_POLL_INTERVAL, ws_url=None):
+        """
+        Args:
+            w3: подключение Web3
+            poll_interval: интервал опроса номера блока, секунд
+            ws_url: адрес WebSocket ноды для подписки newHeads (None - только опрос)
+        """
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        # Блоки до создания сборщика не просматриваются
+        self.block = w3.eth.block_number
+        self.pending = {}  # хэш -> (Future, время отправки)
+        self.results = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.heads = None
+        if ws_url:
+            try:
+                self.heads = NewHeads(ws_url, self.wakeup)
+            except Exception as e:
+                print(f"newHeads недоступна ({e}), используется опрос")
+        self.thread = threading.Thread(target=self._loop, name="ReceiptCollector", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Остановить поток; незавершенные Future отменяются"""
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join()
+        if self.heads is not None:
+            self.heads.close()
+        with self.lock:
+            for future, _ in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+
+    def track(self, tx_hash, sent_at=None):
+        """
+        Начать ожидание квитанции tx_hash
+
+        Returns:
+            Future: результат {"tx_hash", "block_number", "status", "gas_used",
+                    "contract_address", "latency", "block_latency"}; latency -
+                    секунд от отправки до обнаружения квитанции,
+                    block_latency - до времени блока
+        """
+        future = Future()
+        with self.lock:
+            self.pending[hash_key(tx_hash)] = (future, sent_at or time.time())
+        return future
+
+    def discard(self, tx_hash, error):
+        """Снять tx_hash с ожидания: транзакция не была отправлена"""
+        with self.lock:
+            entry = self.pending.pop(hash_key(tx_hash), None)
+        if entry is not None:
+            entry[0].set_exception(error)
+
+    def wait_all(self, futures, timeout=RECEIPT_TIMEOUT):
+        """
+        Дождаться всех Future
+
+        Транзакции, не найденные к таймауту, проверяются прямым запросом
+        квитанции (на случай блока до создания сборщика).
+
+        Returns:
+            list: результаты в порядке futures (None - квитанции нет)
+        """
+        deadline = time.time() + timeout
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(max(deadline - time.time(), 0)))
+            except Exception:
+                results.append(None)
+        with self.lock:
+            missing = [key for key, (future, _) in self.pending.items() if not future.done()]
+        if missing:
+            for key in missing:
+                try:
+                    self._complete(key, self.w3.eth.get_transaction_receipt(key), time.time())
+                except TransactionNotFound:
+                    pass
+            results = [future.result()
+                       if future.done() and not future.cancelled() and future.exception() is None
+                       else None
+                       for future in futures]
+        return results
+
+    def stats(self):
+        """
+        Итоги по завершенным транзакциям
+
+        Returns:
+            dict: included, failed (status 0), latency_avg, latency_max, tps -
+                  транзакций в секунду от первой отправки до последнего включения
+        """
+        results = list(self.results)
+        if not results:
+            return {"included": 0, "failed": 0, "latency_avg": None, "latency_max": None, "tps": None}
+        latencies = [r["latency"] for r in results]
+        first_sent = min(r["sent_at"] for r in results)
+        last_seen = max(r["sent_at"] + r["latency"] for r in results)
+        return {
+            "included": len(results),
+            "failed": sum(1 for r in results if r["status"] != 1),
+            "latency_avg": sum(latencies) / len(latencies),
+            "latency_max": max(latencies),
+            "tps": len(results) / (last_seen - first_sent) if last_seen > first_sent else None,
+        }
+
+    def _loop(self):
+        while not self.stopped:
+            if self.pending:
+                try:
+                    self._tick()
+                except Exception as e:
+                    print(f"Ошибка сбора квитанций: {e}")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+    def _tick(self):
+        head = self.w3.eth.block_number
+        while self.block < head and self.pending:
+            number = self.block + 1
+            block = self.w3.eth.get_block(number)
+            found_at = time.time()
+            with self.lock:
+                matched = [hash_key(h) for h in block.transactions if hash_key(h) in self.pending]
+            if matched:
+                self._resolve(matched, found_at, block.timestamp)
+            self.block = number
+        if not self.pending:
+            # Пустые блоки без ожиданий не просматриваются
+            self.block = head
+
+    def _resolve(self, keys, found_at, block_time=None):
+        """Запросить квитанции keys одним пакетом и завершить их Future"""
+        with self.w3.batch_requests() as batch:
+            for key in keys:
+                batch.add(self.w3.eth.get_transaction_receipt(key))
+            receipts = batch.execute()
+        for key, receipt in zip(keys, receipts):
+            self._complete(key, receipt, found_at, block_time)
+
+    def _complete(self, key, receipt, found_at, block_time=None):
+        with self.lock:
+            entry = self.pending.pop(key, None)
+        if entry is None:
+            return
+        future, sent_at = entry
+        result = {
+            "tx_hash": key,
+            "block_number": receipt["blockNumber"],
+            "status": receipt["status"],
+            "gas_used": receipt["gasUsed"],
+            "contract_address": receipt.get("contractAddress"),
+            "sent_at": sent_at,
+            "latency": found_at - sent_at,
+            "block_latency": block_time - sent_at if block_time is not None else None,
+        }
+        self.results.append(result)
+        future.set_result(result)
+
+
+def send_tracked(w3, raw_transaction, tx_hash, collector=None, nonces=None, nonce=None):
+    """
+    Отправить подписанную транзакцию
+
+    Хэш известен после подписи, поэтому ожидание квитанции регистрируется
+    до отправки: блок с транзакцией не будет пропущен, даже если он
+    появится раньше, чем вернется send_raw_transaction(). Если нода не
+    приняла транзакцию, ожидание снимается, а nonce возвращается в nonces
+    (NonceManager.handle_error; без nonce - пересинхронизация счетчика).
+
+    Returns:
+        tuple: (хэш от ноды, Future квитанции или None без collector)
+    """
+    future = collector.track(tx_hash) if collector is not None else None
+    try:
+        sent_hash = w3.eth.send_raw_transaction(raw_transaction)
+    except Exception as e:
+        if collector is not None:
+            collector.discard(tx_hash, e)
+        if nonces is not None and not nonces.handle_error(e, nonce) and nonce is None:
+            nonces.sync()
+        raise
+    return sent_hash, future
+
+
+def broadcast(w3, signed_txns, collector):
+    """
+    Отправить подписанные транзакции подряд, не дожидаясь квитанций
+
+    Returns:
+        list: Future из collector.track() в порядке signed_txns; ошибка
+              отправки становится исключением соответствующего Future
+    """
+    futures = []
+    for signed in signed_txns:
+        try:
+            _, future = send_tracked(w3, signed.raw_transaction, signed.hash, collector)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        futures.append(future)
+    return futures
+
+
+def print_stats(stats, sent):
+    print(f"\nКвитанции: {stats['included']} из {sent}, с ошибкой исполнения: {stats['failed']}")
+    if stats["included"]:
+        print(f"   Задержка включения: средняя {stats['latency_avg']:.2f} с, максимальная {stats['latency_max']:.2f} с")
+    if stats["tps"]:
+        print(f"   Пропускная способность: {stats['tps']:.1f} транзакций/с")
@@ -3,6 +3,9 @@ from web3 import Web3
 from web3.middleware import ExtraDataToPOAMiddleware
 import os
 
+from nonce_manager import NonceManager
+from receipt_collector import send_tracked
+
 class ContractWriter:
     def __init__(self, node_url=None, private_key=None, contract_address=None):
         """
@@ -26,6 +29,9 @@ class ContractWriter:
         
         print(f"Адрес отправителя: {self.from_address}")
         
+        # Локальный счетчик nonce (одна синхронизация с нодой)
+        self.nonces = NonceManager(self.w3, self.from_address)
+        
         # Загрузка адреса контракта
         if contract_address:
             self.contract_address = contract_address
@@ -51,9 +57,12 @@ class ContractWriter:
             abi=self.abi
         )
     
-    def set_value(self, new_value):
+    def set_value(self, new_value, collector=None):
         """
         Вызывает метод set() контракта для установки нового значения
+        
+        Если указан collector (ReceiptCollector), квитанция не ожидается:
+        возвращается (хэш, Future квитанции).
         """
         print(f"\nУстановка нового значения: {new_value}")
         print(f"   Адрес контракта: {self.contract_address}")
@@ -63,27 +72,32 @@ class ContractWriter:
             current_value = self.contract.functions.get().call()
             print(f"   Текущее значение: {current_value}")
             
-            # Строим транзакцию для вызова set()
-            nonce = self.w3.eth.get_transaction_count(self.from_address)
+            def build_and_send(nonce):
+                # Строим транзакцию для вызова set()
+                transaction = self.contract.functions.set(new_value).build_transaction({
+                    'chainId': self.w3.eth.chain_id,
+                    'gas': 100000,
+                    'gasPrice': self.w3.eth.gas_price,
+                    'nonce': nonce,
+                    'from': self.from_address
+                })
+                
+                # Подписываем транзакцию
+                print("Подписание транзакции...")
+                signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+                
+                # Отправляем транзакцию
+                print("Отправка транзакции...")
+                return send_tracked(self.w3, signed_txn.raw_transaction, signed_txn.hash, collector)
             
-            transaction = self.contract.functions.set(new_value).build_transaction({
-                'chainId': self.w3.eth.chain_id,
-                'gas': 100000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': nonce,
-                'from': self.from_address
-            })
-            
-            # Подписываем транзакцию
-            print("Подписание транзакции...")
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            
-            # Отправляем транзакцию
-            print("Отправка транзакции...")
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            # nonce выдает локальный счетчик; неотправленный возвращается, при ошибке nonce - повтор
+            tx_hash, future = self.nonces.send(build_and_send)
             tx_hash_hex = tx_hash.hex() if hasattr(tx_hash, 'hex') else f"0x{tx_hash:064x}"
             print(f"Транзакция отправлена: {tx_hash_hex}")
             
+            if collector is not None:
+                return tx_hash, future
+            
             # Ждем подтверждения
             print("Ожидание подтверждения...")
             tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
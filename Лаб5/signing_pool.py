@@ -0,0 +1,157 @@
+"""
+Параллельная офлайн-подпись транзакций Ethereum
+
+sign_transaction() подписывает в вызывающем потоке; при подготовке
+больших пакетов узким местом становятся ECDSA и RLP-кодирование, а GIL не
+дает ускориться на потоках. SigningPool распределяет подпись по процессам:
+ключ передается в каждый процесс один раз (initializer), транзакции -
+блоками, результат возвращается в порядке входного списка.
+
+Диагностический вывод (r/s/v) отключен; verbose=True печатает только итог
+по пакету.
+
+Бенчмарк - подписей в секунду в зависимости от размера пакета и числа
+процессов:
+    python signing_pool.py --batch-sizes 100 1000 5000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_account import Account
+
+MIN_PARALLEL_BATCH = 64  # меньшие пакеты быстрее подписать в текущем процессе
+CHUNKS_PER_WORKER = 4
+
+_worker_key = None
+
+
+def _init_worker(private_key):
+    global _worker_key
+    _worker_key = private_key
+
+
+def _sign_chunk(transactions):
+    return sign_batch(transactions, _worker_key)
+
+
+def sign_batch(transactions, private_key):
+    """Подписать в текущем процессе; [(raw_transaction, hash), ...]"""
+    signed = [Account.sign_transaction(tx, private_key) for tx in transactions]
+    return [(bytes(s.raw_transaction), bytes(s.hash)) for s in signed]
+
+
+class SigningPool:
+    """
+    Пул процессов для подписи транзакций одним ключом
+
+    Пример:
+        with SigningPool(private_key, workers=4) as pool:
+            signed = pool.sign(transactions)
+        for raw, tx_hash in signed:
+            w3.eth.send_raw_transaction(raw)
+    """
+
+    def __init__(self, private_key, workers=None, verbose=False):
+        """
+        Args:
+            private_key: приватный ключ отправителя
+            workers: количество процессов (None - по числу ядер)
+            verbose: печатать итог по каждому пакету
+        """
+        self.private_key = private_key
+        self.workers = workers or os.cpu_count() or 1
+        self.verbose = verbose
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(private_key,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def sign(self, transactions):
+        """
+        Подписать список словарей транзакций
+
+        Returns:
+            list: [(raw_transaction bytes, hash bytes), ...] в порядке transactions
+        """
+        transactions = list(transactions)
+        start = time.perf_counter()
+        if len(transactions) < MIN_PARALLEL_BATCH or self.workers == 1:
+            signed = sign_batch(transactions, self.private_key)
+        else:
+            size = -(-len(transactions) // (self.workers * CHUNKS_PER_WORKER))
+            chunks = [transactions[i:i + size] for i in range(0, len(transactions), size)]
+            signed = [item for chunk in self.executor.map(_sign_chunk, chunks) for item in chunk]
+        if self.verbose:
+            elapsed = time.perf_counter() - start
+            print(f"Подписано транзакций: {len(signed)} за {elapsed:.2f} с "
+                  f"({len(signed) / elapsed if elapsed else 0:.0f}/с, процессов: {self.workers})")
+        return signed
+
+
+def sample_transactions(count, chain_id=1337):
+    """Переводы с последовательными nonce для бенчмарка"""
+    return [{
+        'nonce': nonce,
+        'to': "0x" + "22" * 20,
+        'value': 10 ** 15,
+        'gas': 21000,
+        'gasPrice': 10 ** 9,
+        'chainId': chain_id,
+    } for nonce in range(count)]
+
+
+def benchmark(batch_sizes, worker_counts):
+    """
+    Подписей в секунду для каждого сочетания размера пакета и числа процессов
+
+    Returns:
+        list: [{"batch_size", "workers", "seconds", "signatures_per_sec"}, ...]
+    """
+    private_key = Account.create().key
+    results = []
+    for workers in worker_counts:
+        with SigningPool(private_key, workers) as pool:
+            pool.sign(sample_transactions(workers * MIN_PARALLEL_BATCH))  # запуск процессов
+            for batch_size in batch_sizes:
+                transactions = sample_transactions(batch_size)
+                start = time.perf_counter()
+                pool.sign(transactions)
+                elapsed = time.perf_counter() - start
+                results.append({
+                    "batch_size": batch_size,
+                    "workers": workers,
+                    "seconds": elapsed,
+                    "signatures_per_sec": batch_size / elapsed,
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк параллельной подписи транзакций")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    results = benchmark(args.batch_sizes, sorted(set(args.workers)))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'пакет':>8}{'процессов':>11}{'время, с':>10}{'подписей/с':>12}")
+    for r in results:
+        print(f"{r['batch_size']:>8}{r['workers']:>11}{r['seconds']:>10.2f}{r['signatures_per_sec']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()